@@ -0,0 +1,674 @@
+"""An alternative engine to handlers/manager.py built on asyncio, so that
+waiting on reddit and waiting on AMQP can overlap. This is selected at startup
+by setting the PROXY_ENGINE environment variable to "asyncio".
+
+The packets, handlers and responses are exactly the same as the blocking
+engine. The handlers are not rewritten as coroutines; instead they are run on
+a thread with a BlockingReddit, so all the requests they make are made by an
+AsyncReddit on the event loop, while parsing and transforming the responses
+doesn't block the event loop.
+"""
+import asyncio
+from datetime import timedelta
+import functools
+import json
+import os
+import signal
+import time
+import traceback
+import aio_pika
+from lblogging import Level
+from auth import Auth
+from async_reddit import AsyncReddit, BlockingReddit, get_transport
+from cache import ResponseCache
+import loglevels
+import recording
+from coalesce import Coalescer
+from scheduler import RequestScheduler
+from expiry import ExpiryTracker
+from retries import RetryPolicy
+from credentials import Account, CredentialPool
+from backpressure import Backpressure
+from health import CircuitOpen, async_middleware as health_middleware
+from timing import RequestTimer, TimingStats
+from handlers.manager import (
+    _get_handlers, _parse_request, _check_response_queue, _get_handle_style,
+    _build_response, _get_priority, _create_response_queue_registry,
+    _load_credentials, _create_budget_store, _create_ratelimiter, _create_auth_refresher,
+    _create_backoff, _create_health, _create_metrics, _record_timing, EXPIRED_STYLE
+)
+
+
+def main(logger):
+    """Connects to the AMQP server and handles requests until we receive
+    SIGINT or SIGTERM. The logger is not closed."""
+    asyncio.run(_run(loglevels.gate(logger).with_iden('async_engine.py')))
+
+
+async def _run(logger):
+    amqp = None
+    for attempt in range(5):
+        if attempt > 0:
+            sleep_time = 4 ** attempt
+            print(f'Sleeping for {sleep_time} seconds..')
+            logger.print(
+                Level.WARN,
+                'Failed to connect to the AMQP server; will retry in {} seconds',
+                sleep_time
+            )
+            logger.connection.commit()
+            await asyncio.sleep(sleep_time)
+
+        print(f'Connecting to the AMQP server.. (attempt {attempt + 1}/5)')
+        try:
+            amqp = await aio_pika.connect_robust(
+                host=os.environ['AMQP_HOST'],
+                port=int(os.environ['AMQP_PORT']),
+                virtualhost=os.environ['AMQP_VHOST'],
+                login=os.environ['AMQP_USERNAME'],
+                password=os.environ['AMQP_PASSWORD']
+            )
+            break
+        except (ConnectionError, aio_pika.exceptions.AMQPConnectionError):
+            traceback.print_exc()
+            logger.exception(Level.WARN)
+            logger.connection.commit()
+
+    if amqp is None:
+        logger.print(
+            Level.ERROR,
+            'Failed to connect to the AMQP server (exhausted all attempts): shutting down'
+        )
+        logger.connection.commit()
+        return
+
+    logger.print(Level.INFO, 'Successfully connected to the AMQP server!')
+    logger.connection.commit()
+
+    stop_requested = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig_num in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig_num, stop_requested.set)
+
+    print('Initialization completed normally. Either SIGINT or SIGTERM should '
+          'be used to initiate a clean shutdown.')
+
+    handlers = _get_handlers(logger)
+    listener = asyncio.ensure_future(listen_with_handlers(logger, amqp, handlers))
+    stopper = asyncio.ensure_future(stop_requested.wait())
+    await asyncio.wait([listener, stopper], return_when=asyncio.FIRST_COMPLETED)
+
+    if stop_requested.is_set():
+        print('Received signal, clean shutdown started')
+        logger.print(Level.INFO, 'Received signal, clean shutdown started')
+    else:
+        stopper.cancel()
+        print('The listener stopped unexpectedly, shutting down')
+        try:
+            listener.result()
+        except:  # noqa: E722
+            traceback.print_exc()
+            logger.exception(Level.ERROR, 'The listener stopped unexpectedly')
+
+    listener.cancel()
+    await asyncio.gather(listener, return_exceptions=True)
+    logger.connection.commit()
+
+    await amqp.close()
+    await get_transport().close()
+
+
+async def listen_with_handlers(logger, amqp, handlers):
+    """The asyncio equivalent of handlers.manager.listen_with_handlers"""
+    logger = loglevels.gate(logger)
+    handlers_by_name = dict([(handler.name, handler) for handler in handlers])
+    queue_name = os.environ['AMQP_QUEUE']
+    response_queues = _create_response_queue_registry(logger)
+
+    def observe_latency(endpoint_name, resp):
+        if getattr(resp, 'elapsed', None) is not None:
+            metrics.reddit_latency.observe(resp.elapsed.total_seconds(), endpoint=endpoint_name)
+
+    def observe_account(account, endpoint_name, resp):
+        backoff = account.record_response(resp.status_code, resp.headers)
+        if backoff is not None:
+            logger.print(
+                Level.WARN,
+                'Reddit throttled {} in response to {} (status {}); '
+                'backing off for {} seconds ({})',
+                account.username, endpoint_name, resp.status_code, round(backoff[0], 3),
+                backoff[1]
+            )
+        if budget_store is None:
+            observe_ratelimit(account, endpoint_name, resp.headers)
+        else:
+            # a shared budget is updated in its store, which blocks
+            loop.run_in_executor(None, observe_ratelimit, account, endpoint_name, resp.headers)
+
+    def observe_ratelimit(account, endpoint_name, headers):
+        if account.ratelimiter.update(headers):
+            logger.print(
+                Level.TRACE,
+                (
+                    'Received ratelimit headers for {} from endpoint {}; x-ratelimit-used: {}, ' +
+                    'x-ratelimit-remaining: {}, x-ratelimit-reset: {}'
+                ),
+                account.username, endpoint_name, headers.get('x-ratelimit-used'),
+                headers['x-ratelimit-remaining'], headers['x-ratelimit-reset']
+            )
+
+    async def delay_for_reddit(account):
+        started_at = time.monotonic()
+        backoff = account.backoff_remaining()
+        while backoff > 0:
+            await asyncio.sleep(backoff)
+            backoff = account.backoff_remaining()
+
+        waited = 0.0
+        while True:
+            if budget_store is None:
+                wait = account.ratelimiter.try_acquire(waited)
+            else:
+                wait = await loop.run_in_executor(
+                    None, account.ratelimiter.try_acquire, waited
+                )
+            if wait <= 0:
+                metrics.ratelimit_wait.observe(
+                    time.monotonic() - started_at, account=account.username
+                )
+                return waited
+            await asyncio.sleep(wait)
+            waited += wait
+
+    loop = asyncio.get_running_loop()
+    response_cache = ResponseCache(int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', '1000')))
+    coalescer = Coalescer(float(os.environ.get('COALESCE_WINDOW_S', '30')))
+    expiry = ExpiryTracker()
+    backpressure = Backpressure(float(os.environ.get('BACKPRESSURE_THRESHOLD_S', '30')))
+    timing_stats = TimingStats(float(os.environ.get('SLOW_REQUEST_S', '30')))
+    retry_policy = RetryPolicy(
+        float(os.environ.get('RETRY_BASE_DELAY_S', '5')),
+        float(os.environ.get('RETRY_MAX_DELAY_S', '300')),
+        int(os.environ.get('RETRY_MAX_ATTEMPTS', '0'))
+    )
+    blocking_reddits = {}
+
+    def create_account(credentials):
+        account = None
+
+        async def login():
+            await delay_for_reddit(account)
+            return await _auth(account.reddit, logger, credentials)
+
+        reddit = AsyncReddit(get_transport())
+        # the refresher logs in from its own thread, so it has to hand the
+        # login back to the event loop
+        account = Account(
+            credentials, reddit, _create_ratelimiter(logger, credentials, budget_store),
+            _create_auth_refresher(
+                logger,
+                lambda: asyncio.run_coroutine_threadsafe(login(), loop).result(),
+                credentials
+            ),
+            _create_health(logger, credentials),
+            _create_backoff()
+        )
+        reddit.add_middleware(health_middleware(account.health))
+        reddit.add_observer(observe_latency)
+        reddit.add_observer(functools.partial(observe_account, account))
+        blocking_reddits[account.username] = BlockingReddit(reddit, loop)
+        return account
+
+    budget_store = _create_budget_store()
+    metrics = _create_metrics(logger)
+    accounts = CredentialPool([create_account(c) for c in _load_credentials()])
+    metrics.watch_accounts(accounts)
+    metrics.watch_backpressure(backpressure)
+    accounts.start()
+
+    concurrency = int(os.environ.get('REQUEST_CONCURRENCY', '1'))
+    order_by_uuid = os.environ.get('REQUEST_ORDER_BY_UUID', 'false').lower() == 'true'
+    prefetch = int(os.environ.get('REQUEST_PREFETCH', str(concurrency)))
+    scheduler = RequestScheduler(concurrency, float(os.environ.get('SCHEDULER_AGING_S', '10')))
+    in_flight = set()
+    stopping = False
+    consumer = None
+
+    channel = await amqp.channel()
+    await channel.set_qos(prefetch_count=max(prefetch, concurrency))
+    queue = await channel.declare_queue(queue_name)
+
+    async def get_auth(account):
+        current = account.auth_refresher.current()
+        if current is not None:
+            return current
+
+        logger.print(
+            Level.TRACE,
+            'No valid authorization for {}; reauthenticating with reddit',
+            account.username
+        )
+        logger.connection.commit()
+        return await loop.run_in_executor(None, account.auth_refresher.refresh)
+
+    async def run_handler(handler, account, req_auth, body, timer):
+        if handler.requires_delay:
+            with timer.phase('ratelimit'):
+                ratelimit_wait = await delay_for_reddit(account)
+            logger.print(
+                Level.TRACE,
+                'Waited {} seconds on the ratelimit for {} before request {}',
+                round(ratelimit_wait, 3), account.username, body['uuid']
+            )
+        try:
+            with timer.phase('handler'):
+                status, info = await loop.run_in_executor(
+                    None, handler.handle, timer.wrap_reddit(blocking_reddits[account.username]),
+                    req_auth, body['args']
+                )
+        except CircuitOpen as exc:
+            logger.print(
+                Level.DEBUG,
+                'Refused request {} to response queue {} with type {}: {}',
+                body['uuid'], body['response_queue'], body['type'], exc
+            )
+            status = exc.status_code
+            info = None
+        except:  # noqa: E722
+            logger.exception(
+                Level.WARN,
+                'An exception occurred while processing request to response '
+                'queue {} with type {}: body={}',
+                body['response_queue'], body['type'], body
+            )
+            status = 'failure'
+            info = None
+        return status, info
+
+    async def handle_request(body, message, received_at):
+        logger.print(
+            Level.TRACE,
+            'Processing request to response queue {} with type {} ({})',
+            body['response_queue'], body['type'], body['uuid']
+        )
+        logger.connection.commit()
+
+        timer = RequestTimer(body['sent_at'])
+        handler = handlers_by_name[body['type']]
+        overdue = expiry.check(handler, body)
+        if overdue is not None:
+            logger.print(
+                Level.DEBUG,
+                'Request {} to response queue {} with type {} expired {} seconds ago; '
+                'responding with expired',
+                body['uuid'], body['response_queue'], body['type'], round(overdue, 3)
+            )
+            logger.connection.commit()
+            metrics.requests.inc(type=body['type'], status='expired')
+            await send_response(body, message, EXPIRED_STYLE, None, None, timer)
+            return
+
+        cached = response_cache.lookup(handler, body)
+        if cached is not None:
+            status, info, age = cached
+            logger.print(
+                Level.TRACE,
+                'Using cached result for request {} with type {} ({} seconds old)',
+                body['uuid'], body['type'], round(age, 3)
+            )
+            await respond_with_result(body, message, status, info, timer)
+            return
+
+        coalesced, coalesce_info = coalescer.begin(
+            handler, body, (body, message, timer), received_at
+        )
+        if coalesced == 'joined':
+            logger.print(
+                Level.TRACE,
+                'Request {} with type {} joined an identical request in flight',
+                body['uuid'], body['type']
+            )
+            logger.connection.commit()
+            return
+        if coalesced == 'reuse':
+            status, info = coalesce_info
+            logger.print(
+                Level.TRACE,
+                'Reusing the result of an identical request for request {} with type {}',
+                body['uuid'], body['type']
+            )
+            await respond_with_result(body, message, status, info, timer)
+            return
+
+        account = accounts.choose(handler, body)
+        if handler.requires_delay:
+            wait = account.time_until_ready()
+            if backpressure.should_release(wait):
+                await release(body, message, account, wait)
+                if coalesced == 'lead':
+                    await nack_followers(coalescer.abandon(coalesce_info))
+                return
+
+        try:
+            with timer.phase('auth'):
+                req_auth = await get_auth(account)
+            if req_auth is not None:
+                status, info = await run_handler(handler, account, req_auth, body, timer)
+                response_cache.store(handler, body, status, info)
+        except BaseException:
+            if coalesced == 'lead':
+                await nack_followers(coalescer.abandon(coalesce_info))
+            raise
+
+        if req_auth is None:
+            logger.print(
+                Level.WARN,
+                'Failed to authenticate with reddit as {}! Will nack, requeue=True',
+                account.username
+            )
+            logger.connection.commit()
+            await message.nack(requeue=True)
+            if coalesced == 'lead':
+                await nack_followers(coalescer.abandon(coalesce_info))
+            return
+
+        followers = []
+        if coalesced == 'lead':
+            followers = coalescer.finish(coalesce_info, status, info)
+
+        if status == 401:
+            logger.print(
+                Level.INFO,
+                'Due to 401 status code, purging cached authorization information for {}. '
+                'It should not have expired until {}',
+                account.username, req_auth.expires_at
+            )
+            logger.connection.commit()
+            account.auth_refresher.invalidate(req_auth)
+
+        await respond_with_result(body, message, status, info, timer)
+        for follower_body, follower_message, follower_timer in followers:
+            logger.print(
+                Level.TRACE,
+                'Sharing the result of request {} with identical request {}',
+                body['uuid'], follower_body['uuid']
+            )
+            with loglevels.for_response_queue(follower_body['response_queue']):
+                await respond_with_result(
+                    follower_body, follower_message, status, info, follower_timer
+                )
+
+    async def respond_with_result(body, message, status, info, timer):
+        handle_style = _get_handle_style(body.get('style'), status)
+        metrics.requests.inc(type=body['type'], status=status)
+
+        if handle_style['log_level'] != 'NONE':
+            logger.print(
+                getattr(Level, handle_style['log_level']),
+                'Got status {} to response type {} for queue {} ({}) - handling with operation {}',
+                status, body['type'], body['response_queue'], body['uuid'],
+                handle_style['operation']
+            )
+            logger.connection.commit()
+
+        if handle_style['operation'] == 'retry' and retry_policy.exhausted(body, handle_style):
+            logger.print(
+                Level.WARN,
+                'Giving up on request {} to response queue {} with type {} after {} attempts',
+                body['uuid'], body['response_queue'], body['type'], body.get('attempt') or 1
+            )
+            logger.connection.commit()
+
+        await send_response(body, message, handle_style, status, info, timer)
+
+    async def send_response(body, message, handle_style, status, info, timer):
+        timing = timer.breakdown() if body.get('timing') else None
+        with timer.phase('publish'):
+            await publish(body, message, handle_style, status, info, timing)
+        _record_timing(logger, metrics, timing_stats, body, timer)
+
+    async def publish(body, message, handle_style, status, info, timing):
+        routing_key, packet, ack, delay = _build_response(
+            queue_name, body, handle_style, status, info, retry_policy, timing=timing
+        )
+        if packet is not None and delay is not None:
+            if routing_key not in retry_policy.declared_queues:
+                await channel.declare_queue(
+                    routing_key, arguments=retry_policy.delay_queue_arguments(queue_name)
+                )
+                retry_policy.declared_queues.add(routing_key)
+            await channel.default_exchange.publish(
+                aio_pika.Message(json.dumps(packet).encode('utf-8'), expiration=delay),
+                routing_key=routing_key
+            )
+        elif packet is not None:
+            await channel.default_exchange.publish(
+                aio_pika.Message(json.dumps(packet).encode('utf-8')),
+                routing_key=routing_key
+            )
+        if ack:
+            await message.ack()
+        else:
+            await message.reject(requeue=False)
+
+    async def nack_followers(followers):
+        for follower_body, follower_message, _ in followers:
+            logger.print(
+                Level.TRACE,
+                'Identical request in flight for request {} did not complete; '
+                'will nack, requeue=True',
+                follower_body['uuid']
+            )
+            await follower_message.nack(requeue=True)
+        logger.connection.commit()
+
+    async def release(body, message, account, wait):
+        logger.print(
+            Level.DEBUG,
+            'Releasing request {} to response queue {} with type {}; {} cannot make '
+            'a request for {} seconds',
+            body['uuid'], body['response_queue'], body['type'], account.username,
+            round(wait, 3)
+        )
+        logger.connection.commit()
+        backpressure.record_released(1)
+        if backpressure.pause([other.time_until_ready() for other in accounts.accounts]):
+            await message.nack(requeue=True)
+            await stop_consuming()
+        else:
+            task = asyncio.ensure_future(
+                nack_later(message, backpressure.release_delay(wait))
+            )
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+    async def nack_later(message, delay):
+        await asyncio.sleep(delay)
+        await message.nack(requeue=True)
+
+    async def stop_consuming():
+        """Stops consuming, which gives back the messages we received but
+        haven't seen yet, and gives back the requests we've seen but haven't
+        started"""
+        await consumer.close()
+        released = scheduler.drain()
+        for _, message, _ in released:
+            await message.nack(requeue=True)
+        backpressure.record_released(len(released))
+        logger.print(
+            Level.INFO,
+            'Stopped consuming from {} for {} seconds; gave back {} requests which '
+            'had not started',
+            queue_name, round(backpressure.remaining(), 3), len(released)
+        )
+        logger.connection.commit()
+
+    async def consume():
+        """Yields the messages from the queue, except while consuming is
+        paused, until the broker stops sending them"""
+        nonlocal consumer
+        while True:
+            async with queue.iterator() as consumer:
+                async for message in _timed_consume(consumer, metrics.consume_idle):
+                    yield message
+            if not backpressure.paused():
+                return
+
+            remaining = backpressure.remaining()
+            while remaining > 0:
+                await asyncio.sleep(remaining)
+                remaining = backpressure.remaining()
+            logger.print(
+                Level.INFO,
+                'Resuming consuming from {} after {} seconds',
+                queue_name, round(backpressure.resume(), 3)
+            )
+            logger.connection.commit()
+
+    async def handle_request_safely(body, message, received_at):
+        try:
+            await handle_request(body, message, received_at)
+        except asyncio.CancelledError:
+            raise
+        except:  # noqa: E722
+            logger.exception(
+                Level.ERROR,
+                'Unhandled exception while processing request to response queue {} '
+                'with type {} ({}); will nack, requeue=True',
+                body['response_queue'], body['type'], body['uuid']
+            )
+            logger.connection.commit()
+            await message.nack(requeue=True)
+        finally:
+            scheduler.done(body['uuid'] if order_by_uuid else None)
+            dispatch()
+
+    def dispatch():
+        """Starts as many of the scheduled requests as there is room for"""
+        while not stopping:
+            item = scheduler.pop()
+            if item is None:
+                return
+            body, message, received_at = item
+            # the task copies the current context, so its logs use the
+            # levels for this response queue
+            with loglevels.for_response_queue(body['response_queue']):
+                task = asyncio.ensure_future(handle_request_safely(body, message, received_at))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+    async def log_stats():
+        time_btwn_stats = timedelta(hours=1)
+        while True:
+            await asyncio.sleep(time_btwn_stats.total_seconds())
+            if logger.enabled(Level.DEBUG):
+                logger.print(
+                    Level.DEBUG, 'Response queue registry stats: {}', response_queues.stats()
+                )
+                for username, account_stats in accounts.stats().items():
+                    logger.print(Level.DEBUG, 'Account {} stats: {}', username, account_stats)
+                for host, host_stats in get_transport().stats().items():
+                    logger.print(
+                        Level.DEBUG,
+                        'Connections to {}: {} requests, {} new connections, {} reused connections',
+                        host, host_stats['requests'], host_stats['new_connections'],
+                        host_stats['reused_connections']
+                    )
+                logger.print(Level.DEBUG, 'Response cache stats: {}', response_cache.stats())
+                logger.print(Level.DEBUG, 'Coalescing stats: {}', coalescer.stats())
+                logger.print(Level.DEBUG, 'Expiry stats: {}', expiry.stats())
+                logger.print(Level.DEBUG, 'Timing stats: {}', timing_stats.stats())
+                if recording.get_replayer() is not None:
+                    logger.print(Level.DEBUG, 'Replay stats: {}', recording.get_replayer().stats())
+                if recording.get_recorder() is not None:
+                    logger.print(
+                        Level.DEBUG, 'Recording stats: {}', recording.get_recorder().stats()
+                    )
+                logger.print(Level.DEBUG, 'Scheduler stats: {}', scheduler.stats())
+                logger.print(Level.DEBUG, 'Backpressure stats: {}', backpressure.stats())
+            logger.connection.commit()
+
+    stats_logger = asyncio.ensure_future(log_stats())
+    try:
+        async for message in consume():
+            received_at = time.monotonic()
+            body = _parse_request(logger, message.body)
+            if body is None:
+                logger.connection.commit()
+                await message.reject(requeue=False)
+                continue
+
+            with loglevels.for_response_queue(body['response_queue']):
+                queue_state = _check_response_queue(logger, response_queues, body)
+            if queue_state == 'outdated':
+                logger.connection.commit()
+                await message.reject(requeue=False)
+                continue
+            if (
+                    not body['response_queue'].startswith('void')
+                    and not response_queues.is_declared(body['response_queue'])):
+                await channel.declare_queue(body['response_queue'])
+                response_queues.mark_declared(body['response_queue'])
+            logger.connection.commit()
+
+            if body['type'] not in handlers_by_name:
+                logger.print(
+                    Level.WARN,
+                    'Received request to response queue {} with an unknown type {}',
+                    body['response_queue'], body['type']
+                )
+                logger.connection.commit()
+                await message.reject(requeue=False)
+                continue
+
+            if body.get('account') is not None and accounts.get(body['account']) is None:
+                logger.print(
+                    Level.WARN,
+                    'Received request to response queue {} pinned to an unknown account {}',
+                    body['response_queue'], body['account']
+                )
+                logger.connection.commit()
+                await message.reject(requeue=False)
+                continue
+
+            scheduler.push(
+                (body, message, received_at),
+                _get_priority(handlers_by_name[body['type']], body),
+                body['sent_at'],
+                key=body['uuid'] if order_by_uuid else None
+            )
+            dispatch()
+    finally:
+        stopping = True
+        stats_logger.cancel()
+        for task in list(in_flight):
+            task.cancel()
+        response_queues.stop()
+        accounts.stop()
+        metrics.registry.stop_server()
+
+
+async def _timed_consume(messages, idle_counter):
+    """The asyncio equivalent of handlers.manager._timed_consume"""
+    idle_since = time.monotonic()
+    async for message in messages:
+        idle_counter.inc(time.monotonic() - idle_since)
+        yield message
+        idle_since = time.monotonic()
+
+
+async def _auth(reddit, logger, credentials):
+    raw_resp = await reddit.login(
+        credentials.username, credentials.password,
+        credentials.client_id, credentials.client_secret
+    )
+    if raw_resp.status_code < 200 or raw_resp.status_code > 299:
+        logger.print(
+            Level.WARN,
+            'Failed to login as {}; got status code {}',
+            credentials.username, raw_resp.status_code
+        )
+        return None
+
+    logger.print(Level.DEBUG, 'Successfully relogged in as {}', credentials.username)
+    return Auth.from_response(raw_resp)
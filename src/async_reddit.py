@@ -0,0 +1,272 @@
+"""The asyncio counterpart to reddit.py. AsyncReddit has a coroutine for each
+function on Reddit with the same name, arguments and docstring.
+
+The endpoints themselves are shared with Reddit rather than reimplemented:
+each endpoint describes the request it would make (see connections.describe)
+and that request is then made with aiohttp rather than requests.
+"""
+import asyncio
+from datetime import timedelta
+import functools
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+import aiohttp
+from requests.exceptions import HTTPError
+from requests.structures import CaseInsensitiveDict
+import connections
+import recording
+from reddit import EndpointHooks, install_endpoints, _copy_signature
+
+
+class AsyncResponse:
+    """A completely read response from aiohttp which acts like the parts of
+    requests.Response that the handlers and Auth use.
+
+    :param status_code: The HTTP status code of the response
+    :param headers: The case-insensitive dict of response headers
+    :param content: The body of the response, in bytes
+    :param url: The url which was requested
+    :param elapsed: The timedelta from sending the request until the body was
+        read
+    """
+    def __init__(self, status_code, headers, content, url, elapsed=None):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.url = url
+        self.elapsed = elapsed
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if 400 <= self.status_code < 600:
+            raise HTTPError(f'{self.status_code} Error for url: {self.url}', response=self)
+
+
+class AsyncTransport:
+    """Makes the requests described by endpoints using a single keep-alive
+    aiohttp session. This is the asyncio equivalent of connections.SessionPool
+    and accepts the same configuration.
+
+    :param pool_size: The maximum number of connections kept alive per host
+    :param retries: How many times to retry a request which failed to connect
+    :param connect_timeout: Seconds to wait for a connection to be established
+    :param read_timeout: Seconds to wait between bytes from the server
+    """
+    def __init__(self, pool_size, retries, connect_timeout, read_timeout):
+        self.pool_size = pool_size
+        self.retries = retries
+        self.timeout = aiohttp.ClientTimeout(
+            sock_connect=connect_timeout, sock_read=read_timeout
+        )
+        self.session = None
+        self.counters_by_host = {}
+
+    async def request(self, description):
+        """Make the request described by the given RequestDescription and
+        return the AsyncResponse, or replay the response to it if we are
+        replaying (see recording.py)."""
+        replayer = recording.get_replayer()
+        if replayer is not None:
+            return await self._replay(replayer, description)
+
+        if self.session is None:
+            self.session = self._create_session()
+
+        kwargs = {}
+        for key in ('headers', 'params', 'data'):
+            val = description.kwargs.get(key)
+            if isinstance(val, dict):
+                # requests silently drops None values, aiohttp does not
+                val = dict((k, v) for k, v in val.items() if v is not None)
+            if val is not None:
+                kwargs[key] = val
+
+        url = connections.override_url(description.url)
+        host = urlsplit(url).hostname
+        self._count(host, 'requests')
+        for attempt in range(self.retries + 1):
+            started_at = time.monotonic()
+            try:
+                async with self.session.request(description.method, url, **kwargs) as resp:
+                    content = await resp.read()
+                    result = AsyncResponse(
+                        resp.status, CaseInsensitiveDict(resp.headers), content, str(resp.url),
+                        elapsed=timedelta(seconds=time.monotonic() - started_at)
+                    )
+                break
+            except aiohttp.ClientConnectorError:
+                if attempt >= self.retries:
+                    raise
+                await asyncio.sleep(0.5 * (2 ** attempt))
+
+        recorder = recording.get_recorder()
+        if recorder is not None:
+            recorder.record(
+                _request_key(description), result.status_code, result.headers,
+                result.content, result.elapsed.total_seconds()
+            )
+        return result
+
+    def stats(self):
+        """Get the connection counters for each host, in the same format as
+        connections.SessionPool.stats"""
+        result = {}
+        for host, counters in list(self.counters_by_host.items()):
+            result[host] = {
+                'requests': counters.get('requests', 0),
+                'new_connections': counters.get('new_connections', 0),
+                'reused_connections': counters.get('reused_connections', 0)
+            }
+        return result
+
+    async def close(self):
+        """Closes all the connections held by this transport"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _replay(self, replayer, description):
+        status_code, headers, content, elapsed, delay = replayer.replay(
+            _request_key(description)
+        )
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return AsyncResponse(
+            status_code, CaseInsensitiveDict(headers), content, description.url,
+            elapsed=timedelta(seconds=elapsed)
+        )
+
+    def _count(self, host, key):
+        counters = self.counters_by_host.setdefault(host, {})
+        counters[key] = counters.get(key, 0) + 1
+
+    def _create_session(self):
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_connection_create_end(session, ctx, params):
+            self._count(ctx.host, 'new_connections')
+
+        async def on_connection_reuseconn(session, ctx, params):
+            self._count(ctx.host, 'reused_connections')
+
+        async def on_request_start(session, ctx, params):
+            ctx.host = params.url.host
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit_per_host=self.pool_size),
+            timeout=self.timeout,
+            trace_configs=[trace_config]
+        )
+
+
+class AsyncReddit(EndpointHooks):
+    """The asyncio equivalent of Reddit. Every function on Reddit is available
+    as a coroutine with the same name and arguments on this class, which
+    resolves to an AsyncResponse.
+
+    Observers and middleware are added as on Reddit, see EndpointHooks, and
+    are called on the event loop. The functions which middleware wrap are
+    coroutine functions.
+
+    Like on Reddit, the endpoint modules are only imported when the
+    coroutines are first called.
+
+    :param transport: The AsyncTransport to make requests with
+    """
+    def __init__(self, transport):
+        super().__init__()
+        self.transport = transport
+
+
+class BlockingReddit:
+    """Allows code which expects a Reddit instance, such as the handlers, to
+    run on a thread other than the event loop while the requests are still
+    made by an AsyncReddit on the event loop.
+
+    :param async_reddit: The AsyncReddit to make requests with
+    :param loop: The event loop the async_reddit is running on
+    """
+    def __init__(self, async_reddit, loop):
+        self.async_reddit = async_reddit
+        self.loop = loop
+
+    def __getattr__(self, name):
+        func = getattr(self.async_reddit, name)
+
+        def wrapped(*args, **kwargs):
+            return asyncio.run_coroutine_threadsafe(
+                func(*args, **kwargs), self.loop
+            ).result()
+
+        wrapped.__name__ = wrapped.__qualname__ = name
+        wrapped.__doc__ = func.__doc__
+        return wrapped
+
+
+def _request_key(description):
+    return recording.request_key(
+        description.method, description.url,
+        description.kwargs.get('params'), description.kwargs.get('data')
+    )
+
+
+def _wrap_endpoint(endpoint):
+    name = endpoint.name
+    make_request = endpoint.make_request
+
+    async def wrapped(self, *args, **kwargs):
+        func = functools.partial(_request, self.transport, make_request)
+        return await self._dispatch(name, func, _observed)(*args, **kwargs)
+
+    _copy_signature(wrapped, endpoint)
+    return wrapped
+
+
+def _observed(name, func, observers):
+    async def observed(*args, **kwargs):
+        result = await func(*args, **kwargs)
+        for observer in observers:
+            observer(name, result)
+        return result
+
+    observed.__name__ = observed.__qualname__ = name
+    return observed
+
+
+async def _request(transport, make_request, *args, **kwargs):
+    return await transport.request(connections.describe(make_request, *args, **kwargs))
+
+
+install_endpoints(AsyncReddit, _wrap_endpoint)
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """Get the shared AsyncTransport, initializing it from the environment on
+    the first call."""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = AsyncTransport(
+                int(os.environ.get('REDDIT_POOL_SIZE', '4')),
+                int(os.environ.get('REDDIT_CONNECT_RETRIES', '2')),
+                float(os.environ.get('REDDIT_CONNECT_TIMEOUT_S', '5')),
+                float(os.environ.get('REDDIT_READ_TIMEOUT_S', '60'))
+            )
+        return _transport
@@ -0,0 +1,262 @@
+"""Keeps a valid reddit authorization available without making requests wait
+on logging in.
+
+The authorization is saved to a file which only the current user can read,
+so that it can be reused after a restart while it's still valid, and a
+background thread logs in again shortly before it expires. Several proxy
+processes may share the file, so changes to it are made under a lock on a
+separate lock file, since the file itself is replaced on every change.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+from auth import Auth
+
+
+class AuthStore:
+    """Saves authorizations to a JSON file, keyed by the reddit username they
+    belong to. The file is created readable only by the current user and is
+    always replaced atomically. Changes are serialized with every other store
+    using the same file, in this process or another, through `path + '.lock'`.
+
+    :param path: The path to the file
+    :param on_error: Optional. Called with a description of what failed while
+        handling the exception whenever reading the file fails, after which
+        the saved authorizations are ignored
+    """
+    def __init__(self, path, on_error=None):
+        self.path = path
+        self.on_error = on_error
+        self.lock = threading.Lock()
+
+    def load(self, username, client_id):
+        """Get the saved authorization for the given account, or None if there
+        isn't one or it has expired"""
+        with self.lock:
+            saved = self._read().get(username)
+        if saved is None or saved.get('client_id') != client_id:
+            return None
+        auth = Auth(
+            access_token=saved['access_token'],
+            token_type=saved['token_type'],
+            expires_at=datetime.fromtimestamp(saved['expires_at']),
+            scope=saved['scope']
+        )
+        if auth.expires_at <= datetime.now():
+            return None
+        return auth
+
+    def save(self, username, client_id, auth):
+        """Saves the given authorization for the given account"""
+        with self.lock, self._locked():
+            saved = self._read()
+            saved[username] = {
+                'client_id': client_id,
+                'access_token': auth.access_token,
+                'token_type': auth.token_type,
+                'expires_at': auth.expires_at.timestamp(),
+                'scope': auth.scope
+            }
+            self._write(saved)
+
+    def forget(self, username):
+        """Removes the saved authorization for the given account, if any"""
+        with self.lock, self._locked():
+            saved = self._read()
+            if saved.pop(username, None) is not None:
+                self._write(saved)
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError):
+            if self.on_error is not None:
+                self.on_error(
+                    f'Failed to read saved authorizations from {self.path}; ignoring them'
+                )
+            return {}
+
+    @contextmanager
+    def _locked(self):
+        fd = os.open(self.path + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            # closing the file releases the lock
+            os.close(fd)
+
+    def _write(self, saved):
+        # mkstemp creates the file readable only by us, with a name no other
+        # writer uses
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(self.path) or '.',
+            prefix=os.path.basename(self.path) + '.',
+            suffix='.tmp'
+        )
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(saved, f)
+            os.replace(tmp_path, self.path)
+        except:  # noqa: E722
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+
+class AuthRefresher:
+    """Holds the current authorization for an account and logs in again on a
+    background thread before it expires.
+
+    :param login: A callable which takes no arguments and logs in, returning
+        the new Auth or None if we failed to login. Called from the background
+        thread, or from whichever thread calls refresh().
+    :param username: The reddit username the authorization is for
+    :param client_id: The reddit client id the authorization is for
+    :param store: The AuthStore to load and save the authorization with, or
+        None to not save it
+    :param refresh_ahead: How many seconds before the authorization expires
+        that we log in again
+    :param retry_delay: How many seconds to wait after failing to login in the
+        background before trying again
+    :param on_error: Optional. Called with a description of what failed while
+        handling the exception whenever logging in raises or saving the new
+        authorization fails
+    """
+    def __init__(self, login, username, client_id, store=None, refresh_ahead=300,
+                 retry_delay=30, on_error=None):
+        self.login = login
+        self.username = username
+        self.client_id = client_id
+        self.store = store
+        self.refresh_ahead = timedelta(seconds=refresh_ahead)
+        self.retry_delay = retry_delay
+        self.on_error = on_error
+        self.min_time_to_expiry = timedelta(minutes=1)
+        self.auth = store.load(username, client_id) if store is not None else None
+        self.loaded_from_store = self.auth is not None
+        self.cond = threading.Condition()
+        self.login_lock = threading.Lock()
+        self.stopped = False
+        self.thread = None
+        self.num_refreshes = 0
+        self.num_failures = 0
+        self.failing = False
+
+    def current(self):
+        """Get the current authorization, or None if there isn't one which is
+        valid for at least another minute"""
+        with self.cond:
+            auth = self.auth
+        if auth is None or auth.expires_at < datetime.now() + self.min_time_to_expiry:
+            return None
+        return auth
+
+    def refresh(self):
+        """Logs in now unless another thread already did while we were waiting
+        to, and returns the current authorization or None if we failed to
+        login"""
+        stale = self.auth
+        with self.login_lock:
+            if self.auth is not stale:
+                current = self.current()
+                if current is not None:
+                    return current
+            return self._login()
+
+    def invalidate(self, bad_auth):
+        """Discards the given authorization, e.g., after reddit rejects it,
+        unless it's already been replaced. The background thread logs in again
+        right away."""
+        with self.cond:
+            if self.auth is not bad_auth:
+                return
+            self.auth = None
+            self.cond.notify_all()
+        if self.store is not None:
+            self.store.forget(self.username)
+
+    def start(self):
+        """Starts refreshing in the background"""
+        self.thread = threading.Thread(target=self._run, name='auth-refresher', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stops refreshing in the background. This doesn't wait for a login
+        which is in progress to finish."""
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+
+    def stats(self):
+        """Get a dict describing the current authorization and refreshes"""
+        with self.cond:
+            return {
+                'expires_at': self.auth.expires_at if self.auth is not None else None,
+                'loaded_from_store': self.loaded_from_store,
+                'refreshes': self.num_refreshes,
+                'failures': self.num_failures,
+                'failing': self.failing
+            }
+
+    def _login(self):
+        try:
+            auth = self.login()
+        except:  # noqa: E722
+            if self.on_error is not None:
+                self.on_error(f'Failed to login as {self.username}')
+            auth = None
+
+        with self.cond:
+            self.failing = auth is None
+            if auth is None:
+                self.num_failures += 1
+                return None
+            self.auth = auth
+            self.num_refreshes += 1
+            self.cond.notify_all()
+
+        if self.store is not None:
+            try:
+                self.store.save(self.username, self.client_id, auth)
+            except OSError:
+                if self.on_error is not None:
+                    self.on_error(
+                        f'Failed to save the authorization for {self.username}; '
+                        'continuing anyway'
+                    )
+        return auth
+
+    def _run(self):
+        retry_at = None
+        while True:
+            with self.cond:
+                if self.stopped:
+                    return
+                wait = 0
+                if self.auth is not None:
+                    wait = (
+                        self.auth.expires_at - self.refresh_ahead - datetime.now()
+                    ).total_seconds()
+                if retry_at is not None:
+                    wait = max(wait, retry_at - time.monotonic())
+                if wait > 0:
+                    # we may be woken early by invalidate() or stop()
+                    self.cond.wait(wait)
+                    continue
+
+            with self.login_lock:
+                if self._login() is None:
+                    retry_at = time.monotonic() + self.retry_delay
+                else:
+                    retry_at = None
@@ -0,0 +1,130 @@
+"""Decides how long an account waits after reddit throttles it.
+
+Reddit throttles an account with a 429 (or a 503 with Retry-After) when it
+makes requests too quickly. Unlike other failures this applies to every
+request made with the account, so every request waits until it's over. How
+long that is comes from, in order of preference:
+
+- The Retry-After header, in seconds or as an HTTP date, plus up to
+  base_delay seconds of jitter so that processes sharing the account don't all
+  come back at once.
+- The ratelimit headers, if they say the budget is spent, in which case we
+  wait for the window to reset.
+- Otherwise decorrelated jitter: a random delay between base_delay and three
+  times the previous delay, so repeated throttles back off quickly without
+  every process backing off in lockstep.
+
+No delay is longer than max_delay. The first response which isn't throttled
+clears the backoff entirely, so we go back to full speed as soon as reddit
+allows it rather than slowly undoing earlier failures.
+"""
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import random
+import threading
+import time
+
+
+class ThrottleBackoff:
+    """The backoff for one account. Thread-safe.
+
+    :param base_delay: The shortest delay in seconds after being throttled
+        without a Retry-After, and the most jitter added to a Retry-After
+    :param max_delay: The longest delay in seconds
+    """
+    def __init__(self, base_delay, max_delay):
+        self.base_delay = base_delay
+        self.max_delay = max(base_delay, max_delay)
+        self.lock = threading.Lock()
+        self.last_delay = 0.0
+        self.until = None
+        self.reason = None
+        self.num_throttled = 0
+        self.total_delay = 0.0
+
+    def record(self, status_code, headers):
+        """Records a response from reddit.
+
+        :param status_code: The status code of the response
+        :param headers: The case-insensitive headers of the response
+        :return: None if this response wasn't throttled, otherwise a tuple of
+            the seconds we'll wait and why, one of 'retry-after', 'ratelimit'
+            or 'jitter'
+        """
+        retry_after = _retry_after(headers) if status_code in (429, 503) else None
+        if status_code != 429 and retry_after is None:
+            if self.until is not None:
+                with self.lock:
+                    self.last_delay = 0.0
+                    self.until = None
+                    self.reason = None
+            return None
+
+        with self.lock:
+            if retry_after is not None:
+                delay = retry_after + random.uniform(0, self.base_delay)
+                reason = 'retry-after'
+            elif _budget_spent(headers):
+                delay = float(headers['x-ratelimit-reset'])
+                reason = 'ratelimit'
+            else:
+                delay = random.uniform(self.base_delay, max(self.base_delay, self.last_delay * 3))
+                reason = 'jitter'
+            delay = min(max(delay, 0.0), self.max_delay)
+
+            self.last_delay = delay
+            self.until = time.monotonic() + delay
+            self.reason = reason
+            self.num_throttled += 1
+            self.total_delay += delay
+        return delay, reason
+
+    def remaining(self):
+        """Get how many more seconds requests should wait"""
+        until = self.until
+        if until is None:
+            return 0
+        return max(0, until - time.monotonic())
+
+    def stats(self):
+        """Get a dict describing the current backoff and past throttling"""
+        with self.lock:
+            return {
+                'backoff_seconds': round(self.remaining(), 3),
+                'reason': self.reason,
+                'last_delay_seconds': round(self.last_delay, 3),
+                'num_throttled': self.num_throttled,
+                'total_delay_seconds': round(self.total_delay, 3)
+            }
+
+
+def _retry_after(headers):
+    """Get the seconds from the Retry-After header, or None if there isn't a
+    valid one"""
+    value = headers.get('retry-after')
+    if value is None:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when is None:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def _budget_spent(headers):
+    try:
+        return (
+            float(headers['x-ratelimit-remaining']) <= 0
+            and float(headers['x-ratelimit-reset']) > 0
+        )
+    except (KeyError, ValueError):
+        return False
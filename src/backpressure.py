@@ -0,0 +1,117 @@
+"""Stops consuming requests while we couldn't make them anyway, so that they
+go to another consumer of the queue which can.
+
+A request which has to wait on the ratelimit budget of its account, or on the
+backoff after reddit throttled the account, holds its message the whole time,
+as do the requests prefetched behind it. If the wait is long, another
+instance of the proxy could have handled them in the meantime. So once a
+request would have to wait at least `threshold` seconds it is given back to
+the queue.
+
+Other requests may use an account which is ready, so we keep consuming while
+any account could make a request within the threshold. Since the broker
+would redeliver a request we give back straight to us while we're consuming,
+it's given back only after `RELEASE_DELAY_S` seconds (or the wait, if
+shorter). Only once every account would have to wait that long do we stop
+consuming, give back every request we received but haven't started, and
+start consuming again once the first account is ready.
+
+Requests which are already waiting keep their messages; only requests which
+would start waiting are given back.
+"""
+import threading
+import time
+
+RELEASE_DELAY_S = 1
+"""The most seconds we hold on to a request we're giving back while we keep
+consuming"""
+
+
+class Backpressure:
+    """Decides when to stop consuming and for how long. Thread-safe.
+
+    :param threshold: The fewest seconds a request would have to wait before
+        it could be made to reddit for it to be given back to the queue
+        instead, or 0 to never stop consuming
+    """
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.paused_at = None
+        self.until = None
+        self.num_pauses = 0
+        self.num_released = 0
+        self.total_paused = 0.0
+
+    def should_release(self, wait):
+        """Determines if a request which would have to wait the given number
+        of seconds should be given back to the queue instead"""
+        return self.threshold > 0 and wait >= self.threshold
+
+    def release_delay(self, wait):
+        """Get how many seconds to hold on to a request which would have to
+        wait the given number of seconds before giving it back, if we're
+        still consuming"""
+        return min(wait, RELEASE_DELAY_S)
+
+    def pause(self, waits):
+        """Stops consuming if every account would have to wait at least the
+        threshold before it could make a request, until the first of them
+        could.
+
+        :param waits: The seconds until each account could make a request
+        :return: True if we were consuming until now and this stopped it, in
+            which case the caller has to stop consuming, otherwise False
+        """
+        seconds = min(waits)
+        if not self.should_release(seconds):
+            return False
+        now = time.monotonic()
+        with self.lock:
+            if self.until is not None:
+                self.until = max(self.until, now + seconds)
+                return False
+            self.paused_at = now
+            self.until = now + seconds
+            self.num_pauses += 1
+            return True
+
+    def paused(self):
+        """Determines if we are supposed to not be consuming, even if the
+        pause is over and we just haven't resumed yet"""
+        return self.until is not None
+
+    def remaining(self):
+        """Get how many more seconds we should not consume for"""
+        until = self.until
+        if until is None:
+            return 0
+        return max(0, until - time.monotonic())
+
+    def resume(self):
+        """Called once we are consuming again.
+
+        :return: How many seconds we weren't consuming for
+        """
+        with self.lock:
+            paused_for = time.monotonic() - self.paused_at
+            self.total_paused += paused_for
+            self.paused_at = None
+            self.until = None
+            return paused_for
+
+    def record_released(self, count):
+        """Records that we gave the given number of requests back to the
+        queue"""
+        with self.lock:
+            self.num_released += count
+
+    def stats(self):
+        """Get a dict describing the current pause, if any, and past ones"""
+        with self.lock:
+            return {
+                'paused_seconds': round(self.remaining(), 3),
+                'pauses': self.num_pauses,
+                'released': self.num_released,
+                'total_paused_seconds': round(self.total_paused, 3)
+            }
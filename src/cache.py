@@ -0,0 +1,142 @@
+"""A bounded in-memory cache of handler results, so that repeatedly asking
+about the same subject within a short window doesn't spend our reddit
+ratelimit budget each time.
+
+Handlers opt in by setting the attribute "cache_ttl_seconds" to the number of
+seconds their results may be reused for. Handlers which change state on reddit
+may set "cache_invalidates" to a list of handler names whose cached results
+should be discarded when they succeed, e.g., approving a user invalidates
+"user_is_approved". Only successful (2xx) results are cached.
+
+Requests may also control the cache with the following optional packet
+fields:
+
+- `no_cache`: If true, the cache is not consulted for this request, though the
+  fresh result is still stored.
+- `max_age`: The maximum age in seconds of a cached result that is acceptable
+  for this request.
+"""
+from collections import OrderedDict
+import json
+import threading
+import time
+
+
+class ResponseCache:
+    """A thread-safe TTL + LRU cache of handler results keyed by the request
+    type, arguments and the account the request is pinned to, if any.
+
+    :param max_entries: The maximum number of results to hold at once; the
+        least recently used result is evicted to make room for new ones.
+    """
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def lookup(self, handler, body):
+        """Get the cached result for the given request, if there is one which
+        is acceptable.
+
+        :param handler: The handler which would handle the request
+        :param body: The request packet
+        :return: None if there is no acceptable result, otherwise a tuple
+            (status, info, age) where age is how old the result is in seconds
+        """
+        ttl = getattr(handler, 'cache_ttl_seconds', None)
+        if not ttl or self.max_entries <= 0 or body.get('no_cache'):
+            return None
+
+        max_age = ttl
+        if body.get('max_age') is not None:
+            max_age = min(max_age, body['max_age'])
+
+        key = _cache_key(handler.name, body['args'], body.get('account'))
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            age = time.monotonic() - entry['stored_at']
+            if age > ttl:
+                del self.entries[key]
+                self.misses += 1
+                return None
+            if age > max_age:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry['status'], entry['info'], age
+
+    def store(self, handler, body, status, info):
+        """Stores the result of handling the given request, if the handler
+        allows it, and invalidates any cached results made stale by it."""
+        is_int_status = isinstance(status, int)
+        if status != 'success' and not (is_int_status and 200 <= status <= 299):
+            return
+
+        invalidates = getattr(handler, 'cache_invalidates', None)
+        if invalidates:
+            self.invalidate(invalidates, body['args'])
+
+        if (
+                not is_int_status
+                or not getattr(handler, 'cache_ttl_seconds', None)
+                or self.max_entries <= 0):
+            return
+
+        key = _cache_key(handler.name, body['args'], body.get('account'))
+        with self.lock:
+            self.entries[key] = {
+                'type': handler.name,
+                'args': body['args'],
+                'status': status,
+                'info': info,
+                'stored_at': time.monotonic()
+            }
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, types, args):
+        """Discards cached results for any of the given request types whose
+        arguments agree with the given arguments on every key they share."""
+        with self.lock:
+            for key, entry in list(self.entries.items()):
+                if entry['type'] not in types:
+                    continue
+                shared = set(entry['args'].keys()) & set(args.keys())
+                if all(_same_arg(entry['args'][k], args[k]) for k in shared):
+                    del self.entries[key]
+                    self.invalidations += 1
+
+    def stats(self):
+        """Get a dict with the current size and counters of this cache"""
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+
+def _cache_key(request_type, args, account):
+    # requests pinned to an account may see what only that account can
+    return (request_type, json.dumps(args, sort_keys=True), account)
+
+
+def _same_arg(a, b):
+    # reddit names are case-insensitive, and invalidating too much is harmless
+    if isinstance(a, str) and isinstance(b, str):
+        return a.lower() == b.lower()
+    return a == b
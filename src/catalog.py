@@ -0,0 +1,113 @@
+"""Declares the endpoint and handler modules and the names each registers, so
+that they can be imported when first used rather than found by walking the
+endpoints/ and handlers/ folders at startup, which also depended on the
+working directory.
+
+A new endpoint or handler module must be added here along with the names it
+registers. Loading a module which registers different names than it declares
+raises a ValueError, so a stale declaration is noticed the first time the
+module is used.
+
+Every module imported through this catalog is timed, see import_times.
+"""
+import importlib
+import threading
+import time
+
+
+ENDPOINT_MODULES = {
+    'endpoints.accounts': (
+        'show_user', 'user_is_moderator', 'user_is_approved', 'user_is_banned'
+    ),
+    'endpoints.auth': ('login', 'revoke_auth'),
+    'endpoints.comments': ('subreddit_comments', 'post_comment', 'lookup_comment'),
+    'endpoints.friends': ('subreddit_friend', 'subreddit_unfriend'),
+    'endpoints.links': ('subreddit_links', 'flair_link'),
+    'endpoints.messages': ('unread', 'compose', 'mark_all_read'),
+    'endpoints.modlog': ('modlog',),
+    'endpoints.subreddits': ('subreddit_moderators',)
+}
+"""Maps each endpoint module to the names of the endpoints it registers"""
+
+HANDLER_MODULES = {
+    'handlers.accounts': (
+        'show_user', 'user_is_moderator', 'user_is_approved', 'user_is_banned'
+    ),
+    'handlers.comments': ('subreddit_comments', 'post_comment', 'lookup_comment'),
+    'handlers.friends': ('ban_user', 'unban_user', 'approve_user', 'disapprove_user'),
+    'handlers.links': ('subreddit_links', 'flair_link'),
+    'handlers.messages': ('inbox', 'compose', 'mark_all_read'),
+    'handlers.modlog': ('modlog',),
+    'handlers.ping': ('_ping',),
+    'handlers.subreddits': ('subreddit_moderators',)
+}
+"""Maps each handler module to the names of the handlers it registers"""
+
+_ENDPOINT_MODULE_BY_NAME = dict(
+    (name, module_name)
+    for module_name, names in ENDPOINT_MODULES.items()
+    for name in names
+)
+
+_import_times = {}
+_import_times_lock = threading.Lock()
+
+
+def endpoint_module(name):
+    """Get the name of the module which registers the endpoint with the given
+    name, or None if there is no such endpoint"""
+    return _ENDPOINT_MODULE_BY_NAME.get(name)
+
+
+def load_endpoints(module_name, headers):
+    """Imports the given endpoint module and returns the endpoints it
+    registers.
+
+    :param module_name: The name of the module, a key of ENDPOINT_MODULES
+    :param headers: The default headers to pass to the endpoints
+    :return: The list of endpoint instances
+    """
+    endpoints = []
+    timed_import(module_name).register_endpoints(endpoints, headers)
+    _check_names(module_name, ENDPOINT_MODULES[module_name], endpoints)
+    return endpoints
+
+
+def load_handlers(module_name):
+    """Imports the given handler module and returns the handlers it
+    registers.
+
+    :param module_name: The name of the module, a key of HANDLER_MODULES
+    :return: The list of handler instances
+    """
+    handlers = []
+    timed_import(module_name).register_handlers(handlers)
+    _check_names(module_name, HANDLER_MODULES[module_name], handlers)
+    return handlers
+
+
+def timed_import(module_name):
+    """Imports the module with the given name, recording how long it took if
+    it wasn't already imported"""
+    started_at = time.perf_counter()
+    module = importlib.import_module(module_name)
+    elapsed = time.perf_counter() - started_at
+    with _import_times_lock:
+        if module_name not in _import_times:
+            _import_times[module_name] = elapsed
+    return module
+
+
+def import_times():
+    """Get the seconds each module imported through this catalog took to
+    import, slowest first"""
+    with _import_times_lock:
+        return dict(sorted(_import_times.items(), key=lambda item: -item[1]))
+
+
+def _check_names(module_name, declared, registered):
+    names = tuple(sorted(item.name for item in registered))
+    if names != tuple(sorted(declared)):
+        raise ValueError(
+            f'{module_name} registers {names} but the catalog declares {tuple(sorted(declared))}'
+        )
@@ -0,0 +1,139 @@
+"""Coalesces identical read requests so that only one request is made to
+reddit for all of them.
+
+Two requests are identical if they have the same type and arguments and are
+pinned to the same account, if any (see credentials.py). A request may share
+the result of an identical request if we received it before that request was
+made to reddit, since then the shared result is at least as fresh as the one
+it would have gotten on its own. This covers both requests that arrive while
+the identical request is still in flight and requests that were waiting behind
+it in the scheduler. This is measured with our own monotonic clock rather than
+the `sent_at` of the request, so that it doesn't depend on the clock of the
+sender.
+
+Results which are likely to be different if asked again, i.e., being
+throttled (429) or server errors (5xx), are only shared with requests which
+arrive while they are in flight. Otherwise a retry of the request would get
+back the same failure.
+
+Handlers opt in by setting the attribute "coalesce" to True. This should only
+be set on handlers which don't change anything on reddit.
+"""
+from collections import OrderedDict
+import json
+import threading
+import time
+
+
+class Coalescer:
+    """Tracks in-flight and recently finished coalescable requests. Thread-safe.
+
+    :param window: How many seconds a finished result may be shared for with
+        requests that were received before it was fetched. If 0, only requests
+        which arrive while the identical request is in flight are coalesced.
+    """
+    def __init__(self, window):
+        self.window = window
+        self.in_flight = {}
+        self.finished = OrderedDict()
+        self.lock = threading.Lock()
+        self.num_led = 0
+        self.num_joined = 0
+        self.num_reused = 0
+
+    def begin(self, handler, body, follower, received_at):
+        """Called before handling the given request.
+
+        :param handler: The handler for the request
+        :param body: The request packet
+        :param received_at: When we received the request, according to
+            time.monotonic()
+        :param follower: An object identifying this request to the caller,
+            which is returned from finish() if this request joins an
+            identical request which is in flight.
+        :return: One of the following tuples:
+            ('lead', key): This request should be handled normally, and then
+                finish(key, ...) must be called with the result.
+            ('joined', None): An identical request is in flight; the follower
+                will be returned from finish() for that request.
+            ('reuse', (status, info)): An identical request finished recently
+                enough that its result may be reused.
+            ('skip', None): This request can't be coalesced.
+        """
+        if not getattr(handler, 'coalesce', False):
+            return 'skip', None
+
+        key = (handler.name, json.dumps(body['args'], sort_keys=True), body.get('account'))
+        now = time.monotonic()
+        with self.lock:
+            self._prune(now)
+
+            finished = self.finished.get(key)
+            if finished is not None and received_at <= finished['started_at']:
+                self.num_reused += 1
+                return 'reuse', (finished['status'], finished['info'])
+
+            flight = self.in_flight.get(key)
+            if flight is not None and received_at <= flight['started_at']:
+                flight['followers'].append(follower)
+                self.num_joined += 1
+                return 'joined', None
+
+            if flight is not None:
+                # received after the in-flight request started, so we can't share
+                # its result; handle it on its own
+                return 'skip', None
+
+            self.in_flight[key] = {'started_at': now, 'followers': []}
+            self.num_led += 1
+            return 'lead', key
+
+    def finish(self, key, status, info):
+        """Called with the result of a request which was told to lead.
+
+        :return: The followers which joined this request and should be
+            answered with the same result
+        """
+        with self.lock:
+            flight = self.in_flight.pop(key)
+            if self.window > 0 and not _transient(status):
+                self.finished.pop(key, None)
+                self.finished[key] = {
+                    'started_at': flight['started_at'],
+                    'finished_at': time.monotonic(),
+                    'status': status,
+                    'info': info
+                }
+            return flight['followers']
+
+    def abandon(self, key):
+        """Called instead of finish if a request which was told to lead will
+        not be handled after all (e.g., we couldn't authenticate).
+
+        :return: The followers which joined this request, which need to be
+            dealt with by the caller
+        """
+        with self.lock:
+            return self.in_flight.pop(key)['followers']
+
+    def stats(self):
+        """Get a dict with the counters for this coalescer"""
+        with self.lock:
+            return {
+                'in_flight': len(self.in_flight),
+                'finished': len(self.finished),
+                'led': self.num_led,
+                'joined': self.num_joined,
+                'reused': self.num_reused
+            }
+
+    def _prune(self, now):
+        while self.finished:
+            key, finished = next(iter(self.finished.items()))
+            if now - finished['finished_at'] <= self.window:
+                break
+            del self.finished[key]
+
+
+def _transient(status):
+    return isinstance(status, int) and (status == 429 or status >= 500)
@@ -0,0 +1,269 @@
+"""Manages the HTTP connections used to talk to reddit. Endpoints should make
+their requests through the module-level get/post functions in this module
+rather than the ones in requests, so that every endpoint shares one pool of
+keep-alive connections per host instead of paying for a new TCP connection
+and TLS handshake on every request.
+"""
+import contextvars
+from datetime import timedelta
+from http.cookiejar import DefaultCookiePolicy
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+import recording
+
+
+class SessionPool:
+    """Keeps one keep-alive requests.Session per host (typically
+    oauth.reddit.com and www.reddit.com), each backed by a bounded pool of
+    connections.
+
+    :param pool_size: The maximum number of connections kept alive per host
+    :param retries: How many times to retry a request which failed to
+        connect. Requests which reached reddit are never retried here, since
+        that's not safe for e.g. posting comments; that's up to the style of
+        the request.
+    :param connect_timeout: Seconds to wait for a connection to be established
+    :param read_timeout: Seconds to wait between bytes from the server
+    """
+    def __init__(self, pool_size, retries, connect_timeout, read_timeout):
+        self.pool_size = pool_size
+        self.retries = retries
+        self.timeout = (connect_timeout, read_timeout)
+        self.sessions = {}
+        self.requests_by_host = {}
+        self.lock = threading.Lock()
+
+    def session_for(self, host):
+        """Get the session for the given host, creating it if necessary"""
+        session = self.sessions.get(host)
+        if session is not None:
+            return session
+
+        with self.lock:
+            session = self.sessions.get(host)
+            if session is None:
+                session = self._create_session()
+                self.sessions[host] = session
+            return session
+
+    def request(self, method, url, **kwargs):
+        """Make a request on the session for the host of the given url. Accepts
+        the same arguments as requests.request; if no timeout is specified the
+        pool timeouts are used."""
+        kwargs.setdefault('timeout', self.timeout)
+        host = urlsplit(url).hostname
+        with self.lock:
+            self.requests_by_host[host] = self.requests_by_host.get(host, 0) + 1
+        return self.session_for(host).request(method, url, **kwargs)
+
+    def stats(self):
+        """Get the connection counters for each host. The result is a dict
+        from the host to a dict with the keys "requests", "new_connections"
+        and "reused_connections"."""
+        with self.lock:
+            requests_by_host = self.requests_by_host.copy()
+        with _connects_lock:
+            connects_by_host = _connects_by_host.copy()
+
+        result = {}
+        for host, num_requests in requests_by_host.items():
+            num_connections = connects_by_host.get(host, 0)
+            result[host] = {
+                'requests': num_requests,
+                'new_connections': num_connections,
+                'reused_connections': max(0, num_requests - num_connections)
+            }
+        return result
+
+    def close(self):
+        """Closes all the connections held by this pool"""
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions = {}
+
+    def _create_session(self):
+        session = requests.Session()
+        # the session is shared by every account, so it must not remember
+        # cookies from one account's responses and send them with another's
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = _CountingAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_size,
+            max_retries=Retry(
+                total=self.retries,
+                read=False,
+                status=0,
+                redirect=0,
+                raise_on_status=False,
+                backoff_factor=0.5
+            )
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+
+_connects_by_host = {}
+_connects_lock = threading.Lock()
+
+
+def _record_connect(host):
+    with _connects_lock:
+        _connects_by_host[host] = _connects_by_host.get(host, 0) + 1
+
+
+class _CountingHTTPConnection(HTTPConnection):
+    def connect(self):
+        super().connect()
+        _record_connect(self.host)
+
+
+class _CountingHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        super().connect()
+        _record_connect(self.host)
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+
+class _CountingAdapter(HTTPAdapter):
+    """An HTTPAdapter whose connections count every time they actually open a
+    socket, which is what lets us tell new connections from reused ones."""
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _CountingHTTPConnectionPool,
+            'https': _CountingHTTPSConnectionPool
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Get the shared session pool, initializing it from the environment on the
+    first call."""
+    global _pool
+    if _pool is not None:
+        return _pool
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = SessionPool(
+                int(os.environ.get('REDDIT_POOL_SIZE', '4')),
+                int(os.environ.get('REDDIT_CONNECT_RETRIES', '2')),
+                float(os.environ.get('REDDIT_CONNECT_TIMEOUT_S', '5')),
+                float(os.environ.get('REDDIT_READ_TIMEOUT_S', '60'))
+            )
+        return _pool
+
+
+class RequestDescription:
+    """Describes a request that an endpoint would make, without making it.
+
+    :param method: The HTTP method, e.g., GET
+    :param url: The url to request, before applying REDDIT_URL_OVERRIDE (see
+        override_url)
+    :param kwargs: The remaining keyword arguments, as if to requests.request
+    """
+    def __init__(self, method, url, kwargs):
+        self.method = method
+        self.url = url
+        self.kwargs = kwargs
+
+
+_describing = contextvars.ContextVar('describing', default=False)
+
+
+def describe(func, *args, **kwargs):
+    """Calls the given function, typically the make_request function of an
+    endpoint, which makes and returns a single request using this module.
+    Instead of actually making the request, the function will return a
+    RequestDescription for it. This allows other transports to reuse the
+    endpoint definitions.
+    """
+    token = _describing.set(True)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _describing.reset(token)
+
+
+REDDIT_HOSTS = frozenset(('oauth.reddit.com', 'www.reddit.com'))
+"""The hosts which are sent to REDDIT_URL_OVERRIDE instead, if it's set"""
+
+_url_override = os.environ.get('REDDIT_URL_OVERRIDE', '').rstrip('/')
+
+
+def override_url(url):
+    """Get the url to actually request for the given url. This is the url
+    itself unless REDDIT_URL_OVERRIDE is set (e.g., to a fake reddit for
+    benchmarks), in which case requests to reddit go there instead."""
+    if not _url_override:
+        return url
+    parts = urlsplit(url)
+    if parts.hostname not in REDDIT_HOSTS:
+        return url
+    return _url_override + url[len(parts.scheme) + 3 + len(parts.netloc):]
+
+
+def request(method, url, **kwargs):
+    """Make a request using the shared session pool, or replay the response to
+    it if we are replaying (see recording.py)"""
+    if _describing.get():
+        return RequestDescription(method, url, kwargs)
+
+    replayer = recording.get_replayer()
+    if replayer is not None:
+        return _replay(replayer, method, url, kwargs)
+
+    resp = get_pool().request(method, override_url(url), **kwargs)
+    recorder = recording.get_recorder()
+    if recorder is not None:
+        recorder.record(
+            recording.request_key(method, url, kwargs.get('params'), kwargs.get('data')),
+            resp.status_code, resp.headers, resp.content, resp.elapsed.total_seconds()
+        )
+    return resp
+
+
+def _replay(replayer, method, url, kwargs):
+    status_code, headers, content, elapsed, delay = replayer.replay(
+        recording.request_key(method, url, kwargs.get('params'), kwargs.get('data'))
+    )
+    if delay > 0:
+        time.sleep(delay)
+    resp = requests.Response()
+    resp.status_code = status_code
+    resp.headers = CaseInsensitiveDict(headers)
+    resp._content = content
+    resp.encoding = 'utf-8'
+    resp.url = url
+    resp.elapsed = timedelta(seconds=elapsed)
+    return resp
+
+
+def get(url, **kwargs):
+    """The equivalent of requests.get using the shared session pool"""
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    """The equivalent of requests.post using the shared session pool"""
+    return request('POST', url, **kwargs)
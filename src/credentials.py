@@ -0,0 +1,139 @@
+"""Manages the reddit accounts we make requests with.
+
+Each account has its own ratelimit budget, so the throughput of the proxy
+grows with the number of accounts. Every account has its own authorization,
+ratelimit state and health, where an account is unhealthy while it is backing
+off after being throttled by reddit or while we are failing to login to it.
+Failures of individual endpoints only affect requests to those endpoints (see
+health.py).
+
+Only handlers which set the attribute "any_account" may be handled by any
+account, since their result doesn't depend on who asks; these go to whichever
+account can make a request soonest. Every other request is handled by the
+primary account (the first one) unless the packet pins it to an account by
+username in the optional `account` field.
+"""
+from dataclasses import dataclass
+import threading
+
+
+@dataclass
+class Credentials:
+    username: str
+    password: str
+    client_id: str
+    client_secret: str
+
+
+class Account:
+    """The state for making requests with one reddit account.
+
+    :param credentials: The Credentials to login with
+    :param reddit: The reddit instance which makes requests for this account,
+        whose responses are reported to record_response()
+    :param ratelimiter: The RateLimiter for this account's budget
+    :param auth_refresher: The AuthRefresher which keeps this account logged in
+    :param health: The EndpointHealth for the requests made with this account
+    :param backoff: The ThrottleBackoff for when reddit throttles this account
+    """
+    def __init__(self, credentials, reddit, ratelimiter, auth_refresher, health, backoff):
+        self.credentials = credentials
+        self.username = credentials.username
+        self.reddit = reddit
+        self.ratelimiter = ratelimiter
+        self.auth_refresher = auth_refresher
+        self.health = health
+        self.backoff = backoff
+        self.lock = threading.Lock()
+        self.num_requests = 0
+
+    def record_response(self, status_code, headers):
+        """Records a response to a request made with this account. Being
+        throttled backs off every request with this account (see backoff.py),
+        whereas other failures are tracked per endpoint by the health instead.
+
+        :return: None unless this response started a backoff, otherwise a
+            tuple of the seconds we're backing off for and why
+        """
+        with self.lock:
+            self.num_requests += 1
+        return self.backoff.record(status_code, headers)
+
+    def backoff_remaining(self):
+        """Get how many more seconds we should wait before the next request
+        with this account because reddit recently throttled it"""
+        return self.backoff.remaining()
+
+    def time_until_ready(self):
+        """Get how many seconds until this account could make another
+        request"""
+        return max(self.backoff_remaining(), self.ratelimiter.time_until_ready())
+
+    def healthy(self):
+        """Determines if this account is usable right now, i.e., we aren't
+        failing to login to it and it isn't backing off after being
+        throttled"""
+        return not self.auth_refresher.failing and self.backoff_remaining() <= 0
+
+    def stats(self):
+        """Get a dict describing the health, ratelimit and authorization of
+        this account"""
+        with self.lock:
+            result = {
+                'requests': self.num_requests
+            }
+        result['backoff'] = self.backoff.stats()
+        result['health'] = self.health.stats()
+        result['ratelimit'] = self.ratelimiter.stats()
+        result['auth'] = self.auth_refresher.stats()
+        return result
+
+
+class CredentialPool:
+    """Chooses which account handles each request.
+
+    :param accounts: The accounts to choose from, starting with the primary
+        account. Must not be empty, and the usernames must be unique.
+    """
+    def __init__(self, accounts):
+        self.accounts = list(accounts)
+        self.primary = self.accounts[0]
+        self.by_username = dict((account.username, account) for account in self.accounts)
+        if len(self.by_username) != len(self.accounts):
+            raise ValueError('each account must have a different username')
+
+    def get(self, username):
+        """Get the account with the given username, or None if there isn't
+        one"""
+        return self.by_username.get(username)
+
+    def choose(self, handler, body):
+        """Get the account which should handle the given request, or None if
+        it's pinned to an account we don't have.
+
+        :param handler: The handler for the request
+        :param body: The request packet
+        """
+        if body.get('account') is not None:
+            return self.by_username.get(body['account'])
+        if not getattr(handler, 'any_account', False) or len(self.accounts) == 1:
+            return self.primary
+        # ties go to the earliest account, so the primary account is preferred
+        return min(
+            self.accounts,
+            key=lambda account: (not account.healthy(), account.time_until_ready())
+        )
+
+    def start(self):
+        """Starts keeping every account logged in"""
+        for account in self.accounts:
+            account.auth_refresher.start()
+
+    def stop(self):
+        """Stops keeping the accounts logged in"""
+        for account in self.accounts:
+            account.auth_refresher.stop()
+
+    def stats(self):
+        """Get a dict from username to the stats for that account"""
+        return dict((account.username, account.stats()) for account in self.accounts)
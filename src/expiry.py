@@ -0,0 +1,61 @@
+"""Detects requests which have waited so long that whoever sent them no longer
+cares about the result, so that we don't spend our ratelimit budget on them.
+
+A request expires at its `deadline`, in seconds since the epoch, or
+`ttl_seconds` after its `sent_at`, whichever is earlier. If the packet has
+neither the request never expires, since only the sender knows when it stops
+caring. Retries keep the `sent_at` of the original request, so `ttl_seconds`
+is measured from the first attempt.
+"""
+import threading
+import time
+
+
+class ExpiryTracker:
+    """Checks requests for expiry and counts the expired ones. Thread-safe."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.expired_by_type = {}
+        self.requests_saved = 0
+
+    def check(self, handler, body):
+        """Determines if the given request has expired and, if it has, counts
+        it.
+
+        :param handler: The handler for the request
+        :param body: The request packet
+        :return: None if the request has not expired, otherwise how many
+            seconds ago it expired
+        """
+        deadline = get_deadline(body)
+        if deadline is None:
+            return None
+        overdue = time.time() - deadline
+        if overdue < 0:
+            return None
+
+        with self.lock:
+            self.expired_by_type[handler.name] = self.expired_by_type.get(handler.name, 0) + 1
+            if handler.requires_delay:
+                self.requests_saved += 1
+        return overdue
+
+    def stats(self):
+        """Get a dict with the number of expired requests by type and the
+        number of requests to reddit which were not made because of them"""
+        with self.lock:
+            return {
+                'expired_by_type': dict(self.expired_by_type),
+                'requests_saved': self.requests_saved
+            }
+
+
+def get_deadline(body):
+    """Get when the given request expires in seconds since the epoch, or None
+    if it never expires"""
+    deadlines = []
+    if body.get('deadline') is not None:
+        deadlines.append(body['deadline'])
+    if body.get('ttl_seconds') is not None:
+        deadlines.append(body['sent_at'] + body['ttl_seconds'])
+    return min(deadlines) if deadlines else None
@@ -1,27 +1,45 @@
-"""This module provides the interface that handlers should use. Handlers should
-not actually subclass this class, and handler modules should also have a
-function register_handlers(handlers) which accepts a list of handlers and
-appends any handlers defined in that module to it (instances, not the classes
-themselves).
-"""
-
-
-class Handler:
-    """A standard handler.
-
-    :param name: The unique identifier for this handler, in snake_case.
-    :param requires_delay: True if a delay is required, false otherwise
-    """
-    def handle(self, reddit, auth, data):
-        """Handle an event with the given data and return the result and status
-        code.
-
-        :param reddit: the Reddit instance
-        :param auth: The logged in users auth
-        :param data: The dict of arguments passed as "args" in the packet
-        :return status_code: The status code for the response. May have the
-            special values 'success' or 'failure' to force the response
-            type, otherwise should be an int.
-        :return info: A dict containing additional information or None
-        """
-        pass
+"""This module provides the interface that handlers should use. Handlers should
+not actually subclass this class, and handler modules should also have a
+function register_handlers(handlers) which accepts a list of handlers and
+appends any handlers defined in that module to it (instances, not the classes
+themselves). Each handler module, and the names of the handlers it registers,
+must also be declared in catalog.py.
+"""
+
+
+class Handler:
+    """A standard handler.
+
+    :param name: The unique identifier for this handler, in snake_case.
+    :param requires_delay: True if a delay is required, false otherwise
+    :param cache_ttl_seconds: Optional. If set, successful results from this
+        handler may be reused for this many seconds for requests with the
+        same arguments. Should only be set on handlers which don't change
+        anything on reddit.
+    :param cache_invalidates: Optional. A list of handler names whose cached
+        results should be discarded when this handler succeeds with the same
+        arguments.
+    :param coalesce: Optional. If True, identical requests which are waiting
+        at the same time may share a single result from this handler. Should
+        only be set on handlers which don't change anything on reddit.
+    :param priority: Optional. The default priority for requests to this
+        handler when the packet doesn't specify one; higher priority requests
+        are handled first when several are waiting. Defaults to 0.
+    :param any_account: Optional. If True, requests to this handler may be
+        handled by whichever account has budget rather than the primary
+        account. Should only be set on handlers whose result doesn't depend
+        on which account makes the request.
+    """
+    def handle(self, reddit, auth, data):
+        """Handle an event with the given data and return the result and status
+        code.
+
+        :param reddit: the Reddit instance
+        :param auth: The logged in users auth
+        :param data: The dict of arguments passed as "args" in the packet
+        :return status_code: The status code for the response. May have the
+            special values 'success' or 'failure' to force the response
+            type, otherwise should be an int.
+        :return info: A dict containing additional information or None
+        """
+        pass
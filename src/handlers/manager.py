@@ -1,486 +1,1183 @@
-"""This module is responsible for detecting handlers within this package and
-forwarding the appropriate jobs to them.
-"""
-import os
-import importlib
-import json
-from datetime import datetime, timedelta
-import time
-from auth import Auth
-from reddit import Reddit
-from lblogging import Level
-
-
-VALID_OPERATIONS = {'copy', 'success', 'failure', 'retry'}
-"""The list of valid operations within the style part of a packet"""
-
-DEFAULT_STYLE = {
-    '2xx': {'operation': 'copy', 'log_level': 'TRACE'},
-    '4xx': {'operation': 'failure', 'log_level': 'WARN'},
-    '5xx': {'operation': 'retry', 'log_level': 'WARN'}
-}
-"""The default style dict for responding to requests. Any missing info in the
-style array is fetched from here."""
-
-FALLBACK_STYLE = DEFAULT_STYLE['5xx']
-"""In the extremely unlikely event we get a status code not described in
-default style, we fall back to this style"""
-
-
-def register_listeners(logger, amqp):
-    """Main entry point to this file. Finds all the handlers and then
-    subscribes to the appropriate queue with a callback which uses those
-    handlers on top of some bookkeeping"""
-    logger = logger.with_iden('handlers/manager.py')
-
-    logger.print(Level.TRACE, 'Finding listeners...')
-    logger.connection.commit()
-    handlers = _get_handlers(logger)
-    logger.connection.commit()
-    logger.print(Level.TRACE, 'Listeners found, consuming events..')
-    logger.connection.commit()
-
-    listen_with_handlers(logger, amqp, handlers)
-
-
-def listen_with_handlers(logger, amqp, handlers):
-    """Uses the specified list of handlers when subscribing to the appropriate
-    queue"""
-    handlers_by_name = dict([(handler.name, handler) for handler in handlers])
-    queue = os.environ['AMQP_QUEUE']
-    response_queues = {}
-    last_processed_at = None
-    min_td_btwn_reqs = timedelta(seconds=float(os.environ['MIN_TIME_BETWEEN_REQUESTS_S']))
-
-    failed_requests_counter = 0
-    explicit_ratelimit_until = None
-
-    def reddit_request_callback(endpoint_name, resp):
-        nonlocal failed_requests_counter
-        nonlocal explicit_ratelimit_until
-
-        if resp.status_code >= 200 and resp.status_code <= 299:
-            failed_requests_counter = max(0, failed_requests_counter - 1)
-        else:
-            failed_requests_counter += 1
-
-        if 'x-ratelimit-reset' in resp.headers and 'x-ratelimit-remaining' in resp.headers:
-            reset = float(resp.headers['x-ratelimit-reset'])
-            remaining = float(resp.headers['x-ratelimit-remaining'])
-            logger.print(
-                Level.TRACE,
-                (
-                    'Received ratelimit headers from endpoint {}; ' +
-                    'x-ratelimit-reset: {}, x-ratelimit-remaining: {}'
-                ),
-                endpoint_name, reset, remaining
-            )
-
-            if remaining <= 1:
-                logger.print(
-                    Level.WARN,
-                    (
-                        'Setting explicit ratelimit from ratelimit headers ' +
-                        'in response to {}! reset={}, remaining={}'
-                    ),
-                    endpoint_name, reset, remaining
-                )
-                explicit_ratelimit_until = time.time() + reset
-
-    def delay_for_reddit():
-        if last_processed_at is None:
-            return
-
-        target_delay = (
-            min_td_btwn_reqs
-            if failed_requests_counter == 0
-            else timedelta(seconds=min((10 * (2 ** failed_requests_counter)), 1800))
-        )
-        if explicit_ratelimit_until is not None:
-            seconds_until_reset = explicit_ratelimit_until - time.time()
-            target_delay = timedelta(seconds=max(target_delay, seconds_until_reset + 1))
-
-        delay_so_far = datetime.now() - last_processed_at
-        if delay_so_far < target_delay:
-            req_sleep_time = target_delay - delay_so_far
-            time.sleep(req_sleep_time.total_seconds())
-
-    time_btwn_clean = timedelta(hours=1)
-    remember_td = timedelta(days=1)
-    last_cleaned_respqueues = datetime.now()
-
-    reddit = Reddit()
-    reddit.request_callback = reddit_request_callback
-    auth = None
-    min_time_to_expiry = timedelta(minutes=1)
-
-    channel = amqp.channel()
-    channel.queue_declare(queue)
-    for method_frame, properties, body_bytes in channel.consume(queue, inactivity_timeout=600):
-        if (datetime.now() - last_cleaned_respqueues) > time_btwn_clean:
-            last_cleaned_respqueues = datetime.now()
-            for k in list(response_queues.keys()):
-                val = response_queues[k]
-                time_since_seen = datetime.now() - val['last_seen_at']
-                if time_since_seen > remember_td:
-                    logger.print(
-                        Level.DEBUG,
-                        'Forgetting about response queue {} - last saw it {} ago',
-                        k, time_since_seen
-                    )
-                    del response_queues[k]
-            logger.connection.commit()
-
-        if method_frame is None:
-            logger.print(Level.TRACE, 'No messages in the last 10 minutes')
-            logger.connection.commit()
-            continue
-
-        body_str = body_bytes.decode('utf-8')
-        try:
-            body = json.loads(body_str)
-        except json.JSONDecodeError as exc:
-            logger.exception(
-                Level.WARN,
-                'Received non-json packet! Error info: doc={}, msg={}, pos={}, lineno={}, colno={}',
-                exc.doc, exc.msg, exc.pos, exc.lineno, exc.colno
-            )
-            logger.connection.commit()
-            channel.basic_nack(method_frame.delivery_tag, requeue=False)
-            continue
-
-        if _detect_structure_errors_with_logging(logger, body_str, body):
-            logger.connection.commit()
-            channel.basic_nack(method_frame.delivery_tag, requeue=False)
-            continue
-
-        resp_info = response_queues.get(body['response_queue'])
-        if resp_info is None:
-            logger.print(
-                Level.DEBUG,
-                'New response queue {} detected at version {}',
-                body['response_queue'], body['version_utc_seconds']
-            )
-            if not body['response_queue'].startswith('void'):
-                channel.queue_declare(body['response_queue'])
-            resp_info = {'version': body['version_utc_seconds']}
-            response_queues[body['response_queue']] = resp_info
-        elif not body.get('ignore_version') and body['version_utc_seconds'] < resp_info['version']:
-            logger.print(
-                Level.DEBUG,
-                'Ignoring message to response queue {} with type {}; '
-                'specified version={} is below current version={}',
-                body['response_queue'], body['type'], body['version_utc_seconds'],
-                resp_info['version']
-            )
-            logger.connection.commit()
-            channel.basic_nack(method_frame.delivery_tag, requeue=False)
-            continue
-        elif body['version_utc_seconds'] > resp_info['version']:
-            logger.print(
-                Level.DEBUG,
-                'Detected newer version for response queue {}, was {} and is now {}',
-                body['response_queue'], resp_info['version'], body['version_utc_seconds']
-            )
-            resp_info['version'] = body['version_utc_seconds']
-
-        logger.connection.commit()
-        resp_info['last_seen_at'] = datetime.now()
-
-        if body['type'] not in handlers_by_name:
-            logger.print(
-                Level.WARN,
-                'Received request to response queue {} with an unknown type {}',
-                body['response_queue'], body['type']
-            )
-            logger.connection.commit()
-            channel.basic_nack(method_frame.delivery_tag, requeue=False)
-            continue
-
-        logger.print(
-            Level.TRACE,
-            'Processing request to response queue {} with type {} ({})',
-            body['response_queue'], body['type'], body['uuid']
-        )
-        logger.connection.commit()
-
-        if auth is None or auth.expires_at < (datetime.now() + min_time_to_expiry):
-            logger.print(
-                Level.TRACE,
-                'Reauthenticating with reddit (expires at {})',
-                auth.expires_at if auth is not None else 'None'
-            )
-            logger.connection.commit()
-            delay_for_reddit()
-            auth = _auth(reddit, logger)
-            last_processed_at = datetime.now()
-            if auth is None:
-                logger.print(
-                    Level.WARN,
-                    'Failed to authenticate with reddit! Will nack, requeue=True'
-                )
-                logger.connection.commit()
-                channel.basic_nack(method_frame.delivery_tag, requeue=True)
-                continue
-
-        handler = handlers_by_name[body['type']]
-        if handler.requires_delay:
-            delay_for_reddit()
-        try:
-            status, info = handler.handle(reddit, auth, body['args'])
-        except:  # noqa: E722
-            logger.exception(
-                Level.WARN,
-                'An exception occurred while processing request to response '
-                'queue {} with type {}: body={}',
-                body['response_queue'], body['type'], body
-            )
-            status = 'failure'
-            info = None
-
-        if handler.requires_delay:
-            last_processed_at = datetime.now()
-        handle_style = _get_handle_style(body.get('style'), status)
-
-        logger.print(
-            getattr(Level, handle_style['log_level']),
-            'Got status {} to response type {} for queue {} ({}) - handling with operation {}',
-            status, body['type'], body['response_queue'], body['uuid'], handle_style['operation']
-        )
-        logger.connection.commit()
-
-        if status == 401:
-            logger.print(
-                Level.INFO,
-                'Due to 401 status code, purging cached authorization information. '
-                'It should not have expired until {}',
-                auth.expires_at
-            )
-            logger.connection.commit()
-            auth = None
-
-        if body['response_queue'].startswith('void'):
-            channel.basic_ack(method_frame.delivery_tag)
-        elif handle_style['operation'] == 'copy':
-            channel.basic_publish('', body['response_queue'], json.dumps({
-                'uuid': body['uuid'],
-                'type': 'copy',
-                'status': status,
-                'info': info
-            }))
-            channel.basic_ack(method_frame.delivery_tag)
-        elif handle_style['operation'] == 'retry':
-            new_bod = body.copy()
-            new_bod['ignore_version'] = handle_style.get('ignore_version', False)
-            channel.basic_publish('', queue, json.dumps(new_bod))
-            channel.basic_nack(method_frame.delivery_tag, requeue=False)
-        elif handle_style['operation'] == 'success':
-            channel.basic_publish('', body['response_queue'], json.dumps({
-                'uuid': body['uuid'],
-                'type': 'success'
-            }))
-            channel.basic_ack(method_frame.delivery_tag)
-        else:
-            if handle_style['operation'] != 'failure':
-                logger.print(
-                    Level.WARN,
-                    'Unknown handle style {} to status {} to resposne queue {} for type {}'
-                    ' - treating as failure',
-                    handle_style['operation'], status, body['response_queue'], body['type']
-                )
-            channel.basic_publish('', body['response_queue'], json.dumps({
-                'uuid': body['uuid'],
-                'type': 'failure'
-            }))
-            channel.basic_nack(method_frame.delivery_tag, requeue=False)
-
-
-def _auth(reddit, logger):
-    raw_resp = reddit.login(
-        os.environ['REDDIT_USERNAME'], os.environ['REDDIT_PASSWORD'],
-        os.environ['REDDIT_CLIENT_ID'], os.environ['REDDIT_CLIENT_SECRET']
-    )
-    if raw_resp.status_code < 200 or raw_resp.status_code > 299:
-        logger.print(
-            Level.WARN,
-            'Failed to login; got status code {}',
-            raw_resp.status_code
-        )
-        return None
-
-    logger.print(Level.DEBUG, 'Successfully relogged in')
-    return Auth.from_response(raw_resp)
-
-
-def _get_handle_style(style, status, defaults=DEFAULT_STYLE):
-    if status == 'success':
-        return {'operation': 'success', 'log_level': 'TRACE'}
-    if status == 'failure':
-        return {'operation': 'failure', 'log_level': 'TRACE'}
-
-    if style is None:
-        if defaults is None:
-            raise Exception('should not get here - no style or fallback')
-        return _get_handle_style(defaults, status, defaults=None)
-
-    best_match = None
-    if style.get(str(status)) is not None:
-        best_match = style[str(status)]
-    elif style.get(str(status)[0] + 'xx') is not None:
-        best_match = style[str(status)[0] + 'xx']
-
-    if best_match is None:
-        if defaults is None:
-            return FALLBACK_STYLE
-        return _get_handle_style(defaults, status, defaults=None)
-
-    if defaults is not None:
-        best_match = best_match.copy()
-        fill_with = _get_handle_style(style, status, defaults=None)
-        for k, v in fill_with.items():
-            if k not in best_match:
-                best_match[k] = v
-
-    return best_match
-
-
-def _detect_structure_errors_with_logging(logger, body_str, body):
-    # we try to parse the most things most likely to identify the client first,
-    # to make tracking down the source easier
-    resp_queue = body.get('response_queue')
-    if not isinstance(resp_queue, str):
-        logger.print(
-            Level.WARN,
-            'Received malformed packet {} '
-            '(response_queue has type {} instead of str)',
-            body_str, type(resp_queue).__name__
-        )
-        return True
-
-    vers_utc = body.get('version_utc_seconds')
-    if not isinstance(vers_utc, (int, float)):
-        logger.print(
-            Level.WARN,
-            'Received malformed packet requesting a response to {} '
-            '(vers_utc has type {} instead of int or float); body_str={}',
-            resp_queue, type(vers_utc).__name__, body_str
-        )
-        return True
-
-    simple_checks = [
-        ('type', str), ('uuid', str), ('sent_at', (int, float)),
-        ('style', (dict, type(None))), ('ignore_version', (bool, type(None)))
-    ]
-    for key, types in simple_checks:
-        val = body.get(key)
-        if not isinstance(val, types):
-            logger.print(
-                Level.WARN,
-                'Received malformed packet (response_queue={}, version_utc={}) '
-                '({} has type {} instead of {}}); body_str={}',
-                resp_queue, vers_utc, key, type(val).__name__, types, body_str
-            )
-            return True
-
-    if body.get('style'):
-        bonus_allowed_style_keys = {'2xx', '3xx', '4xx', '5xx'}
-        for key, val in body['style']:
-            if key not in bonus_allowed_style_keys:
-                try:
-                    key_num = int(key)
-                except ValueError:
-                    key_num = -1  # we'll error out in a moment
-
-                if key_num < 200 or key_num > 599:
-                    logger.print(
-                        Level.WARN,
-                        'Received malformed packet (response_queue={}, version_utc={}) '
-                        'style has invalid key {} ; expected one of {} or a '
-                        'base-10 repr of an int a where 200 <= a <= 599; '
-                        'body_str={}',
-                        resp_queue, vers_utc, key, bonus_allowed_style_keys, body_str
-                    )
-                    return True
-
-            if not isinstance(val, dict):
-                logger.print(
-                    Level.WARN,
-                    'Received malformed packet (response_queue={}, version_utc={}) '
-                    'style[\'{}\'] has malformed value; expected type dict but got '
-                    '{}; body_str={}',
-                    resp_queue, vers_utc, key, type(val).__name__, body_str
-                )
-                return True
-
-            operation = val.get('operation')
-            if not isinstance(operation, str):
-                logger.print(
-                    Level.WARN,
-                    'Received malformed packet (response_queue={}, version_utc={}) '
-                    'style[\'{}\'][\'operation\'] has a malformed value; expected type '
-                    'str but got {}; body_str={}',
-                    resp_queue, vers_utc, key, type(operation).__name__, body_str
-                )
-                return True
-
-            if operation not in VALID_OPERATIONS:
-                logger.print(
-                    Level.WARN,
-                    'Received malformed packet (response_queue={}, version_utc={}) '
-                    'style[\'{}\'][\'operation\'] should be one of {} but got {}; '
-                    'body_str={}',
-                    resp_queue, vers_utc, key, VALID_OPERATIONS, operation, body_str
-                )
-                return True
-
-            loglevel = val.get('log_level')
-            if not isinstance(loglevel, (type(None), str)):
-                logger.print(
-                    Level.WARN,
-                    'Received malformed packet (response_queue={}, version_utc={}) '
-                    'style[\'{}\'][\'log_level\'] should be None or a str, but got '
-                    '{}; body_str={}',
-                    resp_queue, vers_utc, key, type(loglevel).__name__, body_str
-                )
-                return True
-
-            if loglevel != 'NONE' and not hasattr(Level, loglevel):
-                logger.print(
-                    Level.WARN,
-                    'Received malformed packet (response_queue={}, version_utc={}) '
-                    'style[\'{}\'][\'log_level\'] does not have a recognized value. '
-                    'Got {}; body_str={}',
-                    resp_queue, vers_utc, key, loglevel, body_str
-                )
-                return True
-
-            if operation == 'retry':
-                ignore_version = val.get('ignore_version')
-                if not isinstance(ignore_version, (type(None), bool)):
-                    logger.print(
-                        Level.WARN,
-                        'Received malformed packet (response_queue={}, version_utc={}) '
-                        'style[\'{}\'][\'ignore_version\'] should be a bool or None, but '
-                        'got {}; body_str={}',
-                        resp_queue, vers_utc, key, type(ignore_version).__name__, body_str
-                    )
-                    return True
-
-    return False
-
-
-def _get_handlers(logger):
-    handlers = []
-    for root, dirs, files in os.walk('handlers'):
-        for f in files:
-            if f.endswith('.py'):
-                relpath = os.path.join(root, f)
-                if relpath[0] == '.':
-                    relpath = relpath[2:]
-                modnm = relpath.replace(os.path.sep, '.').replace('/', '.')[:-3]
-                mod = importlib.import_module(modnm)
-                if hasattr(mod, 'register_handlers'):
-                    logger.print(Level.TRACE, 'Loading handler {}', modnm)
-                    mod.register_handlers(handlers)
-    logger.connection.commit()
-    return handlers
+"""This module is responsible for loading the handlers declared in catalog.py
+and forwarding the appropriate jobs to them.
+"""
+import os
+import json
+import functools
+from datetime import datetime, timedelta
+import time
+import pika
+from auth import Auth
+from reddit import Reddit
+from ratelimit import RateLimiter
+from sharedratelimit import SharedRateLimiter, SqliteBudgetStore, PostgresBudgetStore
+from cache import ResponseCache
+from coalesce import Coalescer
+from scheduler import RequestScheduler
+from expiry import ExpiryTracker
+from retries import MAX_ATTEMPT, RetryPolicy
+from registry import ResponseQueueRegistry
+from authstore import AuthStore, AuthRefresher
+from credentials import Credentials, Account, CredentialPool
+from backoff import ThrottleBackoff
+from backpressure import Backpressure
+from health import CircuitOpen, EndpointHealth, middleware as health_middleware
+from metrics import MetricsRegistry, ProxyMetrics
+from timing import PHASES, RequestTimer, TimingStats
+from lblogging import Level
+from workers import WorkerPool
+import catalog
+import connections
+import loglevels
+import recording
+
+
+VALID_OPERATIONS = {'copy', 'success', 'failure', 'retry'}
+"""The list of valid operations within the style part of a packet"""
+
+DEFAULT_STYLE = {
+    '2xx': {'operation': 'copy', 'log_level': 'TRACE'},
+    '4xx': {'operation': 'failure', 'log_level': 'WARN'},
+    '5xx': {'operation': 'retry', 'log_level': 'WARN'}
+}
+"""The default style dict for responding to requests. Any missing info in the
+style array is fetched from here."""
+
+FALLBACK_STYLE = DEFAULT_STYLE['5xx']
+"""In the extremely unlikely event we get a status code not described in
+default style, we fall back to this style"""
+
+EXPIRED_STYLE = {'operation': 'expired', 'log_level': 'DEBUG'}
+"""The style used to respond to requests which expired before we got to them.
+This can't be chosen by the request, so it's not in VALID_OPERATIONS."""
+
+PERSIST_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+"""The folder containing `src`, where files which should survive a deploy are
+kept by default, since `src` is replaced on every deploy. This doesn't depend
+on the working directory."""
+
+
+def register_listeners(logger, amqp):
+    """Main entry point to this file. Finds all the handlers and then
+    subscribes to the appropriate queue with a callback which uses those
+    handlers on top of some bookkeeping"""
+    logger = loglevels.gate(logger).with_iden('handlers/manager.py')
+
+    logger.print(Level.TRACE, 'Finding listeners...')
+    logger.connection.commit()
+    handlers = _get_handlers(logger)
+    logger.connection.commit()
+    logger.print(Level.TRACE, 'Listeners found, consuming events..')
+    logger.connection.commit()
+
+    listen_with_handlers(logger, amqp, handlers)
+
+
+def listen_with_handlers(logger, amqp, handlers):
+    """Uses the specified list of handlers when subscribing to the appropriate
+    queue"""
+    logger = loglevels.gate(logger)
+    handlers_by_name = dict([(handler.name, handler) for handler in handlers])
+    queue = os.environ['AMQP_QUEUE']
+    response_queues = _create_response_queue_registry(logger)
+
+    def observe_latency(endpoint_name, resp):
+        if getattr(resp, 'elapsed', None) is not None:
+            metrics.reddit_latency.observe(resp.elapsed.total_seconds(), endpoint=endpoint_name)
+
+    def observe_account(account, endpoint_name, resp):
+        backoff = account.record_response(resp.status_code, resp.headers)
+        if backoff is not None:
+            logger.print(
+                Level.WARN,
+                'Reddit throttled {} in response to {} (status {}); '
+                'backing off for {} seconds ({})',
+                account.username, endpoint_name, resp.status_code, round(backoff[0], 3),
+                backoff[1]
+            )
+        if account.ratelimiter.update(resp.headers):
+            logger.print(
+                Level.TRACE,
+                (
+                    'Received ratelimit headers for {} from endpoint {}; x-ratelimit-used: {}, ' +
+                    'x-ratelimit-remaining: {}, x-ratelimit-reset: {}'
+                ),
+                account.username, endpoint_name, resp.headers.get('x-ratelimit-used'),
+                resp.headers['x-ratelimit-remaining'], resp.headers['x-ratelimit-reset']
+            )
+
+            if account.ratelimiter.exhausted():
+                logger.print(
+                    Level.WARN,
+                    (
+                        'Ratelimit budget for {} exhausted in response to {}! ' +
+                        'Waiting {} seconds for it to reset'
+                    ),
+                    account.username, endpoint_name, resp.headers['x-ratelimit-reset']
+                )
+
+    def delay_for_reddit(account):
+        """Waits until we are allowed to make another request to reddit with
+        the given account and returns how many seconds we waited on the
+        ratelimit budget."""
+        started_at = time.monotonic()
+        # another request may be throttled while we wait, extending the backoff
+        backoff = account.backoff_remaining()
+        while backoff > 0:
+            time.sleep(backoff)
+            backoff = account.backoff_remaining()
+
+        ratelimit_wait = account.ratelimiter.acquire()
+        metrics.ratelimit_wait.observe(time.monotonic() - started_at, account=account.username)
+        return ratelimit_wait
+
+    time_btwn_stats = timedelta(hours=1)
+    last_logged_stats = datetime.now()
+
+    response_cache = ResponseCache(int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', '1000')))
+    coalescer = Coalescer(float(os.environ.get('COALESCE_WINDOW_S', '30')))
+    expiry = ExpiryTracker()
+    backpressure = Backpressure(float(os.environ.get('BACKPRESSURE_THRESHOLD_S', '30')))
+    timing_stats = TimingStats(float(os.environ.get('SLOW_REQUEST_S', '30')))
+    retry_policy = RetryPolicy(
+        float(os.environ.get('RETRY_BASE_DELAY_S', '5')),
+        float(os.environ.get('RETRY_MAX_DELAY_S', '300')),
+        int(os.environ.get('RETRY_MAX_ATTEMPTS', '0'))
+    )
+
+    def create_account(credentials):
+        """Creates the account for the given credentials. It isn't kept logged
+        in until the pool is started."""
+        account = None
+
+        def login():
+            """Logs in once the ratelimit allows it. Called by the auth
+            refresher, usually on its own thread."""
+            delay_for_reddit(account)
+            return _auth(account.reddit, logger, credentials)
+
+        reddit = Reddit()
+        account = Account(
+            credentials, reddit, _create_ratelimiter(logger, credentials, budget_store),
+            _create_auth_refresher(logger, login, credentials),
+            _create_health(logger, credentials), _create_backoff()
+        )
+        reddit.add_middleware(health_middleware(account.health))
+        reddit.add_observer(observe_latency)
+        reddit.add_observer(functools.partial(observe_account, account))
+        return account
+
+    budget_store = _create_budget_store()
+    metrics = _create_metrics(logger)
+    accounts = CredentialPool([create_account(c) for c in _load_credentials()])
+    metrics.watch_accounts(accounts)
+    metrics.watch_backpressure(backpressure)
+    accounts.start()
+
+    channel = amqp.channel()
+    channel.queue_declare(queue)
+
+    concurrency = int(os.environ.get('REQUEST_CONCURRENCY', '1'))
+    order_by_uuid = os.environ.get('REQUEST_ORDER_BY_UUID', 'false').lower() == 'true'
+    prefetch = int(os.environ.get('REQUEST_PREFETCH', str(concurrency)))
+    workers = None
+    scheduler = None
+    if concurrency > 1 or prefetch > 1:
+        channel.basic_qos(prefetch_count=max(prefetch, concurrency))
+        workers = WorkerPool(concurrency)
+        scheduler = RequestScheduler(
+            concurrency, float(os.environ.get('SCHEDULER_AGING_S', '10'))
+        )
+
+    def on_connection_thread(func):
+        """The channel is not thread-safe, so anything which touches it from a
+        worker has to be handed back to the connection thread, which runs it
+        while waiting for the next message."""
+        if workers is None:
+            func()
+        else:
+            amqp.add_callback_threadsafe(func)
+
+    def get_auth(account):
+        """Gets the current authorization for the given account. This is
+        normally kept fresh in the background, but if we don't have a valid one
+        (e.g., the background login failed) we login now. Returns None if we
+        failed to login."""
+        current = account.auth_refresher.current()
+        if current is not None:
+            return current
+
+        logger.print(
+            Level.TRACE,
+            'No valid authorization for {}; reauthenticating with reddit',
+            account.username
+        )
+        logger.connection.commit()
+        return account.auth_refresher.refresh()
+
+    def run_handler(handler, account, req_auth, body, timer):
+        """Waits for the account's ratelimit if necessary and then runs the
+        handler, returning the status and info"""
+        if handler.requires_delay:
+            with timer.phase('ratelimit'):
+                ratelimit_wait = delay_for_reddit(account)
+            logger.print(
+                Level.TRACE,
+                'Waited {} seconds on the ratelimit for {} before request {}',
+                round(ratelimit_wait, 3), account.username, body['uuid']
+            )
+        try:
+            with timer.phase('handler'):
+                status, info = handler.handle(
+                    timer.wrap_reddit(account.reddit), req_auth, body['args']
+                )
+        except CircuitOpen as exc:
+            logger.print(
+                Level.DEBUG,
+                'Refused request {} to response queue {} with type {}: {}',
+                body['uuid'], body['response_queue'], body['type'], exc
+            )
+            status = exc.status_code
+            info = None
+        except:  # noqa: E722
+            logger.exception(
+                Level.WARN,
+                'An exception occurred while processing request to response '
+                'queue {} with type {}: body={}',
+                body['response_queue'], body['type'], body
+            )
+            status = 'failure'
+            info = None
+        return status, info
+
+    def handle_request(body, delivery_tag, received_at):
+        """Handles a request which has already passed validation, then sends
+        the response and acks or nacks the message. received_at is when we
+        received the request, according to time.monotonic()"""
+        logger.print(
+            Level.TRACE,
+            'Processing request to response queue {} with type {} ({})',
+            body['response_queue'], body['type'], body['uuid']
+        )
+        logger.connection.commit()
+
+        timer = RequestTimer(body['sent_at'])
+        handler = handlers_by_name[body['type']]
+        overdue = expiry.check(handler, body)
+        if overdue is not None:
+            logger.print(
+                Level.DEBUG,
+                'Request {} to response queue {} with type {} expired {} seconds ago; '
+                'responding with expired',
+                body['uuid'], body['response_queue'], body['type'], round(overdue, 3)
+            )
+            logger.connection.commit()
+            metrics.requests.inc(type=body['type'], status='expired')
+            publish(body, delivery_tag, EXPIRED_STYLE, None, None, timer)
+            return
+
+        cached = response_cache.lookup(handler, body)
+        if cached is not None:
+            status, info, age = cached
+            logger.print(
+                Level.TRACE,
+                'Using cached result for request {} with type {} ({} seconds old)',
+                body['uuid'], body['type'], round(age, 3)
+            )
+            respond_with_result(body, delivery_tag, status, info, timer)
+            return
+
+        coalesced, coalesce_info = coalescer.begin(
+            handler, body, (body, delivery_tag, timer), received_at
+        )
+        if coalesced == 'joined':
+            logger.print(
+                Level.TRACE,
+                'Request {} with type {} joined an identical request in flight',
+                body['uuid'], body['type']
+            )
+            logger.connection.commit()
+            return
+        if coalesced == 'reuse':
+            status, info = coalesce_info
+            logger.print(
+                Level.TRACE,
+                'Reusing the result of an identical request for request {} with type {}',
+                body['uuid'], body['type']
+            )
+            respond_with_result(body, delivery_tag, status, info, timer)
+            return
+
+        account = accounts.choose(handler, body)
+        if handler.requires_delay:
+            wait = account.time_until_ready()
+            if backpressure.should_release(wait):
+                release(body, delivery_tag, account, wait)
+                if coalesced == 'lead':
+                    nack_followers(coalescer.abandon(coalesce_info))
+                return
+
+        try:
+            with timer.phase('auth'):
+                req_auth = get_auth(account)
+            if req_auth is not None:
+                status, info = run_handler(handler, account, req_auth, body, timer)
+                response_cache.store(handler, body, status, info)
+        except:  # noqa: E722
+            if coalesced == 'lead':
+                nack_followers(coalescer.abandon(coalesce_info))
+            raise
+
+        if req_auth is None:
+            logger.print(
+                Level.WARN,
+                'Failed to authenticate with reddit as {}! Will nack, requeue=True',
+                account.username
+            )
+            logger.connection.commit()
+            on_connection_thread(lambda: channel.basic_nack(delivery_tag, requeue=True))
+            if coalesced == 'lead':
+                nack_followers(coalescer.abandon(coalesce_info))
+            return
+
+        followers = []
+        if coalesced == 'lead':
+            followers = coalescer.finish(coalesce_info, status, info)
+
+        if status == 401:
+            logger.print(
+                Level.INFO,
+                'Due to 401 status code, purging cached authorization information for {}. '
+                'It should not have expired until {}',
+                account.username, req_auth.expires_at
+            )
+            logger.connection.commit()
+            account.auth_refresher.invalidate(req_auth)
+
+        respond_with_result(body, delivery_tag, status, info, timer)
+        for follower_body, follower_delivery_tag, follower_timer in followers:
+            logger.print(
+                Level.TRACE,
+                'Sharing the result of request {} with identical request {}',
+                body['uuid'], follower_body['uuid']
+            )
+            with loglevels.for_response_queue(follower_body['response_queue']):
+                respond_with_result(
+                    follower_body, follower_delivery_tag, status, info, follower_timer
+                )
+
+    def respond_with_result(body, delivery_tag, status, info, timer):
+        """Sends the response to the given request using the style it asked
+        for, then acks or nacks the message"""
+        handle_style = _get_handle_style(body.get('style'), status)
+        metrics.requests.inc(type=body['type'], status=status)
+
+        if handle_style['log_level'] != 'NONE':
+            logger.print(
+                getattr(Level, handle_style['log_level']),
+                'Got status {} to response type {} for queue {} ({}) - handling with operation {}',
+                status, body['type'], body['response_queue'], body['uuid'],
+                handle_style['operation']
+            )
+            logger.connection.commit()
+
+        if (
+                not body['response_queue'].startswith('void')
+                and handle_style['operation'] not in VALID_OPERATIONS):
+            logger.print(
+                Level.WARN,
+                'Unknown handle style {} to status {} to resposne queue {} for type {}'
+                ' - treating as failure',
+                handle_style['operation'], status, body['response_queue'], body['type']
+            )
+            logger.connection.commit()
+
+        if handle_style['operation'] == 'retry' and retry_policy.exhausted(body, handle_style):
+            logger.print(
+                Level.WARN,
+                'Giving up on request {} to response queue {} with type {} after {} attempts',
+                body['uuid'], body['response_queue'], body['type'], body.get('attempt') or 1
+            )
+            logger.connection.commit()
+
+        publish(body, delivery_tag, handle_style, status, info, timer)
+
+    def publish(body, delivery_tag, handle_style, status, info, timer):
+        """Sends the response to the given request on the connection thread
+        and then records how long the request took"""
+        def send():
+            timing = timer.breakdown() if body.get('timing') else None
+            with timer.phase('publish'):
+                _respond(
+                    channel, queue, body, delivery_tag, handle_style, status, info,
+                    retry_policy, timing=timing
+                )
+            _record_timing(logger, metrics, timing_stats, body, timer)
+
+        on_connection_thread(send)
+
+    def nack_followers(followers):
+        """Gives back the messages for requests which joined a request that
+        didn't complete, so they are tried again"""
+        for follower_body, follower_delivery_tag, _ in followers:
+            logger.print(
+                Level.TRACE,
+                'Identical request in flight for request {} did not complete; '
+                'will nack, requeue=True',
+                follower_body['uuid']
+            )
+            on_connection_thread(
+                functools.partial(channel.basic_nack, follower_delivery_tag, requeue=True)
+            )
+        logger.connection.commit()
+
+    def release(body, delivery_tag, account, wait):
+        """Gives the given request back to the queue rather than waiting the
+        given number of seconds until its account can make a request. If no
+        other account can make a request soon either, stops consuming until
+        one can (see backpressure.py)"""
+        logger.print(
+            Level.DEBUG,
+            'Releasing request {} to response queue {} with type {}; {} cannot make '
+            'a request for {} seconds',
+            body['uuid'], body['response_queue'], body['type'], account.username,
+            round(wait, 3)
+        )
+        logger.connection.commit()
+        backpressure.record_released(1)
+        nack = functools.partial(channel.basic_nack, delivery_tag, requeue=True)
+        if backpressure.pause([other.time_until_ready() for other in accounts.accounts]):
+            on_connection_thread(nack)
+            on_connection_thread(stop_consuming)
+        else:
+            delay = backpressure.release_delay(wait)
+            on_connection_thread(lambda: amqp.call_later(delay, nack))
+
+    def stop_consuming():
+        """Stops consuming, which gives back the messages we received but
+        haven't seen yet, and gives back the requests we've seen but haven't
+        started. Must be called on the connection thread."""
+        channel.cancel()
+        released = []
+        if scheduler is not None:
+            released = scheduler.drain()
+        for _, delivery_tag, _ in released:
+            channel.basic_nack(delivery_tag, requeue=True)
+        backpressure.record_released(len(released))
+        logger.print(
+            Level.INFO,
+            'Stopped consuming from {} for {} seconds; gave back {} requests which '
+            'had not started',
+            queue, round(backpressure.remaining(), 3), len(released)
+        )
+        logger.connection.commit()
+
+    def consume():
+        """Yields the messages from the queue, except while consuming is
+        paused, until the broker stops sending them"""
+        while True:
+            yield from _timed_consume(
+                channel.consume(queue, inactivity_timeout=600), metrics.consume_idle
+            )
+            if not backpressure.paused():
+                return
+
+            # the connection has to keep running callbacks and heartbeats
+            remaining = backpressure.remaining()
+            while remaining > 0:
+                amqp.sleep(remaining)
+                remaining = backpressure.remaining()
+            logger.print(
+                Level.INFO,
+                'Resuming consuming from {} after {} seconds',
+                queue, round(backpressure.resume(), 3)
+            )
+            logger.connection.commit()
+
+    def handle_request_in_worker(body, delivery_tag, received_at):
+        """Handles the request on a worker thread. On the connection thread an
+        unexpected error takes down the process and the message is redelivered
+        on restart; here we have to give the message back ourself."""
+        try:
+            with loglevels.for_response_queue(body['response_queue']):
+                handle_request(body, delivery_tag, received_at)
+        except:  # noqa: E722
+            logger.exception(
+                Level.ERROR,
+                'Unhandled exception while processing request to response queue {} '
+                'with type {} ({}) on a worker; will nack, requeue=True',
+                body['response_queue'], body['type'], body['uuid']
+            )
+            logger.connection.commit()
+            on_connection_thread(lambda: channel.basic_nack(delivery_tag, requeue=True))
+
+    def dispatch():
+        """Starts as many of the scheduled requests as there is room for"""
+        while True:
+            item = scheduler.pop()
+            if item is None:
+                return
+            workers.submit(functools.partial(run_scheduled, *item))
+
+    def run_scheduled(body, delivery_tag, received_at):
+        try:
+            handle_request_in_worker(body, delivery_tag, received_at)
+        finally:
+            scheduler.done(body['uuid'] if order_by_uuid else None)
+            dispatch()
+
+    for method_frame, properties, body_bytes in consume():
+        received_at = time.monotonic()
+        if (datetime.now() - last_logged_stats) > time_btwn_stats:
+            last_logged_stats = datetime.now()
+            if logger.enabled(Level.DEBUG):
+                logger.print(
+                    Level.DEBUG,
+                    'Response queue registry stats: {}',
+                    response_queues.stats()
+                )
+                for username, account_stats in accounts.stats().items():
+                    logger.print(
+                        Level.DEBUG,
+                        'Account {} stats: {}',
+                        username, account_stats
+                    )
+                for host, host_stats in connections.get_pool().stats().items():
+                    logger.print(
+                        Level.DEBUG,
+                        'Connections to {}: {} requests, {} new connections, {} reused connections',
+                        host, host_stats['requests'], host_stats['new_connections'],
+                        host_stats['reused_connections']
+                    )
+                logger.print(
+                    Level.DEBUG,
+                    'Response cache stats: {}',
+                    response_cache.stats()
+                )
+                logger.print(
+                    Level.DEBUG,
+                    'Coalescing stats: {}',
+                    coalescer.stats()
+                )
+                logger.print(
+                    Level.DEBUG,
+                    'Expiry stats: {}',
+                    expiry.stats()
+                )
+                logger.print(
+                    Level.DEBUG,
+                    'Timing stats: {}',
+                    timing_stats.stats()
+                )
+                if recording.get_replayer() is not None:
+                    logger.print(
+                        Level.DEBUG,
+                        'Replay stats: {}',
+                        recording.get_replayer().stats()
+                    )
+                if recording.get_recorder() is not None:
+                    logger.print(
+                        Level.DEBUG,
+                        'Recording stats: {}',
+                        recording.get_recorder().stats()
+                    )
+                if scheduler is not None:
+                    logger.print(
+                        Level.DEBUG,
+                        'Scheduler stats: {}',
+                        scheduler.stats()
+                    )
+                logger.print(
+                    Level.DEBUG,
+                    'Backpressure stats: {}',
+                    backpressure.stats()
+                )
+            logger.connection.commit()
+
+        if method_frame is None:
+            logger.print(Level.TRACE, 'No messages in the last 10 minutes')
+            logger.connection.commit()
+            continue
+
+        body = _parse_request(logger, body_bytes)
+        if body is None:
+            logger.connection.commit()
+            channel.basic_nack(method_frame.delivery_tag, requeue=False)
+            continue
+
+        with loglevels.for_response_queue(body['response_queue']):
+            queue_state = _check_response_queue(logger, response_queues, body)
+        if queue_state == 'outdated':
+            logger.connection.commit()
+            channel.basic_nack(method_frame.delivery_tag, requeue=False)
+            continue
+        if (
+                not body['response_queue'].startswith('void')
+                and not response_queues.is_declared(body['response_queue'])):
+            channel.queue_declare(body['response_queue'])
+            response_queues.mark_declared(body['response_queue'])
+        logger.connection.commit()
+
+        if body['type'] not in handlers_by_name:
+            logger.print(
+                Level.WARN,
+                'Received request to response queue {} with an unknown type {}',
+                body['response_queue'], body['type']
+            )
+            logger.connection.commit()
+            channel.basic_nack(method_frame.delivery_tag, requeue=False)
+            continue
+
+        if body.get('account') is not None and accounts.get(body['account']) is None:
+            logger.print(
+                Level.WARN,
+                'Received request to response queue {} pinned to an unknown account {}',
+                body['response_queue'], body['account']
+            )
+            logger.connection.commit()
+            channel.basic_nack(method_frame.delivery_tag, requeue=False)
+            continue
+
+        if workers is None:
+            with loglevels.for_response_queue(body['response_queue']):
+                handle_request(body, method_frame.delivery_tag, received_at)
+        else:
+            scheduler.push(
+                (body, method_frame.delivery_tag, received_at),
+                _get_priority(handlers_by_name[body['type']], body),
+                body['sent_at'],
+                key=body['uuid'] if order_by_uuid else None
+            )
+            dispatch()
+
+
+def _timed_consume(messages, idle_counter):
+    """Yields from the given consume generator, adding the time spent waiting
+    for each message to the given counter"""
+    idle_since = time.monotonic()
+    for message in messages:
+        idle_counter.inc(time.monotonic() - idle_since)
+        yield message
+        idle_since = time.monotonic()
+
+
+def _record_timing(logger, metrics, timing_stats, body, timer):
+    """Adds the breakdown of the given finished request to the metrics and
+    the timing stats, logging it if the request was slow"""
+    breakdown = timer.breakdown()
+    for phase in PHASES:
+        metrics.request_phase.observe(breakdown[phase], phase=phase)
+    if timing_stats.record(breakdown):
+        logger.print(
+            Level.INFO,
+            'Request {} to response queue {} with type {} took {} seconds: {}',
+            body['uuid'], body['response_queue'], body['type'], breakdown['total'], breakdown
+        )
+        logger.connection.commit()
+
+
+def _parse_request(logger, body_bytes):
+    """Parses the body of a request packet and verifies it has the correct
+    structure. Returns the parsed body, or None (after logging why) if the
+    packet is malformed."""
+    body_str = body_bytes.decode('utf-8')
+    try:
+        body = json.loads(body_str)
+    except json.JSONDecodeError as exc:
+        logger.exception(
+            Level.WARN,
+            'Received non-json packet! Error info: doc={}, msg={}, pos={}, lineno={}, colno={}',
+            exc.doc, exc.msg, exc.pos, exc.lineno, exc.colno
+        )
+        return None
+
+    if _detect_structure_errors_with_logging(logger, body_str, body):
+        return None
+
+    return body
+
+
+def _create_response_queue_registry(logger):
+    """Loads the registry of response queues as configured by the environment
+    and starts forgetting the ones we haven't heard from in a day"""
+    def on_expire(name):
+        logger.print(Level.DEBUG, 'Forgetting about response queue {}', name)
+        logger.connection.commit()
+
+    def on_sweep_error():
+        logger.exception(Level.ERROR, 'Error while sweeping response queues')
+        logger.connection.commit()
+
+    registry = ResponseQueueRegistry(
+        os.environ.get(
+            'RESPONSE_QUEUE_REGISTRY_PATH', os.path.join(PERSIST_DIR, 'response_queues.db')
+        ) or None,
+        int(os.environ.get('RESPONSE_QUEUE_REGISTRY_MAX_ENTRIES', '10000')),
+        timedelta(days=1).total_seconds(),
+        on_expire=on_expire,
+        on_sweep_error=on_sweep_error
+    )
+    registry.start(60)
+    return registry
+
+
+def _load_credentials():
+    """Get the credentials for every account in the environment, starting with
+    the primary account"""
+    result = [
+        Credentials(
+            username=os.environ['REDDIT_USERNAME'],
+            password=os.environ['REDDIT_PASSWORD'],
+            client_id=os.environ['REDDIT_CLIENT_ID'],
+            client_secret=os.environ['REDDIT_CLIENT_SECRET']
+        )
+    ]
+    for additional in json.loads(os.environ.get('REDDIT_ADDITIONAL_ACCOUNTS') or '[]'):
+        result.append(Credentials(**additional))
+    return result
+
+
+def _create_budget_store():
+    """Get the store for ratelimit budgets shared with other processes as
+    configured by the environment, or None if the budgets aren't shared"""
+    shared = os.environ.get('RATELIMIT_SHARED', '')
+    if not shared:
+        return None
+    if shared == 'postgres':
+        return PostgresBudgetStore()
+    return SqliteBudgetStore(shared)
+
+
+def _create_ratelimiter(logger, credentials, budget_store):
+    """Creates the ratelimiter for the account with the given credentials as
+    configured by the environment, whose budget is shared through the given
+    budget store unless it's None"""
+    def on_store_error():
+        logger.exception(
+            Level.WARN,
+            'Failed to use the shared ratelimit budget for {}',
+            credentials.username
+        )
+
+    policy = os.environ.get('RATELIMIT_POLICY', 'even')
+    min_interval = float(os.environ['MIN_TIME_BETWEEN_REQUESTS_S'])
+    reserve = int(os.environ.get('RATELIMIT_RESERVE', '1'))
+    if budget_store is None:
+        return RateLimiter(policy=policy, min_interval=min_interval, reserve=reserve)
+    return SharedRateLimiter(
+        budget_store,
+        credentials.username,
+        policy=policy,
+        min_interval=min_interval,
+        reserve=reserve,
+        lease_size=int(os.environ.get('RATELIMIT_LEASE_SIZE', '5')),
+        lease_seconds=float(os.environ.get('RATELIMIT_LEASE_S', '10')),
+        on_store_error=on_store_error
+    )
+
+
+def _create_health(logger, credentials):
+    """Creates the endpoint health for the account with the given credentials
+    as configured by the environment"""
+    def on_open(circuit, failures, delay):
+        logger.print(
+            Level.WARN,
+            'Circuit {} for {} opened for {} seconds after {} failures in a row',
+            circuit, credentials.username, round(delay, 3), failures
+        )
+
+    return EndpointHealth(
+        int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', '3')),
+        float(os.environ.get('CIRCUIT_BASE_DELAY_S', '10')),
+        float(os.environ.get('CIRCUIT_MAX_DELAY_S', '1800')),
+        on_open=on_open
+    )
+
+
+def _create_backoff():
+    """Creates the backoff for when reddit throttles an account as configured
+    by the environment"""
+    return ThrottleBackoff(
+        float(os.environ.get('THROTTLE_BASE_DELAY_S', '1')),
+        float(os.environ.get('THROTTLE_MAX_DELAY_S', '300'))
+    )
+
+
+def _create_metrics(logger):
+    """Creates the metrics and starts serving them if configured by the
+    environment"""
+    def on_collect_error(name):
+        logger.exception(Level.WARN, 'Failed to collect metric {}; skipping it', name)
+        logger.connection.commit()
+
+    metrics = ProxyMetrics(MetricsRegistry(on_collect_error=on_collect_error))
+    port = os.environ.get('METRICS_PORT', '')
+    if port:
+        host = os.environ.get('METRICS_HOST', '127.0.0.1')
+        metrics.registry.start_server(host, int(port))
+        logger.print(Level.INFO, 'Serving metrics at http://{}:{}/metrics', host, port)
+        logger.connection.commit()
+    return metrics
+
+
+def _create_auth_refresher(logger, login, credentials):
+    """Creates an AuthRefresher for the account with the given credentials
+    which logs in with the given function, loading the saved authorization if
+    there is one. It is not started."""
+    def on_error(message):
+        logger.exception(Level.WARN, '{}', message)
+        logger.connection.commit()
+
+    path = os.environ.get('REDDIT_AUTH_PATH', os.path.join(PERSIST_DIR, 'reddit_auth.json'))
+    return AuthRefresher(
+        login,
+        credentials.username,
+        credentials.client_id,
+        store=AuthStore(path, on_error=on_error) if path else None,
+        refresh_ahead=float(os.environ.get('AUTH_REFRESH_AHEAD_S', '300')),
+        on_error=on_error
+    )
+
+
+def _check_response_queue(logger, response_queues, body):
+    """Checks the version in the given request against the newest version we
+    have seen for its response queue, updating our information about the
+    response queue.
+
+    :param logger: The logger to use
+    :param response_queues: The ResponseQueueRegistry
+    :param body: The parsed and validated request body
+    :return: 'new' if this is the first we've heard of the response queue,
+        'outdated' if the request should be ignored since the response queue
+        has connected with a newer version, and 'current' otherwise
+    """
+    result = 'current'
+    version = response_queues.version(body['response_queue'])
+    if version is None:
+        logger.print(
+            Level.DEBUG,
+            'New response queue {} detected at version {}',
+            body['response_queue'], body['version_utc_seconds']
+        )
+        result = 'new'
+    elif not body.get('ignore_version') and body['version_utc_seconds'] < version:
+        logger.print(
+            Level.DEBUG,
+            'Ignoring message to response queue {} with type {}; '
+            'specified version={} is below current version={}',
+            body['response_queue'], body['type'], body['version_utc_seconds'], version
+        )
+        return 'outdated'
+    elif body['version_utc_seconds'] > version:
+        logger.print(
+            Level.DEBUG,
+            'Detected newer version for response queue {}, was {} and is now {}',
+            body['response_queue'], version, body['version_utc_seconds']
+        )
+
+    response_queues.seen(body['response_queue'], body['version_utc_seconds'])
+    return result
+
+
+def _build_response(queue, body, handle_style, status, info, retry_policy, timing=None):
+    """Determines how to respond to the given request according to the handle
+    style. The timing breakdown, if not None, is included in the packets sent
+    to the response queue.
+
+    :return routing_key: The queue to publish the response packet to
+    :return packet: The packet to publish, or None to not publish anything
+    :return ack: True if the request should be acked, False if it should be
+        nacked without requeueing
+    :return delay: None to publish the packet normally, otherwise the routing
+        key is a delay queue (see retries.py) and this is how many seconds
+        the packet should stay in it
+    """
+    if body['response_queue'].startswith('void'):
+        return None, None, True, None
+    if handle_style['operation'] == 'retry' and not retry_policy.exhausted(body, handle_style):
+        new_bod = body.copy()
+        new_bod['ignore_version'] = handle_style.get('ignore_version', False)
+        new_bod['attempt'] = retry_policy.next_attempt(body)
+        delay = retry_policy.delay_for(new_bod['attempt'])
+        if delay > 0:
+            return retry_policy.delay_queue(queue, new_bod['attempt']), new_bod, False, delay
+        return queue, new_bod, False, None
+
+    ack = True
+    if handle_style['operation'] == 'expired':
+        packet = {
+            'uuid': body['uuid'],
+            'type': 'expired'
+        }
+    elif handle_style['operation'] == 'copy':
+        packet = {
+            'uuid': body['uuid'],
+            'type': 'copy',
+            'status': status,
+            'info': info
+        }
+    elif handle_style['operation'] == 'success':
+        packet = {
+            'uuid': body['uuid'],
+            'type': 'success'
+        }
+    else:
+        packet = {
+            'uuid': body['uuid'],
+            'type': 'failure'
+        }
+        ack = False
+
+    if timing is not None:
+        packet['timing'] = timing
+    return body['response_queue'], packet, ack, None
+
+
+def _respond(channel, queue, body, delivery_tag, handle_style, status, info, retry_policy,
+             timing=None):
+    """Sends the response to the given request according to the handle style
+    and acks or nacks the message. Must be called on the connection thread."""
+    routing_key, packet, ack, delay = _build_response(
+        queue, body, handle_style, status, info, retry_policy, timing=timing
+    )
+    if packet is not None and delay is not None:
+        if routing_key not in retry_policy.declared_queues:
+            channel.queue_declare(
+                routing_key, arguments=retry_policy.delay_queue_arguments(queue)
+            )
+            retry_policy.declared_queues.add(routing_key)
+        channel.basic_publish(
+            '', routing_key, json.dumps(packet),
+            properties=pika.BasicProperties(expiration=str(int(delay * 1000)))
+        )
+    elif packet is not None:
+        channel.basic_publish('', routing_key, json.dumps(packet))
+    if ack:
+        channel.basic_ack(delivery_tag)
+    else:
+        channel.basic_nack(delivery_tag, requeue=False)
+
+
+def _auth(reddit, logger, credentials):
+    raw_resp = reddit.login(
+        credentials.username, credentials.password,
+        credentials.client_id, credentials.client_secret
+    )
+    if raw_resp.status_code < 200 or raw_resp.status_code > 299:
+        logger.print(
+            Level.WARN,
+            'Failed to login as {}; got status code {}',
+            credentials.username, raw_resp.status_code
+        )
+        return None
+
+    logger.print(Level.DEBUG, 'Successfully relogged in as {}', credentials.username)
+    return Auth.from_response(raw_resp)
+
+
+def _get_priority(handler, body):
+    """Gets the priority of the given request; higher priority requests are
+    handled first when more than one is waiting. This is the "priority" in
+    the packet if there is one, otherwise the default for the handler."""
+    if body.get('priority') is not None:
+        return body['priority']
+    return getattr(handler, 'priority', 0)
+
+
+def _get_handle_style(style, status, defaults=DEFAULT_STYLE):
+    if status == 'success':
+        return {'operation': 'success', 'log_level': 'TRACE'}
+    if status == 'failure':
+        return {'operation': 'failure', 'log_level': 'TRACE'}
+
+    if style is None:
+        if defaults is None:
+            raise Exception('should not get here - no style or fallback')
+        return _get_handle_style(defaults, status, defaults=None)
+
+    best_match = None
+    if style.get(str(status)) is not None:
+        best_match = style[str(status)]
+    elif style.get(str(status)[0] + 'xx') is not None:
+        best_match = style[str(status)[0] + 'xx']
+
+    if best_match is None:
+        if defaults is None:
+            return FALLBACK_STYLE
+        return _get_handle_style(defaults, status, defaults=None)
+
+    if defaults is not None:
+        best_match = best_match.copy()
+        fill_with = _get_handle_style(defaults, status, defaults=None)
+        for k, v in fill_with.items():
+            if k not in best_match:
+                best_match[k] = v
+
+    return best_match
+
+
+def _detect_structure_errors_with_logging(logger, body_str, body):
+    # we try to parse the most things most likely to identify the client first,
+    # to make tracking down the source easier
+    resp_queue = body.get('response_queue')
+    if not isinstance(resp_queue, str):
+        logger.print(
+            Level.WARN,
+            'Received malformed packet {} '
+            '(response_queue has type {} instead of str)',
+            body_str, type(resp_queue).__name__
+        )
+        return True
+
+    vers_utc = body.get('version_utc_seconds')
+    if not isinstance(vers_utc, (int, float)):
+        logger.print(
+            Level.WARN,
+            'Received malformed packet requesting a response to {} '
+            '(vers_utc has type {} instead of int or float); body_str={}',
+            resp_queue, type(vers_utc).__name__, body_str
+        )
+        return True
+
+    simple_checks = [
+        ('type', str), ('uuid', str), ('sent_at', (int, float)),
+        ('style', (dict, type(None))), ('ignore_version', (bool, type(None))),
+        ('no_cache', (bool, type(None))), ('max_age', (int, float, type(None))),
+        ('priority', (int, type(None))), ('deadline', (int, float, type(None))),
+        ('ttl_seconds', (int, float, type(None))), ('attempt', (int, type(None))),
+        ('account', (str, type(None))), ('timing', (bool, type(None)))
+    ]
+    for key, types in simple_checks:
+        val = body.get(key)
+        if not isinstance(val, types):
+            logger.print(
+                Level.WARN,
+                'Received malformed packet (response_queue={}, version_utc={}) '
+                '({} has type {} instead of {}}); body_str={}',
+                resp_queue, vers_utc, key, type(val).__name__, types, body_str
+            )
+            return True
+
+    attempt = body.get('attempt')
+    if attempt is not None and not 1 <= attempt <= MAX_ATTEMPT:
+        logger.print(
+            Level.WARN,
+            'Received malformed packet (response_queue={}, version_utc={}) '
+            'attempt should be between 1 and {} but got {}; body_str={}',
+            resp_queue, vers_utc, MAX_ATTEMPT, attempt, body_str
+        )
+        return True
+
+    if body.get('style'):
+        bonus_allowed_style_keys = {'2xx', '3xx', '4xx', '5xx'}
+        for key, val in body['style'].items():
+            if key not in bonus_allowed_style_keys:
+                try:
+                    key_num = int(key)
+                except ValueError:
+                    key_num = -1  # we'll error out in a moment
+
+                if key_num < 200 or key_num > 599:
+                    logger.print(
+                        Level.WARN,
+                        'Received malformed packet (response_queue={}, version_utc={}) '
+                        'style has invalid key {} ; expected one of {} or a '
+                        'base-10 repr of an int a where 200 <= a <= 599; '
+                        'body_str={}',
+                        resp_queue, vers_utc, key, bonus_allowed_style_keys, body_str
+                    )
+                    return True
+
+            if not isinstance(val, dict):
+                logger.print(
+                    Level.WARN,
+                    'Received malformed packet (response_queue={}, version_utc={}) '
+                    'style[\'{}\'] has malformed value; expected type dict but got '
+                    '{}; body_str={}',
+                    resp_queue, vers_utc, key, type(val).__name__, body_str
+                )
+                return True
+
+            operation = val.get('operation')
+            if not isinstance(operation, str):
+                logger.print(
+                    Level.WARN,
+                    'Received malformed packet (response_queue={}, version_utc={}) '
+                    'style[\'{}\'][\'operation\'] has a malformed value; expected type '
+                    'str but got {}; body_str={}',
+                    resp_queue, vers_utc, key, type(operation).__name__, body_str
+                )
+                return True
+
+            if operation not in VALID_OPERATIONS:
+                logger.print(
+                    Level.WARN,
+                    'Received malformed packet (response_queue={}, version_utc={}) '
+                    'style[\'{}\'][\'operation\'] should be one of {} but got {}; '
+                    'body_str={}',
+                    resp_queue, vers_utc, key, VALID_OPERATIONS, operation, body_str
+                )
+                return True
+
+            loglevel = val.get('log_level')
+            if not isinstance(loglevel, (type(None), str)):
+                logger.print(
+                    Level.WARN,
+                    'Received malformed packet (response_queue={}, version_utc={}) '
+                    'style[\'{}\'][\'log_level\'] should be None or a str, but got '
+                    '{}; body_str={}',
+                    resp_queue, vers_utc, key, type(loglevel).__name__, body_str
+                )
+                return True
+
+            if loglevel not in (None, 'NONE') and not hasattr(Level, loglevel):
+                logger.print(
+                    Level.WARN,
+                    'Received malformed packet (response_queue={}, version_utc={}) '
+                    'style[\'{}\'][\'log_level\'] does not have a recognized value. '
+                    'Got {}; body_str={}',
+                    resp_queue, vers_utc, key, loglevel, body_str
+                )
+                return True
+
+            if operation == 'retry':
+                ignore_version = val.get('ignore_version')
+                if not isinstance(ignore_version, (type(None), bool)):
+                    logger.print(
+                        Level.WARN,
+                        'Received malformed packet (response_queue={}, version_utc={}) '
+                        'style[\'{}\'][\'ignore_version\'] should be a bool or None, but '
+                        'got {}; body_str={}',
+                        resp_queue, vers_utc, key, type(ignore_version).__name__, body_str
+                    )
+                    return True
+
+                max_attempts = val.get('max_attempts')
+                if max_attempts is not None and (
+                        isinstance(max_attempts, bool)
+                        or not isinstance(max_attempts, int)
+                        or max_attempts < 1):
+                    logger.print(
+                        Level.WARN,
+                        'Received malformed packet (response_queue={}, version_utc={}) '
+                        'style[\'{}\'][\'max_attempts\'] should be a positive int or None, '
+                        'but got {}; body_str={}',
+                        resp_queue, vers_utc, key, repr(max_attempts), body_str
+                    )
+                    return True
+
+    return False
+
+
+def _get_handlers(logger):
+    handlers = []
+    for module_name in catalog.HANDLER_MODULES:
+        logger.print(Level.TRACE, 'Loading handler {}', module_name)
+        handlers += catalog.load_handlers(module_name)
+    logger.print(
+        Level.DEBUG,
+        'Import times (ms): {}',
+        dict((name, round(secs * 1000, 2)) for name, secs in catalog.import_times().items())
+    )
+    logger.connection.commit()
+    return handlers
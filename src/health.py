@@ -0,0 +1,214 @@
+"""Tracks the health of each endpoint for an account, so that failures only
+slow down the traffic which is failing rather than every request.
+
+Failures are tracked per circuit. Server errors (5xx) and transport errors
+(the request raised) count against the circuit for the whole endpoint, since
+they mean reddit can't serve that endpoint right now. Client errors (4xx
+other than 429) count against the circuit for the endpoint and the subreddit
+the request was about, e.g., user_is_banned on a subreddit we don't moderate,
+and are ignored for requests which aren't about a subreddit since they are
+usually about the arguments (e.g., show_user for a deleted user). Throttling
+(429) applies to the whole account and is handled by backoff.py instead.
+
+Once a circuit has failed `threshold` times in a row it opens, and requests
+through it are refused with CircuitOpen without being sent, for base_delay
+seconds doubling with each further failure up to max_delay. Afterwards
+requests are sent again and the first success closes the circuit.
+"""
+from inspect import signature
+import threading
+import time
+from reddit import get_endpoint
+
+
+EXEMPT_ENDPOINTS = frozenset(('login', 'revoke_auth'))
+"""Endpoints which aren't tracked, since the auth refresher has its own
+backoff"""
+
+
+class CircuitOpen(Exception):
+    """Raised instead of sending a request through an open circuit.
+
+    :param circuit: The name of the circuit, e.g., 'user_is_banned r/borrow'
+    :param status_code: The status code to respond with; 503 for endpoints
+        which are failing, otherwise the last client error for the target
+    :param retry_in: Seconds until the circuit lets requests through again
+    """
+    def __init__(self, circuit, status_code, retry_in):
+        super().__init__(
+            f'circuit {circuit} is open for {round(retry_in, 3)} more seconds'
+        )
+        self.circuit = circuit
+        self.status_code = status_code
+        self.retry_in = retry_in
+
+
+class EndpointHealth:
+    """The circuits for the endpoints used by one account. Thread-safe.
+
+    :param threshold: The number of failures in a row which opens a circuit
+    :param base_delay: The seconds a circuit stays open when it first opens
+    :param max_delay: The most seconds a circuit stays open
+    :param on_open: Optional. Called with the name of the circuit, the
+        number of failures in a row and the seconds it's open for whenever a
+        circuit opens
+    """
+    def __init__(self, threshold, base_delay, max_delay, on_open=None):
+        self.threshold = threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.on_open = on_open
+        self.lock = threading.Lock()
+        self.circuits = {}
+        self.num_refused = 0
+
+    def check(self, endpoint, subreddit=None):
+        """Raises CircuitOpen if a request to the given endpoint about the
+        given subreddit should not be sent right now"""
+        with self.lock:
+            if not self.circuits:
+                return
+            now = time.monotonic()
+            for key in ((endpoint, None), (endpoint, subreddit)):
+                circuit = self.circuits.get(key)
+                if circuit is not None and circuit.open_until > now:
+                    self.num_refused += 1
+                    raise CircuitOpen(
+                        _circuit_name(key), circuit.status_code, circuit.open_until - now
+                    )
+                if subreddit is None:
+                    break
+
+    def record(self, endpoint, subreddit, status_code):
+        """Records the response to a request to the given endpoint about the
+        given subreddit, or None if it wasn't about a subreddit"""
+        if status_code >= 500:
+            self._fail((endpoint, None), 503)
+            return
+        if status_code == 429:
+            return
+
+        with self.lock:
+            if self.circuits:
+                # reddit is serving the endpoint, even if not this request
+                self.circuits.pop((endpoint, None), None)
+                if status_code < 400:
+                    self.circuits.pop((endpoint, subreddit), None)
+        if status_code >= 400 and subreddit is not None:
+            self._fail((endpoint, subreddit), status_code)
+
+    def record_error(self, endpoint):
+        """Records that a request to the given endpoint raised"""
+        self._fail((endpoint, None), 503)
+
+    def open_circuits(self):
+        """Get the number of circuits which are refusing requests"""
+        now = time.monotonic()
+        with self.lock:
+            return sum(1 for circuit in self.circuits.values() if circuit.open_until > now)
+
+    def stats(self):
+        """Get a dict describing every circuit which failed recently"""
+        now = time.monotonic()
+        with self.lock:
+            return {
+                'refused': self.num_refused,
+                'circuits': dict(
+                    (_circuit_name(key), {
+                        'failures': circuit.failures,
+                        'open_seconds': round(max(0, circuit.open_until - now), 3)
+                    })
+                    for key, circuit in self.circuits.items()
+                )
+            }
+
+    def _fail(self, key, status_code):
+        with self.lock:
+            circuit = self.circuits.get(key)
+            if circuit is None:
+                circuit = _Circuit()
+                self.circuits[key] = circuit
+            circuit.failures += 1
+            circuit.status_code = status_code
+            failures = circuit.failures
+            if failures < self.threshold:
+                return
+            delay = min(self.base_delay * (2 ** (failures - self.threshold)), self.max_delay)
+            circuit.open_until = time.monotonic() + delay
+
+        if self.on_open is not None:
+            self.on_open(_circuit_name(key), failures, delay)
+
+
+class _Circuit:
+    def __init__(self):
+        self.failures = 0
+        self.status_code = None
+        self.open_until = 0
+
+
+def middleware(health):
+    """Get the middleware (see reddit.EndpointHooks) which checks and records
+    the given EndpointHealth around every request"""
+    def factory(name, call):
+        if name in EXEMPT_ENDPOINTS:
+            return call
+        get_subreddit = _subreddit_getter(name)
+
+        def checked(*args, **kwargs):
+            subreddit = get_subreddit(args, kwargs)
+            health.check(name, subreddit)
+            try:
+                result = call(*args, **kwargs)
+            except Exception:
+                health.record_error(name)
+                raise
+            health.record(name, subreddit, result.status_code)
+            return result
+        return checked
+    return factory
+
+
+def async_middleware(health):
+    """The equivalent of middleware for AsyncReddit"""
+    def factory(name, call):
+        if name in EXEMPT_ENDPOINTS:
+            return call
+        get_subreddit = _subreddit_getter(name)
+
+        async def checked(*args, **kwargs):
+            subreddit = get_subreddit(args, kwargs)
+            health.check(name, subreddit)
+            try:
+                result = await call(*args, **kwargs)
+            except Exception:
+                health.record_error(name)
+                raise
+            health.record(name, subreddit, result.status_code)
+            return result
+        return checked
+    return factory
+
+
+def _subreddit_getter(name):
+    """Get a function which finds the subreddit in the arguments to the
+    endpoint with the given name, or returns None if it doesn't take one"""
+    params = list(signature(get_endpoint(name).make_request).parameters)
+    for param in ('subreddit', 'subreddits'):
+        if param in params:
+            idx = params.index(param)
+            break
+    else:
+        return lambda args, kwargs: None
+
+    def get_subreddit(args, kwargs):
+        value = args[idx] if len(args) > idx else kwargs.get(param)
+        if isinstance(value, (list, tuple)):
+            return ','.join(sorted(value))
+        return value
+    return get_subreddit
+
+
+def _circuit_name(key):
+    endpoint, subreddit = key
+    return endpoint if subreddit is None else f'{endpoint} r/{subreddit}'
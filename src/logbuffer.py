@@ -0,0 +1,177 @@
+"""Moves writing logs to Postgres off of the thread handling requests. Records
+are queued in memory and a background thread writes them with the real logger
+in batches, committing once per batch rather than once per record.
+
+The buffered logger has the same interface as the lblogging Logger as far as
+the rest of this application uses it, so it can be passed anywhere a Logger
+is expected. Calling `logger.connection.commit()` on it does not wait for the
+database; the records are committed by the writer within the flush interval.
+"""
+import queue
+import threading
+import time
+import traceback
+
+
+class LogBuffer:
+    """Owns the queue of pending records and the thread which writes them.
+
+    :param logger: The real lblogging Logger to write records with. Nothing
+        else should use it without holding this buffer's lock once the buffer
+        has been created.
+    :param max_batch: The most records to write in a single transaction
+    :param flush_interval: The longest time in seconds a record may wait in
+        the buffer before it is written
+    :param max_pending: The most records which may be waiting at once; beyond
+        this, logging blocks until the writer catches up
+    """
+    def __init__(self, logger, max_batch=100, flush_interval=1.0, max_pending=10000):
+        self.real_logger = logger
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.records = queue.Queue(maxsize=max_pending)
+        self.lock = threading.Lock()
+        self.closed = False
+        self.num_written = 0
+        self.num_batches = 0
+        self.num_dropped = 0
+        self.real_loggers = {None: logger}
+        self.logger = BufferedLogger(self, None)
+        self.thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self.thread.start()
+
+    def put(self, iden, level, message, args):
+        """Queues a record to be written with the given iden, where None is
+        the iden of the real logger. If the buffer has been closed the record
+        is written immediately instead."""
+        if self.closed:
+            with self.lock:
+                self._write_one(iden, level, message, args)
+                self.real_logger.connection.commit()
+            return
+        self.records.put((iden, level, message, args))
+
+    def flush(self):
+        """Blocks until every record queued before this call is committed"""
+        if self.closed:
+            return
+        done = threading.Event()
+        self.records.put(done)
+        done.wait()
+
+    def close(self):
+        """Writes every pending record and stops the writer thread. Records
+        logged after this are written synchronously."""
+        if self.closed:
+            return
+        self.flush()
+        self.closed = True
+        self.records.put(None)
+        self.thread.join()
+
+    def stats(self):
+        """Get a dict with the counters for this buffer"""
+        return {
+            'pending': self.records.qsize(),
+            'written': self.num_written,
+            'batches': self.num_batches,
+            'dropped': self.num_dropped
+        }
+
+    def _run(self):
+        while True:
+            batch = []
+            events = []
+            item = self.records.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    self._write_batch(batch, events)
+                    return
+                if isinstance(item, threading.Event):
+                    events.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.records.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            self._write_batch(batch, events)
+
+    def _write_batch(self, batch, events):
+        try:
+            if batch:
+                with self.lock:
+                    try:
+                        for iden, level, message, args in batch:
+                            self._write_one(iden, level, message, args)
+                        self.real_logger.connection.commit()
+                        self.num_written += len(batch)
+                        self.num_batches += 1
+                    except:  # noqa: E722
+                        print(f'Failed to write a batch of {len(batch)} log records')
+                        traceback.print_exc()
+                        self.num_dropped += len(batch)
+                        try:
+                            self.real_logger.connection.rollback()
+                        except:  # noqa: E722
+                            traceback.print_exc()
+        finally:
+            for event in events:
+                event.set()
+
+    def _write_one(self, iden, level, message, args):
+        real_logger = self.real_loggers.get(iden)
+        if real_logger is None:
+            real_logger = self.real_logger.with_iden(iden)
+            self.real_loggers[iden] = real_logger
+        real_logger.print(level, message, *args)
+
+
+class BufferedLogger:
+    """Acts like an lblogging Logger but queues its records on a LogBuffer.
+
+    :param buffer: The LogBuffer to queue records on
+    :param iden: The identifier records from this logger are written with, or
+        None to use the identifier of the real logger
+    """
+    def __init__(self, buffer, iden):
+        self.buffer = buffer
+        self.iden = iden
+        self.connection = _BufferedConnection(buffer)
+
+    def with_iden(self, iden):
+        return BufferedLogger(self.buffer, iden)
+
+    def print(self, level, message, *args):
+        self.buffer.put(self.iden, level, message, args)
+
+    def exception(self, level, message=None, *args):
+        # the traceback has to be captured now, since the writer thread will
+        # not be handling the exception
+        text = traceback.format_exc()
+        if message is not None:
+            text = message.format(*args) + '\n' + text
+        self.buffer.put(self.iden, level, '{}', (text,))
+
+    def close(self):
+        self.buffer.close()
+
+
+class _BufferedConnection:
+    """Stands in for the Postgres connection of a BufferedLogger. Commits are
+    handled by the writer thread, so commit() here doesn't need to do
+    anything."""
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+    def commit(self):
+        pass
+
+    def close(self):
+        self.buffer.close()
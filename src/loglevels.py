@@ -0,0 +1,104 @@
+"""Drops log records below a configurable level before they are formatted or
+written anywhere. The minimum level can be lowered (or raised) for the
+requests to particular response queues, so one client can be debugged without
+turning on TRACE for the whole proxy.
+
+The levels are configured with the environment variables LOG_MIN_LEVEL, e.g.
+"INFO", and LOG_LEVEL_OVERRIDES, a comma-separated list of
+response_queue=LEVEL pairs, e.g. "loansbot=TRACE,other=DEBUG".
+"""
+from contextlib import contextmanager
+import contextvars
+import os
+
+
+LEVEL_NAMES = ('TRACE', 'DEBUG', 'INFO', 'WARN', 'ERROR')
+"""The names of the log levels from least to most severe"""
+
+_current_response_queue = contextvars.ContextVar('response_queue', default=None)
+
+
+class LevelGatedLogger:
+    """Wraps a logger so that records below the minimum level for the current
+    response queue are dropped. Levels not in LEVEL_NAMES are never dropped.
+
+    :param logger: The logger to pass records on to
+    :param min_level: The name of the least severe level which is kept
+    :param overrides: A dict from response queue names to the name of the
+        least severe level which is kept while handling their requests
+    """
+    def __init__(self, logger, min_level='TRACE', overrides=None):
+        self.logger = logger
+        self.connection = logger.connection
+        self.min_rank = _rank(min_level)
+        self.override_ranks = dict(
+            (queue, _rank(level)) for queue, level in (overrides or {}).items()
+        )
+
+    def enabled(self, level):
+        """Determines if a record at the given level would be kept. Callers
+        can use this to skip building expensive arguments."""
+        name = getattr(level, 'name', None)
+        if name not in LEVEL_NAMES:
+            return True
+        min_rank = self.min_rank
+        if self.override_ranks:
+            queue = _current_response_queue.get()
+            if queue is not None:
+                min_rank = self.override_ranks.get(queue, min_rank)
+        return LEVEL_NAMES.index(name) >= min_rank
+
+    def with_iden(self, iden):
+        result = LevelGatedLogger(self.logger.with_iden(iden))
+        result.min_rank = self.min_rank
+        result.override_ranks = self.override_ranks
+        return result
+
+    def print(self, level, message, *args):
+        if self.enabled(level):
+            self.logger.print(level, message, *args)
+
+    def exception(self, level, *args):
+        if self.enabled(level):
+            self.logger.exception(level, *args)
+
+    def close(self):
+        self.logger.close()
+
+
+def gate(logger):
+    """Wraps the given logger with the levels configured in the environment,
+    unless it's already wrapped"""
+    if isinstance(logger, LevelGatedLogger):
+        return logger
+
+    overrides = {}
+    for pair in os.environ.get('LOG_LEVEL_OVERRIDES', '').split(','):
+        if not pair.strip():
+            continue
+        queue, _, level = pair.partition('=')
+        overrides[queue.strip()] = level.strip()
+
+    return LevelGatedLogger(
+        logger,
+        min_level=os.environ.get('LOG_MIN_LEVEL', 'TRACE'),
+        overrides=overrides
+    )
+
+
+@contextmanager
+def for_response_queue(response_queue):
+    """Within this context, log records use the minimum level for the given
+    response queue. This is local to the current thread or asyncio task."""
+    token = _current_response_queue.set(response_queue)
+    try:
+        yield
+    finally:
+        _current_response_queue.reset(token)
+
+
+def _rank(level_name):
+    name = level_name.upper()
+    if name not in LEVEL_NAMES:
+        raise ValueError(f'Unknown log level {level_name}; expected one of {LEVEL_NAMES}')
+    return LEVEL_NAMES.index(name)
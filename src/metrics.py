@@ -0,0 +1,348 @@
+"""An in-process registry of metrics, served in the Prometheus text format
+over a small HTTP server which is meant to be scraped locally.
+
+Counters and histograms are updated as things happen, whereas values which
+another component already tracks (such as the remaining ratelimit budget) are
+registered as callbacks and read whenever the metrics are scraped.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import math
+import threading
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+"""The default upper bounds for histogram buckets, in seconds"""
+
+
+class Counter:
+    """A value which only goes up, with one value per combination of labels.
+
+    :param name: The name of the metric
+    :param help: The description of the metric
+    :param labels: The names of the labels, which must all be passed when
+        incrementing
+    """
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """Increments the value for the given labels by the given amount"""
+        key = _label_values(self.labels, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            return [(self.name, dict(zip(self.labels, key)), value)
+                    for key, value in self.values.items()]
+
+
+class Gauge(Counter):
+    """A value which may go up or down, with one value per combination of
+    labels"""
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        """Sets the value for the given labels"""
+        key = _label_values(self.labels, labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram:
+    """Counts observations into cumulative buckets, with one set of buckets
+    per combination of labels.
+
+    :param name: The name of the metric
+    :param help: The description of the metric
+    :param labels: The names of the labels, which must all be passed when
+        observing
+    :param buckets: The upper bounds of the buckets, ascending. A bucket for
+        everything is always added.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets) + (math.inf,)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """Records an observation of the given value for the given labels"""
+        key = _label_values(self.labels, labels)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+                self.values[key] = entry
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry['counts'][idx] += 1
+                    break
+            entry['sum'] += value
+            entry['count'] += 1
+
+    def samples(self):
+        result = []
+        with self.lock:
+            for key, entry in self.values.items():
+                labels = dict(zip(self.labels, key))
+                cumulative = 0
+                for bound, count in zip(self.buckets, entry['counts']):
+                    cumulative += count
+                    result.append((
+                        self.name + '_bucket',
+                        dict(labels, le='+Inf' if bound == math.inf else repr(float(bound))),
+                        cumulative
+                    ))
+                result.append((self.name + '_sum', labels, entry['sum']))
+                result.append((self.name + '_count', labels, entry['count']))
+        return result
+
+
+class Callback:
+    """A metric whose values are read from a function when scraped.
+
+    :param name: The name of the metric
+    :param help: The description of the metric
+    :param kind: Either 'counter' or 'gauge'
+    :param func: A function which takes no arguments and returns a list of
+        (labels, value) tuples, where labels is a dict. Values which are None
+        are skipped.
+    """
+    def __init__(self, name, help, kind, func):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.func = func
+
+    def samples(self):
+        return [(self.name, labels, value) for labels, value in self.func() if value is not None]
+
+
+class MetricsRegistry:
+    """Holds every metric by name and renders them. Thread-safe.
+
+    :param on_collect_error: Optional. Called with the name of the metric
+        while handling the exception whenever collecting a metric fails, after
+        which it's left out of that render
+    """
+    def __init__(self, on_collect_error=None):
+        self.on_collect_error = on_collect_error
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.server = None
+
+    def counter(self, name, help, labels=()):
+        """Get a new Counter registered with this registry"""
+        return self._register(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+        """Get a new Gauge registered with this registry"""
+        return self._register(Gauge(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        """Get a new Histogram registered with this registry"""
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def callback(self, name, help, kind, func):
+        """Registers a metric whose values are read from the given function;
+        see Callback"""
+        return self._register(Callback(name, help, kind, func))
+
+    def render(self):
+        """Get every metric in the Prometheus text format"""
+        with self.lock:
+            metrics = list(self.metrics.values())
+
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.samples()
+            except:  # noqa: E722
+                if self.on_collect_error is not None:
+                    self.on_collect_error(metric.name)
+                continue
+            lines.append(f'# HELP {metric.name} {_escape_help(metric.help)}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in samples:
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def start_server(self, host, port):
+        """Starts serving the metrics at /metrics on the given address from a
+        background thread"""
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.server.daemon_threads = True
+        thread = threading.Thread(
+            target=self.server.serve_forever, name='metrics-server', daemon=True
+        )
+        thread.start()
+
+    def stop_server(self):
+        """Stops serving the metrics, if we were"""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def _register(self, metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f'metric {metric.name} is already registered')
+            self.metrics[metric.name] = metric
+        return metric
+
+
+class ProxyMetrics:
+    """The metrics reported by both engines.
+
+    :param registry: The MetricsRegistry to register them with
+    """
+    def __init__(self, registry):
+        self.registry = registry
+        self.requests = registry.counter(
+            'reddit_proxy_requests_total',
+            'Requests answered, by request type and status',
+            ('type', 'status')
+        )
+        self.reddit_latency = registry.histogram(
+            'reddit_proxy_reddit_request_seconds',
+            'Round trip time of requests to reddit, by endpoint',
+            ('endpoint',)
+        )
+        self.ratelimit_wait = registry.histogram(
+            'reddit_proxy_ratelimit_wait_seconds',
+            'Time spent waiting before a request to reddit, on the ratelimit '
+            'budget or backing off after being throttled, by account',
+            ('account',)
+        )
+        self.request_phase = registry.histogram(
+            'reddit_proxy_request_phase_seconds',
+            'Time spent by each request in each phase of handling it, by phase '
+            '(see timing.py)',
+            ('phase',)
+        )
+        self.consume_idle = registry.counter(
+            'reddit_proxy_consume_idle_seconds_total',
+            'Time the consume loop spent waiting for the next message'
+        )
+
+    def watch_accounts(self, accounts):
+        """Reports the authorization, ratelimit and health state of every
+        account in the given CredentialPool when scraped"""
+        def per_account(func):
+            return lambda: [({'account': account.username}, func(account))
+                            for account in accounts.accounts]
+
+        self.registry.callback(
+            'reddit_proxy_auth_refreshes_total',
+            'Successful logins to reddit, by account',
+            'counter',
+            per_account(lambda account: account.auth_refresher.num_refreshes)
+        )
+        self.registry.callback(
+            'reddit_proxy_auth_failures_total',
+            'Failed logins to reddit, by account',
+            'counter',
+            per_account(lambda account: account.auth_refresher.num_failures)
+        )
+        self.registry.callback(
+            'reddit_proxy_ratelimit_remaining',
+            'Requests remaining in the current ratelimit window as last reported '
+            'by reddit, by account; missing while unknown',
+            'gauge',
+            per_account(lambda account: account.ratelimiter.stats()['remaining'])
+        )
+        self.registry.callback(
+            'reddit_proxy_ratelimit_reset_seconds',
+            'Seconds until the current ratelimit window resets, by account; '
+            'missing while unknown',
+            'gauge',
+            per_account(lambda account: account.ratelimiter.stats()['reset_in_seconds'])
+        )
+        self.registry.callback(
+            'reddit_proxy_open_circuits',
+            'Circuits refusing requests because an endpoint, or an endpoint for '
+            'a subreddit, keeps failing, by account (see health.py)',
+            'gauge',
+            per_account(lambda account: account.health.open_circuits())
+        )
+        self.registry.callback(
+            'reddit_proxy_backoff_seconds',
+            'Seconds until requests are sent again after reddit throttled the '
+            'account, by account (see backoff.py)',
+            'gauge',
+            per_account(lambda account: account.backoff_remaining())
+        )
+
+    def watch_backpressure(self, backpressure):
+        """Reports whether we have stopped consuming because of the given
+        Backpressure, and how many requests it gave back, when scraped"""
+        self.registry.callback(
+            'reddit_proxy_consume_paused_seconds',
+            'Seconds until we start consuming again after stopping because '
+            'requests would have to wait too long (see backpressure.py)',
+            'gauge',
+            lambda: [({}, backpressure.remaining())]
+        )
+        self.registry.callback(
+            'reddit_proxy_released_requests_total',
+            'Requests given back to the queue instead of waiting too long to '
+            'make them',
+            'counter',
+            lambda: [({}, backpressure.num_released)]
+        )
+
+
+def _label_values(names, labels):
+    if set(names) != set(labels):
+        raise ValueError(f'expected labels {names}, got {tuple(labels)}')
+    return tuple(str(labels[name]) for name in names)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        '{}="{}"'.format(
+            name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        )
+        for name, value in labels.items()
+    ) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+def _escape_help(help):
+    return help.replace('\\', '\\\\').replace('\n', '\\n')
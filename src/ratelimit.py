@@ -0,0 +1,194 @@
+"""Tracks the rate-limit budget that reddit reports on every response and
+decides how long we need to wait before the next request.
+
+Reddit reports the budget for the current window using three headers:
+
+- x-ratelimit-used: How many requests we've made in the current window
+- x-ratelimit-remaining: How many requests we may still make in the window
+- x-ratelimit-reset: How many seconds until the window resets
+
+Rather than spacing every request by a fixed amount, we spend this budget
+according to a policy:
+
+- `even`: Spread the remaining budget evenly over the time remaining in the
+  window. This is smooth but still uses the entire budget.
+- `burst`: Make requests as fast as they come until the budget is exhausted,
+  then wait for the window to reset.
+
+Responses can arrive out of order and we already count the requests we make
+against the budget, so within a window the remaining budget only ever goes
+down; the budget is replaced only when reddit reports a new window.
+
+Until we've seen any rate-limit headers (or once the window has reset) we
+don't know the budget, so requests are spaced by a fixed minimum interval.
+"""
+import threading
+import time
+
+
+VALID_POLICIES = ('even', 'burst')
+"""The policies that the rate limiter accepts"""
+
+NEW_WINDOW_TOLERANCE_SECONDS = 2
+"""Reddit reports the time until the window resets in whole seconds, so the
+reset time of the same window may appear to move by about this much"""
+
+
+class RateLimiter:
+    """A token-bucket style rate limiter whose bucket is refilled from the
+    rate-limit headers reddit sends back rather than from a local guess.
+    Thread-safe; callers that need to wait are served one at a time.
+
+    :param policy: How to spend the budget; one of VALID_POLICIES
+    :param min_interval: The number of seconds between requests while the
+        budget is unknown.
+    :param reserve: The number of requests in the budget that we will never
+        spend, as a margin for requests which are in-flight or made by other
+        applications using the same account.
+    """
+    def __init__(self, policy='even', min_interval=1.0, reserve=1):
+        if policy not in VALID_POLICIES:
+            raise ValueError(f'policy should be one of {VALID_POLICIES}, got {policy}')
+
+        self.policy = policy
+        self.min_interval = min_interval
+        self.reserve = reserve
+
+        self.used = None
+        self.remaining = None
+        self.reset_at = None
+        self.last_request_at = None
+
+        self.num_acquires = 0
+        self.num_waits = 0
+        self.total_wait_seconds = 0.0
+
+        self._lock = threading.Lock()
+        self._acquire_lock = threading.Lock()
+
+    def update(self, headers):
+        """Update the budget from the headers of a response from reddit. Does
+        nothing if the response doesn't have the rate-limit headers.
+
+        :param headers: The (case-insensitive) headers from the response
+        :return: True if the budget was updated, False otherwise
+        """
+        if 'x-ratelimit-remaining' not in headers or 'x-ratelimit-reset' not in headers:
+            return False
+
+        remaining = float(headers['x-ratelimit-remaining'])
+        reset_at = self._now() + float(headers['x-ratelimit-reset'])
+        used = float(headers['x-ratelimit-used']) if 'x-ratelimit-used' in headers else None
+        with self._lock:
+            new_window = (
+                self.remaining is None
+                or self.reset_at is None
+                or reset_at > self.reset_at + NEW_WINDOW_TOLERANCE_SECONDS
+            )
+            if new_window:
+                self.remaining = remaining
+                self.used = used
+                self.reset_at = reset_at
+            else:
+                self.remaining = min(self.remaining, remaining)
+                if used is not None:
+                    self.used = used if self.used is None else max(self.used, used)
+        return True
+
+    def exhausted(self):
+        """Returns True if we know we have spent the budget for the current
+        window, False otherwise."""
+        with self._lock:
+            return self._budget_known(self._now()) and self.remaining <= self.reserve
+
+    def time_until_ready(self):
+        """Get the number of seconds until the next request could be made
+        according to the current budget."""
+        with self._lock:
+            return self._time_until_ready(self._now())
+
+    def acquire(self):
+        """Block until a request can be made according to the budget and then
+        record that a request is being made.
+
+        :return: The number of seconds spent waiting
+        """
+        waited = 0.0
+        with self._acquire_lock:
+            while True:
+                wait = self.try_acquire(waited)
+                if wait <= 0:
+                    return waited
+                time.sleep(wait)
+                waited += wait
+
+    def try_acquire(self, waited=0.0):
+        """Record that a request is being made if the budget allows it right
+        now, otherwise return how long until it might. This is useful for
+        callers which can't block, such as coroutines.
+
+        :param waited: How many seconds the caller has waited so far, which is
+            included in the stats once the request is recorded.
+        :return: 0 if the request was recorded, otherwise the number of
+            seconds to wait before trying again
+        """
+        with self._lock:
+            now = self._now()
+            wait = self._time_until_ready(now)
+            if wait <= 0:
+                self._record_request(now, waited)
+                return 0
+            return wait
+
+    def stats(self):
+        """Get a dict describing the current budget and how long we have
+        spent waiting on it."""
+        with self._lock:
+            now = self._now()
+            known = self._budget_known(now)
+            return {
+                'policy': self.policy,
+                'used': self.used if known else None,
+                'remaining': self.remaining if known else None,
+                'reset_in_seconds': (self.reset_at - now) if known else None,
+                'num_acquires': self.num_acquires,
+                'num_waits': self.num_waits,
+                'total_wait_seconds': self.total_wait_seconds
+            }
+
+    def _now(self):
+        return time.monotonic()
+
+    def _budget_known(self, now):
+        return self.remaining is not None and self.reset_at is not None and now < self.reset_at
+
+    def _time_until_ready(self, now):
+        since_last = None if self.last_request_at is None else now - self.last_request_at
+
+        if not self._budget_known(now):
+            if since_last is None:
+                return 0
+            return self.min_interval - since_last
+
+        if self.remaining <= self.reserve:
+            return self.reset_at - now
+
+        if self.policy == 'burst' or since_last is None:
+            return 0
+
+        interval = (self.reset_at - now) / (self.remaining - self.reserve)
+        return interval - since_last
+
+    def _record_request(self, now, waited):
+        self.last_request_at = now
+        if self._budget_known(now):
+            self.remaining -= 1
+            if self.used is not None:
+                self.used += 1
+        self._record_wait(waited)
+
+    def _record_wait(self, waited):
+        self.num_acquires += 1
+        if waited > 0:
+            self.num_waits += 1
+            self.total_wait_seconds += waited
@@ -0,0 +1,239 @@
+"""Records the responses from reddit to a file and replays them later, so
+that different builds of the proxy can be benchmarked against identical
+upstream behavior.
+
+While recording (REDDIT_RECORD_PATH), every request made through the
+connections module or the asyncio transport is appended to a gzipped file of
+json lines, one per exchange:
+
+    {"k": "GET https://oauth.reddit.com/user/bob/about", "s": 200,
+     "h": {"x-ratelimit-remaining": "599.0", ...}, "b": "{...}", "e": 0.231}
+
+where "k" is the request key (the method, url and sorted non-secret
+parameters), "s" the status code, "h" the response headers which matter to
+the proxy, "b" the body (or "b64" for bodies which aren't utf-8) and "e" the
+seconds reddit took to respond. Passwords and tokens are never written, and
+access tokens in responses are replaced.
+
+While replaying (REDDIT_REPLAY_PATH), requests aren't sent anywhere; instead
+each gets the next recorded response with the same key, cycling through them.
+A request which was never recorded gets a response recorded for the same
+endpoint with different arguments if there is one (e.g., show_user for a
+different user), otherwise a 404. Each response is delayed by the time reddit
+originally took divided by REDDIT_REPLAY_SPEED.
+"""
+import base64
+import gzip
+import json
+import os
+import threading
+from urllib.parse import urlencode, urlsplit
+
+
+RECORDED_HEADERS = (
+    'content-type', 'retry-after', 'x-ratelimit-used', 'x-ratelimit-remaining',
+    'x-ratelimit-reset'
+)
+"""The response headers which are recorded"""
+
+SECRET_PARAMETERS = frozenset(('password', 'token', 'client_secret'))
+"""Request parameters which are left out of the request key"""
+
+SECRET_FIELDS = ('access_token', 'refresh_token')
+"""Fields in json responses whose values are replaced when recording"""
+
+_ARGUMENT_SEGMENTS = frozenset(('r', 'user', 'comments'))
+"""Path segments which are followed by an argument, e.g., the subreddit"""
+
+
+def request_key(method, url, params=None, data=None):
+    """Get the key which identifies the given request in recordings"""
+    pairs = []
+    for source in (params, data):
+        if isinstance(source, dict):
+            pairs.extend(
+                (str(k), str(v)) for k, v in source.items()
+                if v is not None and k not in SECRET_PARAMETERS
+            )
+    pairs.sort()
+    key = f'{method} {url}'
+    if pairs:
+        key += ('&' if '?' in url else '?') + urlencode(pairs)
+    return key
+
+
+def endpoint_key(key):
+    """Get the key for the endpoint of the given request key, which is the
+    request key without the arguments, e.g., 'GET oauth.reddit.com/user/*/about'"""
+    method, _, url = key.partition(' ')
+    parts = urlsplit(url)
+    segments = parts.path.split('/')
+    for idx in range(1, len(segments)):
+        if segments[idx - 1] in _ARGUMENT_SEGMENTS:
+            segments[idx] = '*'
+    return f'{method} {parts.hostname}' + '/'.join(segments)
+
+
+class Recorder:
+    """Appends exchanges with reddit to a recording. Thread-safe.
+
+    :param path: The path to the recording, which is appended to if it exists
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = gzip.open(path, 'at', encoding='utf-8')
+        self.num_recorded = 0
+
+    def record(self, key, status_code, headers, content, elapsed):
+        """Records an exchange.
+
+        :param key: The request_key of the request
+        :param status_code: The status code of the response
+        :param headers: The case-insensitive response headers
+        :param content: The response body, in bytes
+        :param elapsed: The seconds from sending the request until the
+            response was read
+        """
+        entry = {
+            'k': key,
+            's': status_code,
+            'h': dict((name, headers[name]) for name in RECORDED_HEADERS if name in headers),
+            'e': round(elapsed, 4)
+        }
+        content = _redact(content)
+        try:
+            entry['b'] = content.decode('utf-8')
+        except UnicodeDecodeError:
+            entry['b64'] = base64.b64encode(content).decode('ascii')
+
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+            self.num_recorded += 1
+
+    def stats(self):
+        with self.lock:
+            return {'recorded': self.num_recorded}
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+class Replayer:
+    """Serves the exchanges in a recording. Thread-safe.
+
+    :param path: The path to the recording
+    :param speed: How many times faster than reddit originally responded
+        that responses are served, or 0 to serve them without delay
+    """
+    def __init__(self, path, speed=1.0):
+        self.speed = speed
+        self.lock = threading.Lock()
+        self.by_key = {}
+        self.by_endpoint = {}
+        self.positions = {}
+        self.counts = {'exact': 0, 'endpoint': 0, 'missing': 0}
+        with gzip.open(path, 'rt', encoding='utf-8') as infile:
+            for line in infile:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self.by_key.setdefault(entry['k'], []).append(entry)
+                self.by_endpoint.setdefault(endpoint_key(entry['k']), []).append(entry)
+
+    def replay(self, key):
+        """Get the response to the request with the given key.
+
+        :return status_code: The recorded status code
+        :return headers: The recorded headers, as a dict
+        :return content: The recorded body, in bytes
+        :return elapsed: The seconds reddit originally took
+        :return delay: The seconds to wait before responding
+        """
+        with self.lock:
+            entry = self._next('exact', self.by_key, key)
+            if entry is None:
+                entry = self._next('endpoint', self.by_endpoint, endpoint_key(key))
+            if entry is None:
+                self.counts['missing'] += 1
+                return 404, {'content-type': 'application/json'}, b'{"error": 404}', 0.0, 0.0
+
+        if 'b64' in entry:
+            content = base64.b64decode(entry['b64'])
+        else:
+            content = entry['b'].encode('utf-8')
+        delay = entry['e'] / self.speed if self.speed > 0 else 0.0
+        return entry['s'], dict(entry['h']), content, entry['e'], delay
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counts)
+
+    def _next(self, kind, entries_by_key, key):
+        entries = entries_by_key.get(key)
+        if not entries:
+            return None
+        position = self.positions.get((kind, key), 0)
+        self.positions[(kind, key)] = position + 1
+        self.counts[kind] += 1
+        return entries[position % len(entries)]
+
+
+def _redact(content):
+    """Replaces the values of SECRET_FIELDS in the given json body"""
+    if not any(field.encode('ascii') in content for field in SECRET_FIELDS):
+        return content
+    try:
+        parsed = json.loads(content)
+    except ValueError:
+        return content
+    if not isinstance(parsed, dict):
+        return content
+    for field in SECRET_FIELDS:
+        if field in parsed:
+            parsed[field] = 'recorded'
+    return json.dumps(parsed).encode('utf-8')
+
+
+_recorder = None
+_replayer = None
+_configured = False
+_lock = threading.Lock()
+
+
+def get_recorder():
+    """Get the Recorder configured by the environment, or None if we aren't
+    recording"""
+    _configure()
+    return _recorder
+
+
+def get_replayer():
+    """Get the Replayer configured by the environment, or None if we aren't
+    replaying"""
+    _configure()
+    return _replayer
+
+
+def _configure():
+    global _recorder, _replayer, _configured
+    if _configured:
+        return
+
+    with _lock:
+        if _configured:
+            return
+        replay_path = os.environ.get('REDDIT_REPLAY_PATH', '')
+        record_path = os.environ.get('REDDIT_RECORD_PATH', '')
+        if replay_path and record_path:
+            raise ValueError('REDDIT_RECORD_PATH and REDDIT_REPLAY_PATH are exclusive')
+        if replay_path:
+            _replayer = Replayer(
+                replay_path, float(os.environ.get('REDDIT_REPLAY_SPEED', '1'))
+            )
+        elif record_path:
+            _recorder = Recorder(record_path)
+        _configured = True
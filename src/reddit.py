@@ -1,107 +1,194 @@
-"""This service simply delegates requests to the actual endpoints implemented
-in endpoints/
-"""
-import importlib
-import os
-from inspect import signature, _empty
-
-
-class Reddit:
-    """This is a very low-level wrapper around the reddit API, which is not
-    exposed directly via RabbitMQ. This just provides an extremely convenient
-    interface to each endpoint, as well as the appropriate docstrings for each
-    of the endpoints, without actually implementing all the endpoints in a
-    single file.
-
-    For all functions, if the the "request_callback" attribute is set on this
-    instance it should be a callable which expects two arguments - the name of
-    the request and the response.
-    """
-    def __init__(self):
-        self.request_callback = None
-
-
-# All this does is take BarEndpoint which has name bar and convert
-# BarEndpoint.make_request into Reddit.bar. 90% of the work is getting this
-# to be invisible in the docstring.
-
-# I tried several approaches, including building the function using makefun,
-# but they all didn't look right in the docstring. The hardest part was
-# getting it to look like bar(self, foo) and not bar(foo) in the docstring
-# while still passing along the correct self to the endpoint.
-
-# The major downside of this approach is that default values whose repr
-# doesn't create the code which creates a copy won't work, but at least this
-# can be worked around pretty easily and works fine for e.g. numbers, strings,
-# empty arrays, empty dicts, and None which covers 99% of default param values
-
-# One pretty significant upside is that as long as we have inspect.signature,
-# this is pretty unlikely to break in the future. It seems much more probable
-# that something breaks makefun
-
-
-def _wrap_endpoint(endpoint):
-    prms_arr_with_defaults = []
-    prms_arr_no_defaults = []
-    for prm in signature(endpoint.make_request).parameters.values():
-        prm_s = prm.name
-        prms_arr_no_defaults.append(prm_s)
-        if prm.default != _empty:
-            prm_s = f'{prm_s}={repr(prm.default)}'
-        prms_arr_with_defaults.append(prm_s)
-
-    func_def_str = ', '.join(['self'] + prms_arr_with_defaults)
-    args_str = ', '.join(prms_arr_no_defaults)
-
-    my_func_str = (
-        'def wrapped(' + func_def_str + '):\n'
-        '  global endpoint\n'
-        '  result = endpoint.make_request(' + args_str + ')\n'
-        '  if self.request_callback is not None:\n'
-        f"    self.request_callback('{endpoint.name}', result)\n"
-        '  return result\n'
-    )
-
-    glbls = {'endpoint': endpoint}
-    lcls = {}
-    exec(my_func_str, glbls, lcls)
-
-    wrapped = lcls['wrapped']
-    wrapped.__name__ = wrapped.__qualname__ = endpoint.name
-    wrapped.__doc__ = endpoint.make_request.__doc__
-    return wrapped
-
-
-def _default_headers():
-    return {
-        'User-Agent': os.environ['USER_AGENT']
-    }
-
-
-def _load_endpoints():
-    headers = _default_headers()
-    endpoints = []
-    for root, dirs, files in os.walk(os.path.join(os.path.dirname(__file__), 'endpoints')):
-        mod_base = []
-        my_root = root
-        while True:
-            my_root, nm = os.path.split(my_root)
-            mod_base.append(nm)
-            if nm == 'endpoints':
-                break
-        mod_base = '.'.join(reversed(mod_base))
-        if mod_base != '':
-            mod_base += '.'
-
-        for f in files:
-            if f.endswith('.py'):
-                mod_nm = mod_base + f[:-3]
-                mod = importlib.import_module(mod_nm)
-                if hasattr(mod, 'register_endpoints'):
-                    mod.register_endpoints(endpoints, headers)
-
-    for e in endpoints:
-        setattr(Reddit, e.name, _wrap_endpoint(e))
-
-
-_load_endpoints()
+"""This service simply delegates requests to the actual endpoints implemented
+in endpoints/
+"""
+import os
+import threading
+from inspect import signature, Parameter
+import catalog
+
+
+class EndpointHooks:
+    """The observers and middleware which every request to an endpoint goes
+    through. Shared by Reddit and AsyncReddit.
+
+    The first time an endpoint is used on an instance, the function which
+    calls it through the middleware and observers is built and stored on the
+    instance under the name of the endpoint, so later calls don't go through
+    the method on the class. With no observers or middleware this is the
+    endpoint's own make_request, which adds no overhead at all.
+    """
+    def __init__(self):
+        self.observers = []
+        self.middleware = []
+        self._dispatched = set()
+
+    def add_observer(self, observer):
+        """Calls the given observer after every request to reddit made by this
+        instance, in the order they were added.
+
+        :param observer: A callable which accepts the name of the endpoint and
+            the response
+        """
+        self.observers.append(observer)
+        self._reset_dispatch()
+
+    def add_middleware(self, middleware):
+        """Makes every request to reddit made by this instance go through the
+        given middleware. The first middleware added is the outermost.
+
+        :param middleware: A callable which accepts the name of the endpoint
+            and the function which makes the request, through any inner
+            middleware, and returns the function to call instead with the same
+            arguments. It is called the first time each endpoint is used after
+            it was added, not on every request.
+        """
+        self.middleware.append(middleware)
+        self._reset_dispatch()
+
+    def _dispatch(self, name, func, observe):
+        """Builds the function which calls the given function, which makes the
+        request to the endpoint with the given name, through the middleware
+        and observers, and stores it on this instance.
+
+        :param observe: Wraps a function so the observers are called with its
+            result; accepts the name, the function and the observers
+        """
+        chain = func
+        for middleware in reversed(self.middleware):
+            chain = middleware(name, chain)
+        if self.observers:
+            chain = observe(name, chain, tuple(self.observers))
+        self.__dict__[name] = chain
+        self._dispatched.add(name)
+        return chain
+
+    def _reset_dispatch(self):
+        for name in self._dispatched:
+            self.__dict__.pop(name, None)
+        self._dispatched = set()
+
+
+class Reddit(EndpointHooks):
+    """This is a very low-level wrapper around the reddit API, which is not
+    exposed directly via RabbitMQ. This just provides an extremely convenient
+    interface to each endpoint, as well as the appropriate docstrings for each
+    of the endpoints, without actually implementing all the endpoints in a
+    single file.
+
+    Every request goes through the middleware and then the observers of this
+    instance, see EndpointHooks.
+
+    Every endpoint in the catalog is a method of this class, but its module
+    is only imported when it's first called, see install_endpoints.
+    """
+
+
+def _wrap_endpoint(endpoint):
+    """Converts BarEndpoint.make_request, where BarEndpoint has the name bar,
+    into the function Reddit.bar with the same docstring and signature except
+    for self."""
+    name = endpoint.name
+    make_request = endpoint.make_request
+
+    def wrapped(self, *args, **kwargs):
+        return self._dispatch(name, make_request, _observed)(*args, **kwargs)
+
+    _copy_signature(wrapped, endpoint)
+    return wrapped
+
+
+def install_endpoints(cls, wrap):
+    """Adds a method to the given class for every endpoint in the catalog,
+    so that they are listed by help() and can be found on the class without
+    importing every endpoint module. The first call to each method imports
+    the module of the endpoint and replaces the method with wrap(endpoint),
+    which has the docstring and signature of the endpoint.
+
+    :param cls: The class to add the methods to, e.g., Reddit
+    :param wrap: A callable which accepts an endpoint and returns the method
+        which makes requests to it
+    """
+    for module_name, names in catalog.ENDPOINT_MODULES.items():
+        for name in names:
+            setattr(cls, name, _lazy_endpoint(cls, name, module_name, wrap))
+
+
+def _lazy_endpoint(cls, name, module_name, wrap):
+    def lazy(self, *args, **kwargs):
+        setattr(cls, name, wrap(get_endpoint(name)))
+        return getattr(self, name)(*args, **kwargs)
+
+    lazy.__name__ = lazy.__qualname__ = name
+    lazy.__doc__ = (
+        f'Makes a request to the {name} endpoint in {module_name}. The '
+        'arguments are documented once the module has been imported.'
+    )
+    return lazy
+
+
+def _observed(name, func, observers):
+    def observed(*args, **kwargs):
+        result = func(*args, **kwargs)
+        for observer in observers:
+            observer(name, result)
+        return result
+
+    observed.__name__ = observed.__qualname__ = name
+    observed.__doc__ = func.__doc__
+    return observed
+
+
+def _copy_signature(wrapped, endpoint):
+    """Makes the given wrapper of the endpoint look like a method with the
+    same arguments as the endpoint in help() and inspect"""
+    sig = signature(endpoint.make_request)
+    wrapped.__signature__ = sig.replace(parameters=(
+        [Parameter('self', Parameter.POSITIONAL_OR_KEYWORD)] + list(sig.parameters.values())
+    ))
+    wrapped.__name__ = wrapped.__qualname__ = endpoint.name
+    wrapped.__doc__ = endpoint.make_request.__doc__
+
+
+def _default_headers():
+    return {
+        'User-Agent': os.environ['USER_AGENT']
+    }
+
+
+_endpoints_by_name = {}
+_loaded_modules = set()
+_load_lock = threading.Lock()
+
+
+def get_endpoint(name):
+    """Get the endpoint instance with the given name, adding every endpoint in
+    its module to Reddit if they weren't already, or None if there is no
+    endpoint with that name."""
+    module_name = catalog.endpoint_module(name)
+    if module_name is None:
+        return None
+    _load_module(module_name)
+    return _endpoints_by_name[name]
+
+
+def get_endpoints():
+    """Get every endpoint instance, adding all of them to Reddit"""
+    for module_name in catalog.ENDPOINT_MODULES:
+        _load_module(module_name)
+    return list(_endpoints_by_name.values())
+
+
+def _load_module(module_name):
+    if module_name in _loaded_modules:
+        return
+
+    with _load_lock:
+        if module_name in _loaded_modules:
+            return
+        for e in catalog.load_endpoints(module_name, _default_headers()):
+            setattr(Reddit, e.name, _wrap_endpoint(e))
+            _endpoints_by_name[e.name] = e
+        _loaded_modules.add(module_name)
+
+
+install_endpoints(Reddit, _wrap_endpoint)
@@ -0,0 +1,192 @@
+"""Remembers the newest version we've seen for each response queue, so that
+requests from outdated versions of a service can be ignored, and which
+response queues we've already declared.
+
+The registry is bounded in memory, forgetting the response queues it heard
+from least recently, and the versions are persisted to a sqlite database so
+that they survive restarts and deploys. Which response queues we've declared
+is only kept in memory, since the queues aren't durable and may be gone after
+a restart of the broker or of this process. Response queues which haven't
+been heard from in a while are forgotten by a background timer.
+"""
+from collections import OrderedDict
+import sqlite3
+import threading
+import time
+
+
+class ResponseQueueRegistry:
+    """A thread-safe registry of response queues.
+
+    :param path: The path to the sqlite database to persist to, or None to
+        not persist anything
+    :param max_entries: The most response queues to remember at once
+    :param remember_seconds: How long after we last heard from a response
+        queue that we forget about it
+    :param on_expire: Optional. Called with the name of each response queue
+        which is forgotten by the timer.
+    :param on_sweep_error: Optional. Called without arguments while handling
+        the exception whenever the timer fails to sweep
+    """
+    def __init__(self, path, max_entries, remember_seconds, on_expire=None,
+                 on_sweep_error=None):
+        self.max_entries = max_entries
+        self.remember_seconds = remember_seconds
+        self.on_expire = on_expire
+        self.on_sweep_error = on_sweep_error
+        self.entries = OrderedDict()
+        self.dirty = set()
+        self.lock = threading.Lock()
+        self.timer = None
+        self.stopped = threading.Event()
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS response_queues ('
+                'name TEXT PRIMARY KEY, version REAL NOT NULL, '
+                'last_seen_at REAL NOT NULL)'
+            )
+            self.db.commit()
+            self._load()
+
+    def version(self, name):
+        """Get the newest version we've seen for the given response queue, or
+        None if we don't remember it"""
+        with self.lock:
+            entry = self.entries.get(name)
+            return entry['version'] if entry is not None else None
+
+    def seen(self, name, version):
+        """Records that we heard from the given response queue with the given
+        version, which becomes its version if it's newer than the one we
+        have."""
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is None:
+                entry = {'version': version, 'declared': False}
+                self.entries[name] = entry
+                changed = True
+            else:
+                changed = version > entry['version']
+                entry['version'] = max(entry['version'], version)
+                self.entries.move_to_end(name)
+            entry['last_seen_at'] = time.time()
+
+            if changed:
+                self._persist([name])
+            else:
+                self.dirty.add(name)
+            self._evict()
+
+    def is_declared(self, name):
+        """Determines if we've already declared the given response queue"""
+        with self.lock:
+            entry = self.entries.get(name)
+            return entry is not None and entry['declared']
+
+    def mark_declared(self, name):
+        """Records that we have declared the given response queue, which must
+        have been seen already. This isn't persisted."""
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is not None:
+                entry['declared'] = True
+
+    def sweep(self):
+        """Forgets the response queues we haven't heard from in a while and
+        persists when the rest were last seen. Called periodically by the
+        timer started with start()."""
+        forgotten = []
+        with self.lock:
+            cutoff = time.time() - self.remember_seconds
+            for name, entry in list(self.entries.items()):
+                if entry['last_seen_at'] >= cutoff:
+                    break
+                del self.entries[name]
+                forgotten.append(name)
+            self._delete(forgotten)
+            self._persist(list(self.dirty))
+
+        if self.on_expire is not None:
+            for name in forgotten:
+                self.on_expire(name)
+        return forgotten
+
+    def start(self, interval):
+        """Starts a background thread which calls sweep() every interval
+        seconds until stop() is called"""
+        def run():
+            while not self.stopped.wait(interval):
+                try:
+                    self.sweep()
+                except:  # noqa: E722
+                    if self.on_sweep_error is not None:
+                        self.on_sweep_error()
+
+        self.timer = threading.Thread(target=run, name='response-queue-sweeper', daemon=True)
+        self.timer.start()
+
+    def stop(self):
+        """Stops the background thread, if it was started, and persists
+        everything"""
+        self.stopped.set()
+        if self.timer is not None:
+            self.timer.join()
+        with self.lock:
+            self._persist(list(self.dirty))
+
+    def stats(self):
+        """Get a dict with the number of response queues we remember"""
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'declared': sum(1 for e in self.entries.values() if e['declared'])
+            }
+
+    def _load(self):
+        cutoff = time.time() - self.remember_seconds
+        rows = self.db.execute(
+            'SELECT name, version, last_seen_at FROM response_queues '
+            'WHERE last_seen_at >= ? ORDER BY last_seen_at DESC LIMIT ?',
+            (cutoff, self.max_entries)
+        ).fetchall()
+        for name, version, last_seen_at in reversed(rows):
+            self.entries[name] = {
+                'version': version,
+                'last_seen_at': last_seen_at,
+                'declared': False
+            }
+        self.db.execute('DELETE FROM response_queues WHERE last_seen_at < ?', (cutoff,))
+        self.db.commit()
+
+    def _evict(self):
+        evicted = []
+        while len(self.entries) > self.max_entries:
+            name, _ = self.entries.popitem(last=False)
+            evicted.append(name)
+        self._delete(evicted)
+
+    def _persist(self, names):
+        self.dirty.difference_update(names)
+        if self.db is None or not names:
+            return
+        self.db.executemany(
+            'INSERT OR REPLACE INTO response_queues (name, version, last_seen_at) '
+            'VALUES (?, ?, ?)',
+            [
+                (name, e['version'], e['last_seen_at'])
+                for name, e in ((name, self.entries.get(name)) for name in names)
+                if e is not None
+            ]
+        )
+        self.db.commit()
+
+    def _delete(self, names):
+        self.dirty.difference_update(names)
+        if self.db is None or not names:
+            return
+        self.db.executemany(
+            'DELETE FROM response_queues WHERE name = ?', [(name,) for name in names]
+        )
+        self.db.commit()
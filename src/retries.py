@@ -0,0 +1,78 @@
+"""Decides when and how requests with the `retry` operation are tried again.
+
+Rather than republishing a retried request straight onto the request queue,
+where it would be handled again immediately, it's published to a delay queue
+with a per-message TTL. The delay queue dead-letters expired messages back to
+the request queue. The delay grows exponentially with the number of attempts,
+with jitter so that requests which failed together don't all come back
+together.
+
+RabbitMQ only expires messages at the head of a queue, so a message with a
+short TTL can be stuck behind one with a long TTL. To keep this small each
+backoff level has its own delay queue, within which the delays differ by at
+most the jitter.
+
+The number of the attempt travels in the `attempt` field of the packet, where
+the first delivery is attempt 1.
+"""
+import math
+import random
+
+
+MAX_ATTEMPT = 1000000
+"""The largest attempt number we accept. Even retrying every few seconds
+without a limit, no request gets near this."""
+
+
+class RetryPolicy:
+    """The backoff and attempt limit for retries.
+
+    :param base_delay: The delay in seconds before the first retry. If 0,
+        retries are republished straight onto the request queue.
+    :param max_delay: The longest delay in seconds before any retry
+    :param max_attempts: The default maximum number of attempts for a request,
+        after which it gets a failure response rather than being retried. 0
+        for no limit. Requests may override this with `max_attempts` in their
+        retry style.
+    """
+    def __init__(self, base_delay, max_delay, max_attempts):
+        self.base_delay = base_delay
+        self.max_delay = max(base_delay, max_delay)
+        self.max_attempts = max_attempts
+        self.num_levels = 1
+        if base_delay > 0:
+            self.num_levels = math.ceil(math.log2(self.max_delay / base_delay)) + 1
+        self.declared_queues = set()
+
+    def next_attempt(self, body):
+        """Get the attempt number for the next attempt at the given request"""
+        return (body.get('attempt') or 1) + 1
+
+    def exhausted(self, body, handle_style):
+        """Determines if the given request has used up all of its attempts"""
+        max_attempts = handle_style.get('max_attempts', self.max_attempts)
+        return bool(max_attempts) and (body.get('attempt') or 1) >= max_attempts
+
+    def delay_for(self, attempt):
+        """Get how many seconds to wait before the given attempt number, or 0
+        if it should be tried again immediately"""
+        if self.base_delay <= 0:
+            return 0
+        # past the last level the delay is max_delay anyway, and a bounded
+        # exponent can't overflow for large attempt numbers
+        exponent = min(attempt - 2, self.num_levels)
+        delay = min(self.max_delay, self.base_delay * (2 ** exponent))
+        return random.uniform(delay / 2, delay)
+
+    def delay_queue(self, queue, attempt):
+        """Get the name of the delay queue which feeds the given request queue
+        for the given attempt number"""
+        return f'{queue}-retry-{min(attempt - 1, self.num_levels)}'
+
+    def delay_queue_arguments(self, queue):
+        """Get the arguments to declare a delay queue for the given request
+        queue with"""
+        return {
+            'x-dead-letter-exchange': '',
+            'x-dead-letter-routing-key': queue
+        }
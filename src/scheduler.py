@@ -0,0 +1,131 @@
+"""Decides which of the prefetched requests to handle next, rather than
+handling them strictly in the order they were delivered.
+
+Requests with a higher priority are handled first. To prevent starvation,
+every request's priority effectively goes up by one for every
+`aging_seconds` since it was sent, so an old low-priority request eventually
+goes ahead of new high-priority ones. Since every request ages at the same
+rate this ordering never changes once a request is queued, so a heap is
+enough.
+"""
+from collections import deque
+import heapq
+import itertools
+import threading
+import time
+
+
+class RequestScheduler:
+    """A thread-safe priority queue of requests which also limits how many of
+    them are running at once.
+
+    :param max_running: The most requests which may be running at once; pop()
+        returns None while this many are running.
+    :param aging_seconds: How many seconds of waiting are worth one level of
+        priority.
+    """
+    def __init__(self, max_running, aging_seconds):
+        self.max_running = max_running
+        self.aging_seconds = aging_seconds
+        self.heap = []
+        self.waiting_by_key = {}
+        self.running = 0
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        self.wait_stats_by_priority = {}
+
+    def push(self, item, priority, sent_at, key=None):
+        """Queue the given item.
+
+        :param item: The item to return from pop()
+        :param priority: The priority of the item; higher goes first
+        :param sent_at: When the item was sent, in seconds since the epoch
+        :param key: If not None, items with the same key are popped one at a
+            time in the order they were pushed, i.e., an item isn't popped
+            until done() has been called with the key for the one before it.
+        """
+        entry = (
+            sent_at / self.aging_seconds - priority,
+            next(self.counter),
+            item,
+            priority,
+            key,
+            time.monotonic()
+        )
+        with self.lock:
+            if key is not None:
+                waiting = self.waiting_by_key.get(key)
+                if waiting is not None:
+                    waiting.append(entry)
+                    return
+                self.waiting_by_key[key] = deque()
+            heapq.heappush(self.heap, entry)
+
+    def pop(self):
+        """Get the next item to run, or None if there are no items or too many
+        are already running. Every item returned must later be passed to
+        done()."""
+        with self.lock:
+            if not self.heap or self.running >= self.max_running:
+                return None
+            _, _, item, priority, _, pushed_at = heapq.heappop(self.heap)
+            self.running += 1
+
+            waited = time.monotonic() - pushed_at
+            stats = self.wait_stats_by_priority.get(priority)
+            if stats is None:
+                stats = {'count': 0, 'total_wait': 0.0, 'max_wait': 0.0}
+                self.wait_stats_by_priority[priority] = stats
+            stats['count'] += 1
+            stats['total_wait'] += waited
+            stats['max_wait'] = max(stats['max_wait'], waited)
+            return item
+
+    def done(self, key=None):
+        """Called when an item returned from pop() has finished running.
+
+        :param key: The key the item was pushed with
+        """
+        with self.lock:
+            self.running -= 1
+            if key is None:
+                return
+            waiting = self.waiting_by_key[key]
+            if waiting:
+                heapq.heappush(self.heap, waiting.popleft())
+            else:
+                del self.waiting_by_key[key]
+
+    def drain(self):
+        """Removes every item which hasn't been popped, e.g., to give them back
+        to the queue, and returns them in the order they would have been
+        popped. Items which are running still have to be passed to done()."""
+        with self.lock:
+            entries = list(self.heap)
+            for entry in self.heap:
+                if entry[4] is not None:
+                    # nothing with this key is running, so forget about it
+                    entries.extend(self.waiting_by_key.pop(entry[4]))
+            self.heap = []
+            for waiting in self.waiting_by_key.values():
+                entries.extend(waiting)
+                waiting.clear()
+            return [entry[2] for entry in sorted(entries, key=lambda entry: entry[:2])]
+
+    def stats(self):
+        """Get a dict with the number of pending and running items and, for
+        each priority, how many items were popped and how long they waited in
+        seconds on average and at most."""
+        with self.lock:
+            return {
+                'pending': len(self.heap) + sum(len(w) for w in self.waiting_by_key.values()),
+                'running': self.running,
+                'wait_by_priority': dict(
+                    (priority, {
+                        'count': stats['count'],
+                        'avg_wait': round(stats['total_wait'] / stats['count'], 3),
+                        'max_wait': round(stats['max_wait'], 3)
+                    })
+                    for priority, stats in sorted(self.wait_stats_by_priority.items())
+                )
+            }
@@ -0,0 +1,311 @@
+"""Shares the ratelimit budget of a reddit account between every proxy process
+which uses it, so that the proxy can be scaled out without the processes
+together spending more than the budget.
+
+The budget for each account lives in a row of the table `reddit_ratelimits`,
+either in Postgres or in a sqlite database shared by processes on the same
+host. The row holds the same state as a RateLimiter, using wall-clock time
+since it's compared across processes.
+
+Rather than consulting the table before every request, a process is granted a
+lease of several requests at once. The lease starts at the next time the
+policy allows a request, so processes take turns in the order they ask, and is
+paced according to the policy as if all of its requests were made by one
+process. The table records the last of them as the most recent request. The
+requests in a lease are then made locally at their scheduled times. Requests
+which aren't made before the lease expires are forgotten rather than given
+back, which only ever leaves budget unspent.
+"""
+from collections import deque
+from contextlib import contextmanager
+import sqlite3
+import threading
+import time
+from ratelimit import NEW_WINDOW_TOLERANCE_SECONDS, RateLimiter
+
+
+COLUMNS = ('used', 'remaining', 'reset_at', 'last_request_at')
+"""The state for each account in the reddit_ratelimits table, besides the
+username"""
+
+
+class SharedRateLimiter(RateLimiter):
+    """A RateLimiter whose budget is kept in a budget store shared with other
+    processes. Thread-safe.
+
+    :param store: The SqliteBudgetStore or PostgresBudgetStore to use
+    :param username: The reddit account whose budget this is
+    :param policy: As in RateLimiter
+    :param min_interval: As in RateLimiter
+    :param reserve: As in RateLimiter
+    :param lease_size: The most requests granted in one lease
+    :param lease_seconds: How many seconds after the last request in a lease
+        was scheduled that the lease expires
+    :param on_store_error: Optional. Called without arguments while handling
+        the exception whenever using the budget store fails
+    """
+    def __init__(self, store, username, policy='even', min_interval=1.0, reserve=1,
+                 lease_size=5, lease_seconds=10, on_store_error=None):
+        super().__init__(policy=policy, min_interval=min_interval, reserve=reserve)
+        self.store = store
+        self.username = username
+        self.lease_size = lease_size
+        self.lease_seconds = lease_seconds
+        self.on_store_error = on_store_error
+        self.lease = deque()
+        self.lease_expires_at = None
+        self.num_leases = 0
+        self.num_expired = 0
+        self.num_store_errors = 0
+
+    def update(self, headers):
+        if 'x-ratelimit-remaining' not in headers or 'x-ratelimit-reset' not in headers:
+            return False
+
+        remaining = float(headers['x-ratelimit-remaining'])
+        reset_at = self._now() + float(headers['x-ratelimit-reset'])
+        used = float(headers['x-ratelimit-used']) if 'x-ratelimit-used' in headers else None
+        with self._lock:
+            try:
+                with self.store.transaction(self.username) as state:
+                    _merge_budget(state, used, remaining, reset_at)
+                    self._load(state)
+            except Exception:
+                self._store_failed()
+        return True
+
+    def time_until_ready(self):
+        with self._lock:
+            now = self._now()
+            self._expire_lease(now)
+            if self.lease:
+                return self.lease[0] - now
+            return self._time_until_ready(now)
+
+    def try_acquire(self, waited=0.0):
+        with self._lock:
+            now = self._now()
+            self._expire_lease(now)
+            if not self.lease:
+                wait = self._grant_lease(now)
+                if wait > 0:
+                    return wait
+
+            wait = self.lease[0] - now
+            if wait > 0:
+                return wait
+            self.lease.popleft()
+            self._record_wait(waited)
+            return 0
+
+    def stats(self):
+        result = super().stats()
+        with self._lock:
+            result['leased'] = len(self.lease)
+            result['num_leases'] = self.num_leases
+            result['num_expired'] = self.num_expired
+            result['num_store_errors'] = self.num_store_errors
+        return result
+
+    def _now(self):
+        return time.time()
+
+    def _expire_lease(self, now):
+        if self.lease and now >= self.lease_expires_at:
+            self.num_expired += len(self.lease)
+            self.lease.clear()
+
+    def _grant_lease(self, now):
+        """Grants this process a lease from the store if the shared budget
+        allows it. Returns 0 if a lease was granted, though its first request
+        may be scheduled in the future, otherwise how many seconds until one
+        might be."""
+        try:
+            with self.store.transaction(self.username) as state:
+                self._load(state)
+                known = self._budget_known(now)
+                if known and self.remaining <= self.reserve:
+                    return self.reset_at - now
+
+                # the lease starts at the next free time rather than making us
+                # compete with other processes for it, so processes are served
+                # in the order they ask
+                start = now + max(0, self._time_until_ready(now))
+                if known and start >= self.reset_at:
+                    return self.reset_at - now
+
+                count = 1
+                interval = 0
+                if known:
+                    spendable = self.remaining - self.reserve
+                    count = max(1, min(self.lease_size, int(spendable)))
+                    if self.policy == 'even':
+                        interval = max(0, self.reset_at - start) / spendable
+                    self.remaining -= count
+                    if self.used is not None:
+                        self.used += count
+
+                self.lease.extend(start + i * interval for i in range(count))
+                self.lease_expires_at = self.lease[-1] + self.lease_seconds
+                self.last_request_at = self.lease[-1]
+                self.num_leases += 1
+                for column in COLUMNS:
+                    state[column] = getattr(self, column)
+                return 0
+        except Exception:
+            self._store_failed()
+            return max(self.min_interval, 1)
+
+    def _load(self, state):
+        for column in COLUMNS:
+            setattr(self, column, state[column])
+
+    def _store_failed(self):
+        self.num_store_errors += 1
+        if self.on_store_error is not None:
+            self.on_store_error()
+        self.store.reset()
+
+
+def _merge_budget(state, used, remaining, reset_at):
+    """Merges what reddit reported about the budget into the shared state.
+    Responses from the current window can arrive out of order and the shared
+    state already accounts for leased requests, so within a window we only
+    ever lower the remaining budget."""
+    new_window = (
+        state['remaining'] is None
+        or state['reset_at'] is None
+        or reset_at > state['reset_at'] + NEW_WINDOW_TOLERANCE_SECONDS
+    )
+    if new_window:
+        state['remaining'] = remaining
+        state['used'] = used
+        state['reset_at'] = reset_at
+        return
+
+    state['remaining'] = min(state['remaining'], remaining)
+    if used is not None:
+        state['used'] = used if state['used'] is None else max(state['used'], used)
+
+
+class SqliteBudgetStore:
+    """Keeps the shared budgets in a sqlite database, for processes on the
+    same host.
+
+    :param path: The path to the sqlite database
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = None
+
+    @contextmanager
+    def transaction(self, username):
+        """Locks the budget for the given account against every other process
+        and yields its state as a dict with the keys in COLUMNS (None where
+        unknown). Changes to the dict are saved when the block exits normally,
+        and discarded if it raises."""
+        with self.lock:
+            if self.conn is None:
+                self.conn = sqlite3.connect(
+                    self.path, timeout=10, isolation_level=None, check_same_thread=False
+                )
+                self.conn.execute(
+                    'CREATE TABLE IF NOT EXISTS reddit_ratelimits ('
+                    'username TEXT PRIMARY KEY, used REAL, remaining REAL, '
+                    'reset_at REAL, last_request_at REAL)'
+                )
+            conn = self.conn
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute(
+                    'INSERT OR IGNORE INTO reddit_ratelimits (username) VALUES (?)', (username,)
+                )
+                row = conn.execute(
+                    'SELECT used, remaining, reset_at, last_request_at '
+                    'FROM reddit_ratelimits WHERE username = ?',
+                    (username,)
+                ).fetchone()
+                state = dict(zip(COLUMNS, row))
+                yield state
+                conn.execute(
+                    'UPDATE reddit_ratelimits SET used = ?, remaining = ?, reset_at = ?, '
+                    'last_request_at = ? WHERE username = ?',
+                    tuple(state[column] for column in COLUMNS) + (username,)
+                )
+                conn.execute('COMMIT')
+            except:  # noqa: E722
+                conn.execute('ROLLBACK')
+                raise
+
+    def reset(self):
+        """Closes the connection, so the next transaction reconnects"""
+        with self.lock:
+            if self.conn is not None:
+                try:
+                    self.conn.close()
+                except sqlite3.Error:
+                    pass
+                self.conn = None
+
+
+class PostgresBudgetStore:
+    """Keeps the shared budgets in Postgres, for processes on any host. This
+    connects to the database in the standard PG environment variables, using
+    its own connection. The reddit_ratelimits table is created by the
+    migrations of the LoansBot database, like every other table there:
+
+        CREATE TABLE reddit_ratelimits (
+            username TEXT PRIMARY KEY,
+            used DOUBLE PRECISION,
+            remaining DOUBLE PRECISION,
+            reset_at DOUBLE PRECISION,
+            last_request_at DOUBLE PRECISION
+        );
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.conn = None
+
+    @contextmanager
+    def transaction(self, username):
+        """As in SqliteBudgetStore.transaction"""
+        with self.lock:
+            if self.conn is None:
+                # imported here so that the sqlite store doesn't need psycopg2
+                import psycopg2
+                self.conn = psycopg2.connect('')
+            conn = self.conn
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        'INSERT INTO reddit_ratelimits (username) VALUES (%s) '
+                        'ON CONFLICT (username) DO NOTHING',
+                        (username,)
+                    )
+                    cursor.execute(
+                        'SELECT used, remaining, reset_at, last_request_at '
+                        'FROM reddit_ratelimits WHERE username = %s FOR UPDATE',
+                        (username,)
+                    )
+                    state = dict(zip(COLUMNS, cursor.fetchone()))
+                    yield state
+                    cursor.execute(
+                        'UPDATE reddit_ratelimits SET used = %s, remaining = %s, reset_at = %s, '
+                        'last_request_at = %s WHERE username = %s',
+                        tuple(state[column] for column in COLUMNS) + (username,)
+                    )
+                conn.commit()
+            except:  # noqa: E722
+                conn.rollback()
+                raise
+
+    def reset(self):
+        """Closes the connection, so the next transaction reconnects"""
+        with self.lock:
+            if self.conn is not None:
+                try:
+                    self.conn.close()
+                except Exception:
+                    pass
+                self.conn = None
@@ -0,0 +1,139 @@
+"""Measures where the time goes while handling each request, so that a slow
+response can be explained.
+
+The phases of a request are:
+
+- `queue`: From when the request was sent (its `sent_at`) until we started
+  handling it, which includes waiting in the AMQP queue and the scheduler.
+- `auth`: Waiting on a valid authorization.
+- `ratelimit`: Waiting on the ratelimit budget, or backing off after being
+  throttled.
+- `http`: Waiting on reddit to respond.
+- `handler`: Everything else the handler did, such as decoding and
+  transforming the responses from reddit.
+- `publish`: Sending the response and acking the request.
+
+The breakdown is sent in the `timing` field of the response if the request
+asked for it with `"timing": true`. Since the response can't describe its own
+publishing, the `publish` phase is only included in the aggregated stats and
+in the log for slow requests.
+"""
+from contextlib import contextmanager
+import threading
+import time
+
+
+PHASES = ('queue', 'auth', 'ratelimit', 'http', 'handler', 'publish')
+"""The phases of a request, in the order they happen"""
+
+
+class RequestTimer:
+    """Accumulates the time spent in each phase of a single request. Only
+    one phase is timed at a time.
+
+    :param sent_at: When the request was sent, in seconds since the epoch
+    """
+    def __init__(self, sent_at):
+        self.sent_at = sent_at
+        self.phases = dict((phase, 0.0) for phase in PHASES)
+        self.phases['queue'] = max(0.0, time.time() - sent_at)
+
+    @contextmanager
+    def phase(self, name):
+        """Adds the time spent in the block to the given phase"""
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.monotonic() - started_at
+
+    def wrap_reddit(self, reddit):
+        """Get a wrapper around the given Reddit instance (or BlockingReddit)
+        which times every request made with it as `http`"""
+        return TimedReddit(reddit, self)
+
+    def total(self):
+        """Get the number of seconds since the request was sent"""
+        return max(0.0, time.time() - self.sent_at)
+
+    def breakdown(self):
+        """Get a dict from phase to seconds so far, where `handler` excludes
+        the time spent in `http`, plus the `total`. Rounded to the
+        millisecond."""
+        result = dict((phase, round(seconds, 3)) for phase, seconds in self.phases.items())
+        result['handler'] = round(max(0.0, self.phases['handler'] - self.phases['http']), 3)
+        result['total'] = round(self.total(), 3)
+        return result
+
+
+class TimedReddit:
+    """Forwards everything to the wrapped reddit instance, timing each call
+    of a function in the `http` phase of the timer.
+
+    :param reddit: The Reddit or BlockingReddit instance to wrap
+    :param timer: The RequestTimer for the request the calls are made for
+    """
+    def __init__(self, reddit, timer):
+        self.reddit = reddit
+        self.timer = timer
+
+    def __getattr__(self, name):
+        func = getattr(self.reddit, name)
+        if not callable(func):
+            return func
+
+        def wrapped(*args, **kwargs):
+            with self.timer.phase('http'):
+                return func(*args, **kwargs)
+
+        wrapped.__name__ = wrapped.__qualname__ = name
+        wrapped.__doc__ = func.__doc__
+        return wrapped
+
+
+class TimingStats:
+    """Aggregates the breakdowns of finished requests. Thread-safe.
+
+    :param slow_threshold: Requests which took at least this many seconds in
+        total are slow. 0 to never consider a request slow.
+    """
+    def __init__(self, slow_threshold):
+        self.slow_threshold = slow_threshold
+        self.lock = threading.Lock()
+        self.num_requests = 0
+        self.num_slow = 0
+        self.total_by_phase = dict((phase, 0.0) for phase in PHASES)
+        self.slow_by_phase = dict((phase, 0.0) for phase in PHASES)
+
+    def record(self, breakdown):
+        """Records the breakdown of a finished request.
+
+        :return: True if the request was slow, False otherwise
+        """
+        slow = 0 < self.slow_threshold <= breakdown['total']
+        with self.lock:
+            self.num_requests += 1
+            if slow:
+                self.num_slow += 1
+            for phase in PHASES:
+                self.total_by_phase[phase] += breakdown[phase]
+                if slow:
+                    self.slow_by_phase[phase] += breakdown[phase]
+        return slow
+
+    def stats(self):
+        """Get a dict with the number of requests and slow requests and the
+        mean seconds spent in each phase by each"""
+        with self.lock:
+            return {
+                'requests': self.num_requests,
+                'slow': self.num_slow,
+                'mean_seconds': dict(
+                    (phase, round(seconds / self.num_requests, 3))
+                    for phase, seconds in self.total_by_phase.items()
+                ) if self.num_requests else None,
+                'slow_mean_seconds': dict(
+                    (phase, round(seconds / self.num_slow, 3))
+                    for phase, seconds in self.slow_by_phase.items()
+                ) if self.num_slow else None
+            }
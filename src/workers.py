@@ -0,0 +1,70 @@
+"""Provides a small bounded thread pool for running requests concurrently,
+with an optional ordering guarantee for related jobs.
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import traceback
+
+
+class WorkerPool:
+    """Runs jobs on a fixed number of worker threads. Jobs may be given a key,
+    in which case jobs which share that key are run one at a time in the order
+    they were submitted. Jobs without a key are run in any order.
+
+    Jobs are expected to handle their own errors; if a job raises anyway the
+    error is printed and the worker moves on to the next job.
+
+    :param num_workers: The maximum number of jobs to run at once
+    """
+    def __init__(self, num_workers):
+        self.num_workers = num_workers
+        self.executor = ThreadPoolExecutor(
+            max_workers=num_workers, thread_name_prefix='worker'
+        )
+        self.queued_by_key = {}
+        self.lock = threading.Lock()
+
+    def submit(self, job, key=None):
+        """Run the given job, a callable which takes no arguments, on one of
+        the worker threads.
+
+        :param job: The callable to run
+        :param key: If not None, this job will not start until every job
+            previously submitted with the same key has finished.
+        """
+        if key is None:
+            self.executor.submit(_run_job, job)
+            return
+
+        with self.lock:
+            queued = self.queued_by_key.get(key)
+            if queued is not None:
+                queued.append(job)
+                return
+            self.queued_by_key[key] = deque()
+
+        self.executor.submit(self._run_keyed, key, job)
+
+    def shutdown(self, wait=True):
+        """Stop accepting jobs, optionally waiting for the submitted jobs to
+        finish."""
+        self.executor.shutdown(wait=wait)
+
+    def _run_keyed(self, key, job):
+        while True:
+            _run_job(job)
+            with self.lock:
+                queued = self.queued_by_key[key]
+                if not queued:
+                    del self.queued_by_key[key]
+                    return
+                job = queued.popleft()
+
+
+def _run_job(job):
+    try:
+        job()
+    except:  # noqa: E722
+        print('Unhandled error in worker job')
+        traceback.print_exc()
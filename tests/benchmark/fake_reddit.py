@@ -0,0 +1,475 @@
+"""A local stand-in for reddit which implements every endpoint in
+src/endpoints with realistic payloads and ratelimit headers, so the proxy can
+be benchmarked without touching reddit. Point the proxy at it by setting
+REDDIT_URL_OVERRIDE to e.g. http://127.0.0.1:8089
+
+This can either be run on its own:
+
+    python fake_reddit.py --port 8089 --latency 0.2 --error-rate 0.01
+
+or started from another script (see run.py) with FakeReddit.start().
+
+Each access token has its own ratelimit window, like each account on reddit.
+Requests beyond the budget of the window get a 429 with Retry-After, as do a
+random fraction of requests if a throttle rate is set.
+"""
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from urllib.parse import parse_qs, urlsplit
+
+
+class FakeRedditConfig:
+    """Describes how the fake reddit behaves.
+
+    :param latency: The mean number of seconds before each response
+    :param latency_jitter: Each response is delayed by up to this many seconds
+        more or less than the mean latency, uniformly
+    :param error_rate: The fraction of requests which fail with a 5xx
+    :param throttle_rate: The fraction of requests which get a 429 even
+        though they are within the ratelimit budget
+    :param retry_after: The Retry-After, in seconds, on 429s from the
+        throttle rate
+    :param ratelimit: The number of requests allowed per window for each
+        access token
+    :param window: The length of the ratelimit window in seconds
+    :param listing_size: The number of items in each listing
+    """
+    def __init__(self, latency=0.0, latency_jitter=0.0, error_rate=0.0, throttle_rate=0.0,
+                 retry_after=5, ratelimit=600, window=600, listing_size=25):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.ratelimit = ratelimit
+        self.window = window
+        self.listing_size = listing_size
+
+
+class FakeReddit:
+    """The fake reddit server. Thread-safe.
+
+    :param config: The FakeRedditConfig to use
+    :param host: The address to listen on
+    :param port: The port to listen on, or 0 for any free port
+    """
+    def __init__(self, config, host='127.0.0.1', port=0):
+        self.config = config
+        self.host = host
+        self.port = port
+        self.lock = threading.Lock()
+        self.windows = {}
+        self.counts = {}
+        self.server = None
+
+    @property
+    def url(self):
+        """The url to set REDDIT_URL_OVERRIDE to"""
+        return f'http://{self.host}:{self.port}'
+
+    def start(self):
+        """Starts serving from a background thread"""
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # write each response at once, since separate writes for the
+            # headers and body wait on delayed acks
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                fake._handle(self, 'GET')
+
+            def do_POST(self):
+                fake._handle(self, 'POST')
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        thread = threading.Thread(
+            target=self.server.serve_forever, name='fake-reddit', daemon=True
+        )
+        thread.start()
+
+    def stop(self):
+        """Stops serving"""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def stats(self):
+        """Get a dict from "<endpoint> <status>" to the number of responses"""
+        with self.lock:
+            return dict(self.counts)
+
+    def _handle(self, request, method):
+        parts = urlsplit(request.path)
+        query = parse_qs(parts.query)
+        form = {}
+        length = int(request.headers.get('Content-Length') or 0)
+        if length:
+            form = parse_qs(request.rfile.read(length).decode('utf-8'))
+
+        route = _match_route(method, parts.path)
+        if route is None:
+            self._send(request, 'unknown', 404, {'message': 'Not Found', 'error': 404})
+            return
+        name, func, path_args = route
+
+        delay = self.config.latency
+        if self.config.latency_jitter:
+            delay += random.uniform(-self.config.latency_jitter, self.config.latency_jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        if name in ('login', 'revoke_auth'):
+            self._send(request, name, 200, func(self, path_args, query, form))
+            return
+
+        token = request.headers.get('Authorization', '')
+        headers, exhausted_for = self._spend(token)
+        if exhausted_for is not None:
+            headers['Retry-After'] = str(int(exhausted_for) + 1)
+            self._send(request, name, 429, {'message': 'Too Many Requests', 'error': 429},
+                       headers)
+            return
+        if self.config.throttle_rate and random.random() < self.config.throttle_rate:
+            headers['Retry-After'] = str(self.config.retry_after)
+            self._send(request, name, 429, {'message': 'Too Many Requests', 'error': 429},
+                       headers)
+            return
+        if self.config.error_rate and random.random() < self.config.error_rate:
+            status = random.choice((500, 502, 503))
+            self._send(request, name, status, {'message': 'Server Error', 'error': status},
+                       headers)
+            return
+
+        self._send(request, name, 200, func(self, path_args, query, form), headers)
+
+    def _spend(self, token):
+        """Spends one request from the budget of the given access token.
+        Returns the ratelimit headers and None, or the headers and the seconds
+        until the window resets if the budget was already spent."""
+        now = time.time()
+        with self.lock:
+            window = self.windows.get(token)
+            if window is None or now >= window['reset_at']:
+                window = {'used': 0, 'reset_at': now + self.config.window}
+                self.windows[token] = window
+            exhausted = window['used'] >= self.config.ratelimit
+            if not exhausted:
+                window['used'] += 1
+            reset_in = window['reset_at'] - now
+            headers = {
+                'x-ratelimit-used': str(window['used']),
+                'x-ratelimit-remaining': str(float(self.config.ratelimit - window['used'])),
+                'x-ratelimit-reset': str(int(reset_in))
+            }
+        return headers, (reset_in if exhausted else None)
+
+    def _send(self, request, name, status, body, headers=None):
+        with self.lock:
+            key = f'{name} {status}'
+            self.counts[key] = self.counts.get(key, 0) + 1
+        content = json.dumps(body).encode('utf-8')
+        request.send_response(status)
+        request.send_header('Content-Type', 'application/json; charset=UTF-8')
+        request.send_header('Content-Length', str(len(content)))
+        for key, val in (headers or {}).items():
+            request.send_header(key, val)
+        request.end_headers()
+        request.wfile.write(content)
+
+
+def _fullname(kind):
+    return f'{kind}_{uuid.uuid4().hex[:7]}'
+
+
+def _listing(children, after=None):
+    return {
+        'kind': 'Listing',
+        'data': {
+            'modhash': None,
+            'dist': len(children),
+            'children': children,
+            'after': after,
+            'before': None
+        }
+    }
+
+
+def _user_list(usernames, extra=None):
+    return {
+        'kind': 'UserList',
+        'data': {
+            'children': [
+                {
+                    'name': username,
+                    'id': _fullname('t2'),
+                    'date': time.time() - 86400 * 30,
+                    **(extra or {})
+                }
+                for username in usernames
+            ]
+        }
+    }
+
+
+def _comment(subreddit, link_fullname=None, created_utc=None):
+    return {
+        'kind': 't1',
+        'data': {
+            'name': _fullname('t1'),
+            'body': 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 4,
+            'author': f'user_{random.randint(1, 5000)}',
+            'link_id': link_fullname or _fullname('t3'),
+            'link_author': f'user_{random.randint(1, 5000)}',
+            'subreddit': subreddit,
+            'created_utc': created_utc or time.time() - random.uniform(0, 3600),
+            'score': random.randint(-5, 100),
+            'permalink': '/r/{}/comments/abc/xyz/def/'.format(subreddit)
+        }
+    }
+
+
+def _link(subreddit):
+    is_self = random.random() < 0.7
+    return {
+        'kind': 't3',
+        'data': {
+            'name': _fullname('t3'),
+            'title': '[REQ] ($100) - #City, State, Country - Repay $120 by 2020-01-01',
+            'author': f'user_{random.randint(1, 5000)}',
+            'subreddit': subreddit,
+            'created_utc': time.time() - random.uniform(0, 3600),
+            'is_self': is_self,
+            'selftext': 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 8
+            if is_self else '',
+            'url': 'https://example.com/some/link' if not is_self else None,
+            'banned_at_utc': None,
+            'removed': False,
+            'score': random.randint(0, 50),
+            'num_comments': random.randint(0, 20)
+        }
+    }
+
+
+def _login(fake, path_args, query, form):
+    return {
+        'access_token': uuid.uuid4().hex,
+        'token_type': 'bearer',
+        'expires_in': 86400,
+        'scope': '*'
+    }
+
+
+def _revoke_auth(fake, path_args, query, form):
+    return {}
+
+
+def _show_user(fake, path_args, query, form):
+    return {
+        'kind': 't2',
+        'data': {
+            'name': path_args['username'],
+            'id': _fullname('t2')[3:],
+            'link_karma': random.randint(0, 10000),
+            'comment_karma': random.randint(0, 50000),
+            'created_utc': time.time() - random.uniform(86400, 86400 * 3650),
+            'is_mod': False,
+            'verified': True
+        }
+    }
+
+
+def _relationship(fake, path_args, query, form):
+    user = query.get('user', [None])[0]
+    if user is not None:
+        # about 1 in 5 users have the relationship
+        usernames = [user] if random.random() < 0.2 else []
+    else:
+        usernames = [f'mod_{i}' for i in range(8)]
+    return _user_list(usernames, {'mod_permissions': ['all']})
+
+
+def _subreddit_comments(fake, path_args, query, form):
+    children = [_comment(path_args['subreddit']) for _ in range(fake.config.listing_size)]
+    return _listing(children, after=children[-1]['data']['name'] if children else None)
+
+
+def _subreddit_links(fake, path_args, query, form):
+    children = [_link(path_args['subreddit']) for _ in range(fake.config.listing_size)]
+    return _listing(children, after=children[-1]['data']['name'] if children else None)
+
+
+def _lookup_comment(fake, path_args, query, form):
+    link = _link('borrow')
+    comment = _comment('borrow', link_fullname=link['data']['name'])
+    comment['data']['name'] = 't1_' + query.get('comment', ['abc'])[0]
+    link_listing = _listing([link])
+    comment_listing = _listing([comment])
+    comment_listing['data']['dist'] = None
+    return [link_listing, comment_listing]
+
+
+def _unread(fake, path_args, query, form):
+    children = []
+    for _ in range(fake.config.listing_size):
+        was_comment = random.random() < 0.5
+        data = {
+            'name': _fullname('t1' if was_comment else 't4'),
+            'was_comment': was_comment,
+            'subject': 'comment reply' if was_comment else 'Hello',
+            'body': 'Lorem ipsum dolor sit amet, consectetur adipiscing elit.',
+            'author': f'user_{random.randint(1, 5000)}',
+            'subreddit': 'borrow' if was_comment else None,
+            'created_utc': time.time() - random.uniform(0, 3600)
+        }
+        # the inbox handler reads these fields from the child itself rather
+        # than its data, so they are at both levels
+        children.append({'kind': 't1' if was_comment else 't4', 'data': data, **data})
+    return _listing(children)
+
+
+def _modlog(fake, path_args, query, form):
+    children = []
+    for _ in range(fake.config.listing_size):
+        children.append({
+            'kind': 'modaction',
+            'data': {
+                'id': 'ModAction_' + uuid.uuid4().hex,
+                'target_fullname': _fullname('t3'),
+                'target_author': f'user_{random.randint(1, 5000)}',
+                'mod': f'mod_{random.randint(0, 7)}',
+                'action': random.choice(('removelink', 'approvecomment', 'banuser')),
+                'details': None,
+                'subreddit': path_args['subreddit'].split('+')[0],
+                'created_utc': time.time() - random.uniform(0, 3600)
+            }
+        })
+    return _listing(children, after=children[-1]['data']['id'] if children else None)
+
+
+def _json_success(fake, path_args, query, form):
+    return {'json': {'errors': []}}
+
+
+def _post_comment(fake, path_args, query, form):
+    return {
+        'jquery': [],
+        'success': True,
+        'json': {'errors': [], 'data': {'things': [_comment('borrow')]}}
+    }
+
+
+def _empty(fake, path_args, query, form):
+    return {}
+
+
+ROUTES = [
+    ('POST', r'/api/v1/access_token', 'login', _login),
+    ('POST', r'/api/v1/revoke_token', 'revoke_auth', _revoke_auth),
+    ('GET', r'/user/(?P<username>[^/]+)/about', 'show_user', _show_user),
+    ('GET', r'/r/(?P<subreddit>[^/]+)/about/moderators', 'moderators', _relationship),
+    ('GET', r'/r/(?P<subreddit>[^/]+)/about/contributors', 'contributors', _relationship),
+    ('GET', r'/r/(?P<subreddit>[^/]+)/about/banned', 'banned', _relationship),
+    ('GET', r'/r/(?P<subreddit>[^/]+)/about/log', 'modlog', _modlog),
+    ('GET', r'/r/(?P<subreddit>[^/]+)/comments', 'subreddit_comments', _subreddit_comments),
+    ('GET', r'/r/(?P<subreddit>[^/]+)/new', 'subreddit_links', _subreddit_links),
+    ('GET', r'/comments/(?P<link_id>[^/]+)\.json', 'lookup_comment', _lookup_comment),
+    ('GET', r'/message/unread', 'unread', _unread),
+    ('POST', r'/api/comment', 'post_comment', _post_comment),
+    ('POST', r'/api/compose', 'compose', _json_success),
+    ('POST', r'/api/read_all_messages', 'mark_all_read', _empty),
+    ('POST', r'/r/(?P<subreddit>[^/]+)/api/friend', 'subreddit_friend', _json_success),
+    ('POST', r'/r/(?P<subreddit>[^/]+)/api/unfriend', 'subreddit_unfriend', _empty),
+    ('POST', r'/r/(?P<subreddit>[^/]+)/api/flair', 'flair_link', _json_success),
+]
+"""Each route as (method, path regex, endpoint name, function), where the
+function takes the FakeReddit, the path arguments, the query and the form and
+returns the body to respond with"""
+
+_COMPILED_ROUTES = [
+    (method, re.compile(pattern + '$'), name, func) for method, pattern, name, func in ROUTES
+]
+
+
+def _match_route(method, path):
+    for route_method, pattern, name, func in _COMPILED_ROUTES:
+        if route_method != method:
+            continue
+        match = pattern.match(path)
+        if match is not None:
+            return name, func, match.groupdict()
+    return None
+
+
+def add_config_arguments(parser):
+    """Adds the arguments for a FakeRedditConfig to the given argparse
+    parser"""
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Mean seconds before each response')
+    parser.add_argument('--latency-jitter', type=float, default=0.0,
+                        help='Responses are up to this many seconds faster or slower')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Fraction of requests which fail with a 5xx')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='Fraction of requests which get a 429 regardless of the budget')
+    parser.add_argument('--retry-after', type=int, default=5,
+                        help='Retry-After on the 429s from --throttle-rate')
+    parser.add_argument('--ratelimit', type=int, default=600,
+                        help='Requests allowed per window for each access token')
+    parser.add_argument('--window', type=float, default=600,
+                        help='Seconds in each ratelimit window')
+    parser.add_argument('--listing-size', type=int, default=25,
+                        help='Number of items in each listing')
+
+
+def config_from_arguments(args):
+    """Get the FakeRedditConfig from arguments parsed by a parser set up with
+    add_config_arguments"""
+    return FakeRedditConfig(
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        ratelimit=args.ratelimit,
+        window=args.window,
+        listing_size=args.listing_size
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a fake reddit for benchmarks')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    fake = FakeReddit(config_from_arguments(args), host=args.host, port=args.port)
+    fake.start()
+    print(f'Serving a fake reddit at {fake.url}; set REDDIT_URL_OVERRIDE to that')
+    try:
+        while True:
+            time.sleep(60)
+            print(json.dumps(fake.stats(), sort_keys=True))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fake.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,299 @@
+"""An in-process stand-in for RabbitMQ and the Postgres-backed logger, so that
+handlers.manager.listen_with_handlers can run inside a single process without
+either. Only the parts of pika's BlockingConnection and BlockingChannel which
+the proxy uses are implemented.
+
+Typical use:
+
+    broker = MemoryBroker()
+    broker.publish('rproxy', json.dumps(packet))
+    broker.stop_when_idle = True
+    listen_with_handlers(MemoryLogger(), broker.connection(), handlers)
+    responses = broker.drain('my_response_queue')
+
+Published messages are delivered in order, nacked messages which are
+requeued go back to the front of their queue, and consuming stops after the
+inactivity timeout once stop_when_idle is set and every queue being consumed
+is empty with nothing unacknowledged. Message expiration and dead-lettering
+are not implemented, so delayed retries stay in their delay queue.
+"""
+from collections import deque
+import heapq
+import queue as queue_mod
+import threading
+import time
+import traceback
+
+
+class MemoryBroker:
+    """Holds the queues shared by every connection to this broker.
+    Thread-safe."""
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.queues = {}
+        self.declared = {}
+        self.unacked = {}
+        self.stop_when_idle = False
+        self.closed = False
+        self.num_published = 0
+        self.num_acked = 0
+        self.num_nacked = 0
+
+    def connection(self):
+        """Get a new connection to this broker"""
+        return MemoryConnection(self)
+
+    def declare(self, name, arguments=None):
+        """Declares the queue with the given name if it doesn't exist"""
+        with self.cond:
+            if name not in self.queues:
+                self.queues[name] = deque()
+                self.declared[name] = arguments
+
+    def publish(self, routing_key, body, properties=None):
+        """Adds a message to the end of the given queue, declaring the queue
+        if necessary. The body may be a str or bytes."""
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        with self.cond:
+            self.queues.setdefault(routing_key, deque()).append((body, properties))
+            self.num_published += 1
+            self.cond.notify_all()
+
+    def drain(self, name):
+        """Removes and returns the bodies of every message in the given queue,
+        decoded as str"""
+        with self.cond:
+            messages = self.queues.get(name) or deque()
+            self.queues[name] = deque()
+        return [body.decode('utf-8') for body, _ in messages]
+
+    def size(self, name):
+        """Get the number of messages waiting in the given queue"""
+        with self.cond:
+            return len(self.queues.get(name) or ())
+
+    def close(self):
+        """Stops every consumer"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+class MemoryConnection:
+    """The equivalent of a pika BlockingConnection to a MemoryBroker.
+
+    :param broker: The MemoryBroker to connect to
+    """
+    def __init__(self, broker):
+        self.broker = broker
+        self.callbacks = queue_mod.Queue()
+        self.timers = []
+        self.is_open = True
+
+    def channel(self):
+        return MemoryChannel(self)
+
+    def add_callback_threadsafe(self, callback):
+        """Schedules the callback to run on the thread consuming messages, like
+        pika"""
+        self.callbacks.put(callback)
+        with self.broker.cond:
+            self.broker.cond.notify_all()
+
+    def call_later(self, delay, callback):
+        """Schedules the callback to run on the thread consuming messages after
+        the given number of seconds, like pika. Must be called on that
+        thread."""
+        heapq.heappush(self.timers, (time.monotonic() + delay, id(callback), callback))
+
+    def process_data_events(self, time_limit=0):
+        self._run_callbacks()
+
+    def sleep(self, duration):
+        """Runs callbacks for the given number of seconds, like pika"""
+        deadline = time.monotonic() + duration
+        while True:
+            self._run_callbacks()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            with self.broker.cond:
+                if self.callbacks.empty():
+                    self.broker.cond.wait(min(remaining, 0.01))
+
+    def close(self):
+        self.is_open = False
+
+    def _run_callbacks(self):
+        while True:
+            if self.timers and self.timers[0][0] <= time.monotonic():
+                callback = heapq.heappop(self.timers)[2]
+            else:
+                try:
+                    callback = self.callbacks.get_nowait()
+                except queue_mod.Empty:
+                    return
+            try:
+                callback()
+            except:  # noqa: E722
+                traceback.print_exc()
+                raise
+
+
+class MethodFrame:
+    """The parts of a pika Basic.Deliver method frame the proxy uses"""
+    def __init__(self, delivery_tag, routing_key):
+        self.delivery_tag = delivery_tag
+        self.routing_key = routing_key
+
+
+class MemoryChannel:
+    """The equivalent of a pika BlockingChannel on a MemoryConnection.
+
+    :param connection: The MemoryConnection this channel is on
+    """
+    def __init__(self, connection):
+        self.connection = connection
+        self.broker = connection.broker
+        self.next_delivery_tag = 1
+        self.prefetch_count = 0
+        self.consuming = False
+
+    def queue_declare(self, queue, arguments=None, **kwargs):
+        self.broker.declare(queue, arguments)
+
+    def queue_purge(self, queue):
+        self.broker.drain(queue)
+
+    def basic_qos(self, prefetch_count=0, **kwargs):
+        self.prefetch_count = prefetch_count
+
+    def basic_publish(self, exchange, routing_key, body, properties=None, **kwargs):
+        self.broker.publish(routing_key, body, properties)
+
+    def basic_ack(self, delivery_tag=0, multiple=False):
+        with self.broker.cond:
+            self._settle(delivery_tag)
+            self.broker.num_acked += 1
+            self.broker.cond.notify_all()
+
+    def basic_nack(self, delivery_tag=0, multiple=False, requeue=True):
+        with self.broker.cond:
+            message = self._settle(delivery_tag)
+            self.broker.num_nacked += 1
+            if requeue:
+                routing_key, body, properties = message
+                self.broker.queues[routing_key].appendleft((body, properties))
+            self.broker.cond.notify_all()
+
+    def basic_reject(self, delivery_tag=0, requeue=True):
+        self.basic_nack(delivery_tag, requeue=requeue)
+
+    def consume(self, queue, inactivity_timeout=None, **kwargs):
+        """Yields (method_frame, properties, body) for each message in the
+        queue, or (None, None, None) after inactivity_timeout seconds without
+        one. Callbacks added with add_callback_threadsafe run while waiting.
+        Returns once the broker is closed, or once it's idle when
+        stop_when_idle is set."""
+        broker = self.broker
+        self.consuming = True
+        idle_since = time.monotonic()
+        while self.consuming:
+            self.connection._run_callbacks()
+            with broker.cond:
+                message = None
+                if broker.closed:
+                    return
+                messages = broker.queues.setdefault(queue, deque())
+                unacked = self._unacked_count()
+                if messages and (self.prefetch_count <= 0 or unacked < self.prefetch_count):
+                    body, properties = messages.popleft()
+                    delivery_tag = self.next_delivery_tag
+                    self.next_delivery_tag += 1
+                    broker.unacked[(id(self), delivery_tag)] = (queue, body, properties)
+                    message = (MethodFrame(delivery_tag, queue), properties, body)
+                elif (
+                        broker.stop_when_idle and not messages and unacked == 0
+                        and self.connection.callbacks.empty() and not self.connection.timers):
+                    return
+                else:
+                    broker.cond.wait(0.01)
+
+            if message is not None:
+                idle_since = time.monotonic()
+                yield message
+            elif (
+                    inactivity_timeout is not None
+                    and time.monotonic() - idle_since >= inactivity_timeout):
+                idle_since = time.monotonic()
+                yield None, None, None
+
+    def cancel(self):
+        """Stops consuming, requeueing nothing since nothing is prefetched
+        beyond what was yielded"""
+        self.consuming = False
+        return 0
+
+    def close(self):
+        self.consuming = False
+
+    def _unacked_count(self):
+        key = id(self)
+        return sum(1 for channel_id, _ in self.broker.unacked if channel_id == key)
+
+    def _settle(self, delivery_tag):
+        message = self.broker.unacked.pop((id(self), delivery_tag), None)
+        if message is None:
+            raise ValueError(f'unknown delivery tag {delivery_tag}')
+        return message
+
+
+class MemoryLogConnection:
+    """Stands in for the Postgres connection of the logger"""
+    def __init__(self):
+        self.num_commits = 0
+
+    def commit(self):
+        self.num_commits += 1
+
+    def close(self):
+        pass
+
+
+class MemoryLogger:
+    """Stands in for lblogging.Logger. Messages are formatted like the real
+    logger, so formatting is included in benchmarks, and are only kept if
+    requested.
+
+    :param keep: True to keep every record in `records`, False to discard
+        them after formatting
+    :param iden: The identifier of the logger, as in lblogging
+    :param connection: The MemoryLogConnection to use; a new one by default
+    :param records: The list to append records to, shared by loggers created
+        with with_iden
+    """
+    def __init__(self, keep=False, iden='memory', connection=None, records=None):
+        self.keep = keep
+        self.iden = iden
+        self.connection = connection or MemoryLogConnection()
+        self.records = records if records is not None else []
+
+    def prepare(self):
+        pass
+
+    def with_iden(self, iden):
+        return MemoryLogger(self.keep, iden, self.connection, self.records)
+
+    def print(self, level, message, *args):
+        formatted = message.format(*args)
+        if self.keep:
+            self.records.append((level, self.iden, formatted))
+
+    def exception(self, level, message=None, *args):
+        formatted = (message or '').format(*args) + '\n' + traceback.format_exc()
+        if self.keep:
+            self.records.append((level, self.iden, formatted))
+
+    def close(self):
+        pass
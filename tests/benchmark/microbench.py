@@ -0,0 +1,294 @@
+"""Measures the per-message overhead of the proxy without RabbitMQ, Postgres
+or reddit, using the in-memory broker and logger (see memory_broker.py) and a
+fake reddit with no latency (see fake_reddit.py). This takes a few seconds,
+so it can be run after every change:
+
+    python microbench.py --save baseline.json
+    # make changes
+    python microbench.py --compare baseline.json
+
+With --compare this exits with status 1 if any benchmark got slower by more
+than the tolerance. The lblogging package must be importable, as it is when
+running the proxy.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import timeit
+import uuid
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(HERE, '..', '..', 'src')
+sys.path.insert(0, SRC)
+
+from fake_reddit import FakeReddit, FakeRedditConfig  # noqa: E402
+from memory_broker import MemoryBroker, MemoryLogger  # noqa: E402
+
+QUEUE = 'rproxy'
+RESPONSE_QUEUE = 'bench_resp'
+
+ENVIRONMENT_DEFAULTS = {
+    'AMQP_QUEUE': QUEUE,
+    'USER_AGENT': 'reddit-proxy microbenchmarks',
+    'MIN_TIME_BETWEEN_REQUESTS_S': '0',
+    'REDDIT_USERNAME': 'bench',
+    'REDDIT_PASSWORD': 'bench',
+    'REDDIT_CLIENT_ID': 'bench',
+    'REDDIT_CLIENT_SECRET': 'bench',
+    'REDDIT_AUTH_PATH': '',
+    'RESPONSE_QUEUE_REGISTRY_PATH': '',
+    'RATELIMIT_RESERVE': '0'
+}
+"""The environment the proxy is run with, unless already set"""
+
+
+def sample_packet(request_type='show_user', idx=0):
+    """Get a typical request packet"""
+    return {
+        'type': request_type,
+        'response_queue': RESPONSE_QUEUE,
+        'uuid': str(uuid.uuid4()),
+        'version_utc_seconds': 1581255042.707,
+        'sent_at': 1581255043.0,
+        'args': {'username': f'bench_{idx}'},
+        'style': {
+            '2xx': {'operation': 'copy', 'log_level': 'TRACE'},
+            '4xx': {'operation': 'failure'},
+            '5xx': {'operation': 'retry', 'ignore_version': False}
+        },
+        'ignore_version': False
+    }
+
+
+class _NullChannel:
+    """A channel which discards everything, so that benchmarks of building
+    and publishing responses don't measure the broker"""
+    def __init__(self):
+        self.num_bytes = 0
+
+    def basic_publish(self, exchange, routing_key, body, properties=None):
+        self.num_bytes += len(body)
+
+    def basic_ack(self, delivery_tag):
+        pass
+
+    def basic_nack(self, delivery_tag, requeue=True):
+        pass
+
+    def queue_declare(self, queue, arguments=None):
+        pass
+
+
+def bench_parse(manager, logger, number):
+    body_bytes = json.dumps(sample_packet()).encode('utf-8')
+    return timeit.repeat(lambda: manager._parse_request(logger, body_bytes),
+                         number=number, repeat=3)
+
+
+def bench_handle_style(manager, logger, number):
+    style = sample_packet()['style']
+
+    def run():
+        manager._get_handle_style(style, 200)
+        manager._get_handle_style(None, 503)
+    return timeit.repeat(run, number=number, repeat=3)
+
+
+def bench_check_version(manager, logger, number):
+    from registry import ResponseQueueRegistry
+    registry = ResponseQueueRegistry(None, 10000, 86400)
+    bodies = [dict(sample_packet(), response_queue=f'queue_{i}') for i in range(10)]
+    idx = [0]
+
+    def run():
+        idx[0] = (idx[0] + 1) % len(bodies)
+        manager._check_response_queue(logger, registry, bodies[idx[0]])
+    return timeit.repeat(run, number=number, repeat=3)
+
+
+def bench_respond(manager, logger, number):
+    from retries import RetryPolicy
+    channel = _NullChannel()
+    retry_policy = RetryPolicy(5, 300, 0)
+    body = sample_packet()
+    handle_style = manager._get_handle_style(body['style'], 200)
+    info = {
+        'cumulative_karma': 1234, 'link_karma': 234, 'comment_karma': 1000,
+        'created_at_utc_seconds': 1581255043.0
+    }
+    return timeit.repeat(
+        lambda: manager._respond(channel, QUEUE, body, 1, handle_style, 200, info, retry_policy),
+        number=number, repeat=3
+    )
+
+
+class _ConstantEndpoint:
+    """An endpoint which doesn't make a request, so that benchmarks of
+    dispatching to endpoints only measure the dispatch"""
+    name = 'constant'
+
+    def make_request(self, auth, username, limit=25):
+        """Returns this endpoint"""
+        return self
+
+
+def _passthrough_middleware(name, call):
+    def wrapped(*args, **kwargs):
+        return call(*args, **kwargs)
+    return wrapped
+
+
+def _bench_dispatch(number, num_observers, num_middleware):
+    """The seconds spent dispatching number calls to an endpoint through
+    Reddit, beyond calling the endpoint directly"""
+    import reddit
+
+    class BenchReddit(reddit.Reddit):
+        pass
+
+    endpoint = _ConstantEndpoint()
+    BenchReddit.constant = reddit._wrap_endpoint(endpoint)
+    instance = BenchReddit()
+    for _ in range(num_observers):
+        instance.add_observer(lambda name, response: None)
+    for _ in range(num_middleware):
+        instance.add_middleware(_passthrough_middleware)
+
+    direct = min(timeit.repeat(
+        lambda: endpoint.make_request(None, 'bench'), number=number, repeat=3
+    ))
+    return [
+        max(0.0, result - direct)
+        for result in timeit.repeat(
+            lambda: instance.constant(None, 'bench'), number=number, repeat=3
+        )
+    ]
+
+
+def bench_dispatch(manager, logger, number):
+    return _bench_dispatch(number, 0, 0)
+
+
+def bench_dispatch_hooks(manager, logger, number):
+    return _bench_dispatch(number, 2, 1)
+
+
+def _bench_loop(manager, logger, handlers, packets):
+    def run():
+        broker = MemoryBroker()
+        for packet in packets:
+            broker.publish(QUEUE, json.dumps(packet))
+        broker.stop_when_idle = True
+        manager.listen_with_handlers(logger, broker.connection(), handlers)
+        responses = broker.drain(RESPONSE_QUEUE)
+        if len(responses) != len(packets):
+            raise Exception(f'expected {len(packets)} responses, got {len(responses)}')
+
+    # the consume loop polls for the end, so subtract the time it spends
+    # noticing that everything is done from the measurement
+    results = []
+    for _ in range(3):
+        started_at = time.perf_counter()
+        run()
+        results.append(time.perf_counter() - started_at)
+    empty_at = time.perf_counter()
+    broker = MemoryBroker()
+    broker.stop_when_idle = True
+    manager.listen_with_handlers(logger, broker.connection(), handlers)
+    empty = time.perf_counter() - empty_at
+    return [max(0.0, r - empty) for r in results]
+
+
+def bench_loop_ping(manager, logger, number):
+    handlers = [h for h in manager._get_handlers(logger) if h.name == '_ping']
+    packets = [dict(sample_packet('_ping', i), args={}) for i in range(number)]
+    return _bench_loop(manager, logger, handlers, packets)
+
+
+def bench_loop_show_user(manager, logger, number):
+    handlers = [h for h in manager._get_handlers(logger) if h.name == 'show_user']
+    packets = [sample_packet('show_user', i) for i in range(number)]
+    return _bench_loop(manager, logger, handlers, packets)
+
+
+BENCHMARKS = [
+    ('parse_request', bench_parse, 20000),
+    ('handle_style', bench_handle_style, 50000),
+    ('check_response_queue', bench_check_version, 50000),
+    ('respond', bench_respond, 20000),
+    ('dispatch', bench_dispatch, 200000),
+    ('dispatch_hooks', bench_dispatch_hooks, 200000),
+    ('loop_ping', bench_loop_ping, 500),
+    ('loop_show_user', bench_loop_show_user, 200)
+]
+"""Each benchmark as (name, function, number of messages). The function takes
+the manager module, the logger and the number, and returns the seconds taken
+by each of several repetitions."""
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the per-message overhead of the proxy')
+    parser.add_argument('--only', default=None,
+                        help='Comma-separated names of the benchmarks to run')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Multiplies the number of messages for each benchmark')
+    parser.add_argument('--log-level', default='TRACE',
+                        help='The LOG_MIN_LEVEL to run the proxy with')
+    parser.add_argument('--save', default=None, help='Save the results to this json file')
+    parser.add_argument('--compare', default=None,
+                        help='Compare the results to those saved in this json file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='With --compare, the fraction slower which counts as a regression')
+    args = parser.parse_args()
+
+    for key, val in ENVIRONMENT_DEFAULTS.items():
+        os.environ.setdefault(key, val)
+    os.environ.setdefault('LOG_MIN_LEVEL', args.log_level)
+
+    fake = FakeReddit(FakeRedditConfig(ratelimit=10 ** 9))
+    fake.start()
+    # connections reads this when imported, so it must be set first
+    os.environ['REDDIT_URL_OVERRIDE'] = fake.url
+
+    import loglevels
+    import handlers.manager as manager
+
+    logger = loglevels.gate(MemoryLogger())
+    only = set(args.only.split(',')) if args.only else None
+    results = {}
+    try:
+        for name, func, number in BENCHMARKS:
+            if only is not None and name not in only:
+                continue
+            number = max(1, int(number * args.scale))
+            best = min(func(manager, logger, number))
+            results[name] = best / number * 1e6
+            print(f'{name:<24} {results[name]:>10.2f} us/message ({number} messages)')
+    finally:
+        fake.stop()
+
+    if args.save:
+        with open(args.save, 'w') as outfile:
+            json.dump(results, outfile, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as infile:
+            baseline = json.load(infile)
+        regressed = False
+        for name, micros in results.items():
+            if name not in baseline:
+                continue
+            change = micros / baseline[name] - 1
+            flag = ''
+            if change > args.tolerance:
+                flag = '  REGRESSION'
+                regressed = True
+            print(f'{name:<24} {baseline[name]:>10.2f} -> {micros:>10.2f} ({change:+.0%}){flag}')
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+"""Drives requests through a running reddit proxy and reports its throughput
+and latency. The proxy should be pointed at a fake reddit (see
+fake_reddit.py) by setting REDDIT_URL_OVERRIDE, and this connects to the same
+AMQP server using the same environment variables as the integration tests.
+
+For example, start the fake reddit from here and keep 20 requests in flight:
+
+    python run.py --fake-port 8089 --latency 0.2 --requests 1000 --in-flight 20
+
+while the proxy runs with REDDIT_URL_OVERRIDE=http://127.0.0.1:8089
+
+The latency of each request is from its sent_at until its response was
+received here. Every request asks for the timing breakdown (see the Timing
+section of the README), whose mean is reported per phase.
+"""
+import argparse
+import json
+import os
+import time
+import uuid
+import pika
+from fake_reddit import FakeReddit, add_config_arguments, config_from_arguments
+
+
+DEFAULT_TYPES = (
+    'show_user', 'user_is_moderator', 'subreddit_moderators', 'subreddit_comments',
+    'subreddit_links', 'lookup_comment'
+)
+"""The request types sent by default, which are all read-only"""
+
+
+def request_args(request_type, idx):
+    """Get the args for the idx'th request of the given type. Different idx
+    give different args, so requests aren't answered from the cache or
+    coalesced."""
+    if request_type == 'show_user':
+        return {'username': f'bench_{idx}'}
+    if request_type in ('user_is_moderator', 'user_is_approved', 'user_is_banned'):
+        return {'subreddit': 'borrow', 'username': f'bench_{idx}'}
+    if request_type == 'subreddit_moderators':
+        return {'subreddit': f'bench_{idx}'}
+    if request_type in ('subreddit_comments', 'subreddit_links'):
+        return {'subreddit': [f'bench_{idx}'], 'limit': 25}
+    if request_type == 'lookup_comment':
+        return {'link_fullname': 't3_bench', 'comment_fullname': f't1_{idx}'}
+    if request_type == 'modlog':
+        return {'subreddits': [f'bench_{idx}'], 'limit': 25}
+    if request_type == 'compose':
+        return {'recipient': f'bench_{idx}', 'subject': 'Benchmark', 'body': 'Hello'}
+    if request_type == 'post_comment':
+        return {'parent': f't1_{idx}', 'text': 'Benchmark'}
+    return {}
+
+
+def run_benchmark(channel, queue, response_queue, types, num_requests, in_flight,
+                  repeat_args=False, timeout=60):
+    """Sends the given number of requests through the proxy, keeping at most
+    in_flight of them waiting on a response at once, and returns the results.
+
+    :param channel: The pika channel to use
+    :param queue: The queue the proxy consumes
+    :param response_queue: The queue to receive responses on
+    :param types: The request types to send, in rotation
+    :param num_requests: The number of requests to send
+    :param in_flight: The most requests waiting on a response at once
+    :param repeat_args: If True every request of the same type has the same
+        args, so the cache and coalescing apply
+    :param timeout: Give up after this many seconds without a response
+    :return: A dict with the keys "elapsed" (seconds), "latencies" (a list of
+        seconds, one per response), "statuses" (a dict from the response type
+        or status to count), "timings" (the timing breakdowns) and "missing"
+        (the number of requests without a response)
+    """
+    pending = {}
+    latencies = []
+    statuses = {}
+    timings = []
+    version = time.time()
+    style = {
+        '2xx': {'operation': 'copy', 'log_level': 'NONE'},
+        '4xx': {'operation': 'copy', 'log_level': 'NONE'},
+        '5xx': {'operation': 'copy', 'log_level': 'NONE'}
+    }
+    sent = 0
+
+    def send_more():
+        nonlocal sent
+        while sent < num_requests and len(pending) < in_flight:
+            request_type = types[sent % len(types)]
+            request_uuid = str(uuid.uuid4())
+            sent_at = time.time()
+            channel.basic_publish(
+                '',
+                queue,
+                json.dumps({
+                    'type': request_type,
+                    'response_queue': response_queue,
+                    'uuid': request_uuid,
+                    'version_utc_seconds': version,
+                    'sent_at': sent_at,
+                    'args': request_args(request_type, 0 if repeat_args else sent),
+                    'style': style,
+                    'timing': True
+                })
+            )
+            pending[request_uuid] = sent_at
+            sent += 1
+
+    started_at = time.time()
+    last_response_at = started_at
+    send_more()
+    for method_frame, properties, body_bytes in channel.consume(
+            response_queue, inactivity_timeout=1):
+        if method_frame is None:
+            if time.time() - last_response_at > timeout:
+                break
+            continue
+
+        channel.basic_ack(method_frame.delivery_tag)
+        received_at = time.time()
+        body = json.loads(body_bytes.decode('utf-8'))
+        sent_at = pending.pop(body['uuid'], None)
+        if sent_at is None:
+            continue
+        last_response_at = received_at
+        latencies.append(received_at - sent_at)
+        status = body.get('status', body['type'])
+        statuses[status] = statuses.get(status, 0) + 1
+        if body.get('timing') is not None:
+            timings.append(body['timing'])
+
+        send_more()
+        if not pending and sent >= num_requests:
+            break
+    channel.cancel()
+
+    return {
+        'elapsed': time.time() - started_at,
+        'latencies': latencies,
+        'statuses': statuses,
+        'timings': timings,
+        'missing': len(pending) + (num_requests - sent)
+    }
+
+
+def summarize(results):
+    """Get a json-serializable summary of the results from run_benchmark"""
+    latencies = sorted(results['latencies'])
+    phases = {}
+    for timing in results['timings']:
+        for phase, seconds in timing.items():
+            phases[phase] = phases.get(phase, 0) + seconds
+    return {
+        'responses': len(latencies),
+        'missing': results['missing'],
+        'elapsed_seconds': round(results['elapsed'], 3),
+        'throughput_per_second': (
+            round(len(latencies) / results['elapsed'], 3) if results['elapsed'] > 0 else None
+        ),
+        'latency_seconds': {
+            'p50': _percentile(latencies, 50),
+            'p95': _percentile(latencies, 95),
+            'p99': _percentile(latencies, 99),
+            'max': round(latencies[-1], 4) if latencies else None
+        },
+        'statuses': dict((str(k), v) for k, v in results['statuses'].items()),
+        'mean_phase_seconds': dict(
+            (phase, round(total / len(results['timings']), 4))
+            for phase, total in phases.items()
+        ) if results['timings'] else None
+    }
+
+
+def _percentile(sorted_values, percent):
+    """The nearest-rank percentile of the given sorted values"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return round(sorted_values[int(rank) - 1], 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark a running reddit proxy')
+    parser.add_argument('--requests', type=int, default=500,
+                        help='The number of requests to send')
+    parser.add_argument('--in-flight', type=int, default=10,
+                        help='The most requests waiting on a response at once')
+    parser.add_argument('--types', default=','.join(DEFAULT_TYPES),
+                        help='Comma-separated request types to send in rotation')
+    parser.add_argument('--repeat-args', action='store_true',
+                        help='Use the same args for every request of a type')
+    parser.add_argument('--response-queue', default='benchmark_resp_queue')
+    parser.add_argument('--timeout', type=float, default=60,
+                        help='Give up after this many seconds without a response')
+    parser.add_argument('--fake-port', type=int, default=None,
+                        help='Serve a fake reddit on this port while benchmarking')
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    fake = None
+    if args.fake_port is not None:
+        fake = FakeReddit(config_from_arguments(args), port=args.fake_port)
+        fake.start()
+        print(f'Serving a fake reddit at {fake.url}')
+
+    amqp = pika.BlockingConnection(
+        pika.ConnectionParameters(
+            os.environ['AMQP_HOST'],
+            int(os.environ['AMQP_PORT']),
+            os.environ['AMQP_VHOST'],
+            pika.PlainCredentials(
+                os.environ['AMQP_USERNAME'], os.environ['AMQP_PASSWORD']
+            )
+        )
+    )
+    try:
+        channel = amqp.channel()
+        channel.queue_declare(os.environ['AMQP_QUEUE'])
+        channel.queue_declare(args.response_queue)
+        channel.queue_purge(args.response_queue)
+        results = run_benchmark(
+            channel, os.environ['AMQP_QUEUE'], args.response_queue,
+            [t.strip() for t in args.types.split(',') if t.strip()],
+            args.requests, args.in_flight, repeat_args=args.repeat_args,
+            timeout=args.timeout
+        )
+        channel.close()
+    finally:
+        amqp.close()
+        if fake is not None:
+            fake.stop()
+
+    summary = summarize(results)
+    if fake is not None:
+        summary['fake_reddit'] = fake.stats()
+    print(json.dumps(summary, indent=2, sort_keys=True))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""Measures how long the proxy takes to start, in fresh processes run from an
+unrelated working directory like after a deploy or a supervisor restart:
+
+    python startup.py --runs 5
+
+The import report comes from `python -X importtime` and lists the modules
+imported directly by the entrypoint which took the longest, including
+everything they imported, then the slowest of the proxy's own modules on
+their own. The first message is a request handled by the blocking engine on
+the in-memory broker (see memory_broker.py) against a fake reddit with no
+latency, timed from launching the process until its response is published.
+The lblogging package must be importable, as it is when running the proxy.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.abspath(os.path.join(HERE, '..', '..', 'src'))
+
+
+def import_report(module, runs):
+    """Imports the given module in the given number of fresh processes.
+
+    :return by_import: The least microseconds taken by each module imported
+        directly by the import of the given module, including everything it
+        imported in turn
+    :return own: The least microseconds taken by each module in src, not
+        including the modules it imported
+    """
+    by_import = {}
+    own = {}
+    src_modules = _src_modules()
+    for _ in range(runs):
+        stderr = _run_python(['-X', 'importtime', '-c', f'import {module}']).stderr
+        # each import is listed after the imports it made, so the direct
+        # imports of a top-level import are known once it's reached
+        direct = []
+        for line in stderr.splitlines():
+            if not line.startswith('import time:') or 'imported package' in line:
+                continue
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            depth = (len(name) - len(name.lstrip())) // 2
+            name = name.strip()
+            if depth == 1:
+                direct.append((name, int(cumulative_us)))
+            elif depth == 0:
+                if name == module:
+                    for direct_name, micros in direct:
+                        by_import[direct_name] = min(
+                            by_import.get(direct_name, float('inf')), micros
+                        )
+                direct = []
+            if name.split('.')[0] in src_modules:
+                own[name] = min(own.get(name, float('inf')), int(self_us))
+    return by_import, own
+
+
+def first_message(fake_url, request_type, runs):
+    """Starts the proxy in the given number of fresh processes, each of which
+    exits after responding to one request.
+
+    :return: A list with a dict for each run with the seconds from launching
+        the process until the benchmark harness was imported ("harness"),
+        until the proxy was imported ("imported"), and until the response was
+        published ("first_response")
+    """
+    results = []
+    for _ in range(runs):
+        launched_at = time.time()
+        completed = _run_python(
+            [os.path.abspath(__file__), '--child', fake_url, request_type, str(launched_at)]
+        )
+        if completed.returncode != 0:
+            raise Exception(f'child failed:\n{completed.stderr}')
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return results
+
+
+def _child(fake_url, request_type, launched_at):
+    sys.path.insert(0, HERE)
+    sys.path.insert(0, SRC)
+    from memory_broker import MemoryBroker, MemoryLogger
+    from microbench import ENVIRONMENT_DEFAULTS, QUEUE, RESPONSE_QUEUE, sample_packet
+    harness_at = time.time()
+
+    for key, val in ENVIRONMENT_DEFAULTS.items():
+        os.environ.setdefault(key, val)
+    os.environ.setdefault('LOG_MIN_LEVEL', 'TRACE')
+    os.environ['REDDIT_URL_OVERRIDE'] = fake_url
+
+    import handlers.manager as manager
+    imported_at = time.time()
+
+    class FirstResponseBroker(MemoryBroker):
+        first_response_at = None
+
+        def publish(self, routing_key, body, properties=None):
+            if routing_key == RESPONSE_QUEUE and self.first_response_at is None:
+                self.first_response_at = time.time()
+            super().publish(routing_key, body, properties)
+
+    broker = FirstResponseBroker()
+    packet = sample_packet(request_type)
+    if request_type == '_ping':
+        packet['args'] = {}
+    broker.publish(QUEUE, json.dumps(packet))
+    broker.stop_when_idle = True
+    manager.register_listeners(MemoryLogger(), broker.connection())
+    if broker.first_response_at is None:
+        raise Exception('no response was published')
+
+    print(json.dumps({
+        'harness': harness_at - launched_at,
+        'imported': imported_at - launched_at,
+        'first_response': broker.first_response_at - launched_at
+    }))
+
+
+def _src_modules():
+    names = set()
+    for name in os.listdir(SRC):
+        if name.endswith('.py'):
+            names.add(name[:-3])
+        elif os.path.isdir(os.path.join(SRC, name)) and not name.startswith('_'):
+            names.add(name)
+    return names
+
+
+def _run_python(args):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [SRC] + ([env['PYTHONPATH']] if env.get('PYTHONPATH') else [])
+    )
+    with tempfile.TemporaryDirectory() as cwd:
+        return subprocess.run(
+            [sys.executable] + args, cwd=cwd, env=env,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True
+        )
+
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == '--child':
+        _child(sys.argv[2], sys.argv[3], float(sys.argv[4]))
+        return
+
+    parser = argparse.ArgumentParser(description='Measure how long the proxy takes to start')
+    parser.add_argument('--runs', type=int, default=5,
+                        help='The number of processes to start for each measurement')
+    parser.add_argument('--module', default='handlers.manager',
+                        help='The module to report the import times of, e.g., async_engine')
+    parser.add_argument('--type', default='show_user',
+                        help='The request type of the first message')
+    parser.add_argument('--top', type=int, default=10,
+                        help='The number of modules to list in each part of the import report')
+    args = parser.parse_args()
+
+    by_import, own = import_report(args.module, args.runs)
+    print(f'Slowest imports by {args.module}, including their imports:')
+    for name, micros in sorted(by_import.items(), key=lambda item: -item[1])[:args.top]:
+        print(f'  {name:<40} {micros / 1000:>8.1f} ms')
+    print('Slowest modules in src, not including their imports:')
+    for name, micros in sorted(own.items(), key=lambda item: -item[1])[:args.top]:
+        print(f'  {name:<40} {micros / 1000:>8.1f} ms')
+
+    from fake_reddit import FakeReddit, FakeRedditConfig
+
+    fake = FakeReddit(FakeRedditConfig(ratelimit=10 ** 9))
+    fake.start()
+    try:
+        results = first_message(fake.url, args.type, args.runs)
+    finally:
+        fake.stop()
+
+    print(f'Seconds from launch until, median of {args.runs}:')
+    for key in ('harness', 'imported', 'first_response'):
+        print(f'  {key:<40} {statistics.median(r[key] for r in results):>8.3f}')
+
+
+if __name__ == '__main__':
+    main()
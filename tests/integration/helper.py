@@ -1,10 +1,13 @@
-"""Contains utility functions for tests"""
-import json
-
-
-def fetch_one(self, queue):
-    """Fetch one message from the given queue"""
-    for method_frame, properties, body_bytes in self.channel.consume(queue, inactivity_timeout=20):
-        self.assertIsNotNone(method_frame)
-        self.channel.basic_ack(method_frame.delivery_tag)
-        return json.loads(body_bytes.decode('utf-8'))
+"""Contains utility functions for tests"""
+import json
+
+
+def fetch_one(self, queue, channel=None):
+    """Fetch one message from the given queue, using the given channel or
+    self.channel if it's None"""
+    if channel is None:
+        channel = self.channel
+    for method_frame, properties, body_bytes in channel.consume(queue, inactivity_timeout=20):
+        self.assertIsNotNone(method_frame)
+        channel.basic_ack(method_frame.delivery_tag)
+        return json.loads(body_bytes.decode('utf-8'))
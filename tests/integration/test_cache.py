@@ -0,0 +1,85 @@
+"""Tests that responses are served from the cache unless the request says
+no_cache or asks for a fresher result with max_age"""
+import unittest
+import os
+import pika
+import json
+import time
+import helper
+
+
+PIKA_PARAMETERS = pika.ConnectionParameters(
+    os.environ['AMQP_HOST'],
+    int(os.environ['AMQP_PORT']),
+    os.environ['AMQP_VHOST'],
+    pika.PlainCredentials(
+        os.environ['AMQP_USERNAME'], os.environ['AMQP_PASSWORD']
+    )
+)
+
+
+QUEUE = os.environ['AMQP_QUEUE']
+
+
+RESPONSE_QUEUE = 'cache_resp_queue'
+
+
+class CacheTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        amqp = pika.BlockingConnection(PIKA_PARAMETERS)
+        channel = amqp.channel()
+        channel.queue_declare(QUEUE)
+        channel.queue_declare(RESPONSE_QUEUE)
+        cls.channel = channel
+        cls.amqp = amqp
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.channel.close()
+        cls.amqp.close()
+
+    def show_user(self, uuid, **fields):
+        """Sends a timed show_user request with the given extra fields and
+        returns the response after checking it succeeded"""
+        packet = {
+            'type': 'show_user',
+            'response_queue': RESPONSE_QUEUE,
+            'uuid': uuid,
+            'version_utc_seconds': 1,
+            'sent_at': time.time(),
+            'timing': True,
+            'args': {
+                'username': 'Tjstretchalot'
+            }
+        }
+        packet.update(fields)
+        self.channel.basic_publish('', QUEUE, json.dumps(packet))
+        body = helper.fetch_one(self, RESPONSE_QUEUE)
+        self.assertIsInstance(body, dict)
+        self.assertEqual(body.get('uuid'), uuid)
+        self.assertEqual(body.get('type'), 'copy')
+        self.assertEqual(body.get('status'), 200)
+        self.assertIsInstance(body.get('timing'), dict)
+        return body
+
+    def test_cached(self):
+        first = self.show_user('cache-warm-uuid')
+        body = self.show_user('cache-hit-uuid')
+        self.assertEqual(body['timing']['http'], 0)
+        self.assertEqual(body['info'], first['info'])
+
+    def test_no_cache(self):
+        self.show_user('cache-warm-uuid')
+        body = self.show_user('cache-no-cache-uuid', no_cache=True)
+        self.assertGreater(body['timing']['http'], 0)
+
+    def test_max_age(self):
+        self.show_user('cache-warm-uuid')
+        time.sleep(2)
+        body = self.show_user('cache-max-age-uuid', max_age=1)
+        self.assertGreater(body['timing']['http'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
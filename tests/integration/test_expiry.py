@@ -0,0 +1,74 @@
+"""Tests that requests past their deadline or ttl_seconds are answered with
+expired instead of being handled"""
+import unittest
+import os
+import pika
+import json
+import time
+import helper
+
+
+PIKA_PARAMETERS = pika.ConnectionParameters(
+    os.environ['AMQP_HOST'],
+    int(os.environ['AMQP_PORT']),
+    os.environ['AMQP_VHOST'],
+    pika.PlainCredentials(
+        os.environ['AMQP_USERNAME'], os.environ['AMQP_PASSWORD']
+    )
+)
+
+
+QUEUE = os.environ['AMQP_QUEUE']
+
+
+RESPONSE_QUEUE = 'expiry_resp_queue'
+
+
+class ExpiryTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        amqp = pika.BlockingConnection(PIKA_PARAMETERS)
+        channel = amqp.channel()
+        channel.queue_declare(QUEUE)
+        channel.queue_declare(RESPONSE_QUEUE)
+        cls.channel = channel
+        cls.amqp = amqp
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.channel.close()
+        cls.amqp.close()
+
+    def show_user(self, uuid, sent_at, **fields):
+        packet = {
+            'type': 'show_user',
+            'response_queue': RESPONSE_QUEUE,
+            'uuid': uuid,
+            'version_utc_seconds': 1,
+            'sent_at': sent_at,
+            'args': {
+                'username': 'Tjstretchalot'
+            }
+        }
+        packet.update(fields)
+        self.channel.basic_publish('', QUEUE, json.dumps(packet))
+        return helper.fetch_one(self, RESPONSE_QUEUE)
+
+    def test_ttl_seconds_expired(self):
+        body = self.show_user('expiry-ttl-uuid', time.time() - 60, ttl_seconds=30)
+        self.assertEqual(body, {'uuid': 'expiry-ttl-uuid', 'type': 'expired'})
+
+    def test_deadline_expired(self):
+        body = self.show_user('expiry-deadline-uuid', time.time(), deadline=time.time() - 1)
+        self.assertEqual(body, {'uuid': 'expiry-deadline-uuid', 'type': 'expired'})
+
+    def test_ttl_seconds_not_expired(self):
+        body = self.show_user('expiry-fresh-uuid', time.time(), ttl_seconds=300)
+        self.assertIsInstance(body, dict)
+        self.assertEqual(body.get('uuid'), 'expiry-fresh-uuid')
+        self.assertEqual(body.get('type'), 'copy')
+        self.assertEqual(body.get('status'), 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+"""Tests that requests whose style says to retry are sent through the delay
+queue and given up on after max_attempts. Expects the default
+RETRY_BASE_DELAY_S, so that retries are delayed rather than requeued."""
+import unittest
+import os
+import pika
+import json
+import time
+import helper
+
+
+PIKA_PARAMETERS = pika.ConnectionParameters(
+    os.environ['AMQP_HOST'],
+    int(os.environ['AMQP_PORT']),
+    os.environ['AMQP_VHOST'],
+    pika.PlainCredentials(
+        os.environ['AMQP_USERNAME'], os.environ['AMQP_PASSWORD']
+    )
+)
+
+
+QUEUE = os.environ['AMQP_QUEUE']
+
+
+RESPONSE_QUEUE = 'retries_resp_queue'
+
+
+DELAY_QUEUE = QUEUE + '-retry-1'
+
+
+MISSING_USER = 'proxy_tests_no_such_user'
+"""Longer than reddit allows for usernames, so show_user always 404s"""
+
+
+class RetriesTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        amqp = pika.BlockingConnection(PIKA_PARAMETERS)
+        channel = amqp.channel()
+        channel.queue_declare(QUEUE)
+        channel.queue_declare(RESPONSE_QUEUE)
+        channel.queue_declare(
+            DELAY_QUEUE,
+            arguments={
+                'x-dead-letter-exchange': '',
+                'x-dead-letter-routing-key': QUEUE
+            }
+        )
+        cls.channel = channel
+        cls.amqp = amqp
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.channel.close()
+        cls.amqp.close()
+
+    def send_missing_user(self, uuid, style):
+        self.channel.basic_publish(
+            '',
+            QUEUE,
+            json.dumps({
+                'type': 'show_user',
+                'response_queue': RESPONSE_QUEUE,
+                'uuid': uuid,
+                'version_utc_seconds': 1,
+                'sent_at': time.time(),
+                'style': style,
+                'args': {
+                    'username': MISSING_USER
+                }
+            })
+        )
+
+    def test_retry_goes_through_delay_queue(self):
+        self.send_missing_user('retries-delay-uuid', {'4xx': {'operation': 'retry'}})
+
+        # Take the retry out of the delay queue before it dead-letters back
+        # to the proxy; closing the channel cancels our consumer.
+        delay_channel = self.amqp.channel()
+        try:
+            body = helper.fetch_one(self, DELAY_QUEUE, channel=delay_channel)
+        finally:
+            delay_channel.close()
+
+        self.assertIsInstance(body, dict)
+        self.assertEqual(body.get('type'), 'show_user')
+        self.assertEqual(body.get('uuid'), 'retries-delay-uuid')
+        self.assertEqual(body.get('response_queue'), RESPONSE_QUEUE)
+        self.assertEqual(body.get('attempt'), 2)
+        self.assertEqual(body.get('ignore_version'), False)
+        self.assertEqual(body.get('args'), {'username': MISSING_USER})
+
+    def test_retry_fails_on_last_attempt(self):
+        self.send_missing_user(
+            'retries-last-uuid', {'4xx': {'operation': 'retry', 'max_attempts': 1}}
+        )
+        body = helper.fetch_one(self, RESPONSE_QUEUE)
+        self.assertEqual(body, {'uuid': 'retries-last-uuid', 'type': 'failure'})
+
+    def test_retry_fails_after_max_attempts(self):
+        self.send_missing_user(
+            'retries-max-uuid', {'4xx': {'operation': 'retry', 'max_attempts': 2}}
+        )
+        body = helper.fetch_one(self, RESPONSE_QUEUE)
+        self.assertEqual(body, {'uuid': 'retries-max-uuid', 'type': 'failure'})
+
+
+if __name__ == '__main__':
+    unittest.main()